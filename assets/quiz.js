@@ -0,0 +1,408 @@
+// Quiz interactif (export QCM JS). Données du module : constante globale QUIZ = {questions, title, timerSeconds, pageSize} définie par la page.
+// pageSize > 0 : seules les questions de la page courante existent dans le DOM (grosses banques sur mobile).
+const questions = QUIZ.questions;
+const title = QUIZ.title;
+const hasTimer = QUIZ.timerSeconds > 0;
+const pageSize = QUIZ.pageSize || 0;
+const pageCount = pageSize ? Math.ceil(questions.length / pageSize) : 1;
+const storageKey = "qcm_js_premium_" + btoa(unescape(encodeURIComponent(title)));
+// Une clé par question répondue + une clé pour le reste de l'état : une réponse n'écrit que sa propre entrée
+const answerPrefix = storageKey + ":a:";
+const metaKey = storageKey + ":meta";
+const SAVE_DELAY = 400;
+
+let state = {
+    score: 0,
+    answered: {},
+    answeredCount: 0,
+    timeLeft: QUIZ.timerSeconds,
+    timeUp: false,
+    showResults: false,
+    page: 0
+};
+
+function recordAnswer(idx, entry) {
+    if (state.answered[idx] === undefined) state.answeredCount++;
+    else state.score -= state.answered[idx].score;
+    state.answered[idx] = entry;
+    state.score += entry.score;
+}
+
+// Load progress
+function loadState() {
+    const legacy = localStorage.getItem(storageKey);
+    if (legacy) {
+        // Ancien format : tout l'état dans une seule clé, converti une fois
+        try {
+            const old = JSON.parse(legacy);
+            Object.keys(old.answered || {}).forEach(idx => {
+                if (+idx < questions.length) { recordAnswer(+idx, old.answered[idx]); dirty.add(+idx); }
+            });
+            if (old.timeLeft !== undefined) state.timeLeft = old.timeLeft;
+            state.timeUp = !!old.timeUp;
+            state.showResults = !!old.showResults;
+            metaDirty = true;
+        } catch(e) {}
+        localStorage.removeItem(storageKey);
+        flushSave();
+        return;
+    }
+    try {
+        const meta = JSON.parse(localStorage.getItem(metaKey) || "null");
+        if (meta) Object.assign(state, meta);
+    } catch(e) {}
+    for (let i = 0; i < localStorage.length; i++) {
+        const key = localStorage.key(i);
+        if (!key || key.indexOf(answerPrefix) !== 0) continue;
+        const idx = +key.slice(answerPrefix.length);
+        // Réponses d'une version précédente du module plus longue : ignorées
+        if (!(idx < questions.length)) continue;
+        try { recordAnswer(idx, JSON.parse(localStorage.getItem(key))); }
+        catch(e) {}
+    }
+    state.page = Math.min(state.page || 0, pageCount - 1);
+}
+
+// Sauvegarde différée : les écritures rapprochées sont regroupées
+const dirty = new Set();
+let metaDirty = false;
+let saveTimer = null;
+
+function scheduleSave(idx) {
+    if (idx !== undefined) dirty.add(idx);
+    else metaDirty = true;
+    if (!saveTimer) saveTimer = setTimeout(flushSave, SAVE_DELAY);
+}
+
+function flushSave() {
+    clearTimeout(saveTimer);
+    saveTimer = null;
+    try {
+        dirty.forEach(idx => localStorage.setItem(answerPrefix + idx, JSON.stringify(state.answered[idx])));
+        if (metaDirty) {
+            localStorage.setItem(metaKey, JSON.stringify({
+                timeLeft: state.timeLeft, timeUp: state.timeUp, showResults: state.showResults, page: state.page
+            }));
+        }
+    } catch(e) {}
+    dirty.clear();
+    metaDirty = false;
+}
+
+document.addEventListener('visibilitychange', () => { if (document.visibilityState === 'hidden') flushSave(); });
+window.addEventListener('pagehide', flushSave);
+
+loadState();
+
+const container = document.getElementById('quiz-container');
+const resultsContainer = document.getElementById('results-container');
+document.getElementById('total-q').textContent = questions.length;
+
+function updateGlobalUI() {
+    const answeredCount = state.answeredCount;
+    const progressPercent = (answeredCount / questions.length * 100);
+    document.getElementById('progress').style.width = progressPercent + '%';
+    document.getElementById('current-score').textContent = state.score;
+    document.getElementById('answered-count').textContent = answeredCount;
+
+    // Check if all answered
+    if (answeredCount === questions.length && !state.showResults) {
+        setTimeout(showResults, 500);
+    }
+}
+
+function renderCard(idx) {
+    const q = questions[idx];
+    const card = document.createElement('div');
+    card.className = 'card';
+    if (state.answered[idx] !== undefined) card.classList.add('answered');
+    card.id = 'q-' + idx;
+
+    const isAnswered = state.answered[idx] !== undefined;
+    const userSelected = isAnswered ? state.answered[idx].selected : (window.tempSelections && window.tempSelections[idx] ? window.tempSelections[idx] : []);
+    const correctAnswers = q.ans.split('');
+
+    let optionsHtml = '';
+    q.opts.forEach((opt, oIdx) => {
+        const letter = String.fromCharCode(65 + oIdx);
+        let optClass = 'option';
+
+        if (isAnswered) {
+            if (correctAnswers.includes(letter)) optClass += ' correct';
+            else if (userSelected.includes(letter)) optClass += ' incorrect';
+        } else if (userSelected.includes(letter)) {
+            optClass += ' selected';
+        }
+
+        optionsHtml += `
+            <div class="${optClass}" onclick="toggleOption(${idx}, '${letter}')">
+                <input type="checkbox"
+                    ${userSelected.includes(letter) ? 'checked' : ''}
+                    ${isAnswered || state.timeUp ? 'disabled' : ''}>
+                <span class="option-letter">${letter}</span>
+                <span class="option-text">${opt}</span>
+            </div>
+        `;
+    });
+
+    const isCorrect = isAnswered && state.answered[idx].score === 1;
+    const statusEmoji = isAnswered ? (isCorrect ? '✅' : '❌') : '';
+
+    card.innerHTML = `
+        <div class="question-header">
+            <span class="question-number">Question ${idx + 1} / ${questions.length}</span>
+            <span class="question-status">${statusEmoji}</span>
+        </div>
+        <div class="question-text">${q.text}</div>
+        <div class="options">${optionsHtml}</div>
+        <button class="btn" id="btn-${idx}"
+            onclick="validateQuestion(${idx})"
+            ${isAnswered || state.timeUp || userSelected.length === 0 ? 'disabled' : ''}>
+            ✓ Valider ma réponse
+        </button>
+        ${isAnswered ? `
+            <div class="feedback ${isCorrect ? 'correct' : 'incorrect'}">
+                <div class="feedback-title">
+                    ${isCorrect ? '✅ Excellent !' : '❌ Incorrect'}
+                </div>
+                <div class="explanation">💡 ${q.expl}</div>
+            </div>
+        ` : ''}
+    `;
+    return card;
+}
+
+function renderPager() {
+    const pager = document.createElement('div');
+    pager.className = 'pager';
+    const first = state.page * pageSize + 1;
+    const last = Math.min(questions.length, first + pageSize - 1);
+    pager.innerHTML = `
+        <button class="btn btn-secondary" onclick="goToPage(${state.page - 1})" ${state.page === 0 ? 'disabled' : ''}>◀</button>
+        <span class="pager-label">Questions ${first}–${last} · page ${state.page + 1} / ${pageCount}</span>
+        <button class="btn btn-secondary" onclick="goToPage(${state.page + 1})" ${state.page >= pageCount - 1 ? 'disabled' : ''}>▶</button>
+        <button class="btn btn-secondary" onclick="goToUnanswered()" title="Prochaine question sans réponse">⏭</button>
+    `;
+    return pager;
+}
+
+function renderQuiz() {
+    if (state.showResults) {
+        showResults();
+        return;
+    }
+
+    container.innerHTML = '';
+    resultsContainer.style.display = 'none';
+    container.style.display = 'block';
+
+    const start = pageSize ? state.page * pageSize : 0;
+    const end = pageSize ? Math.min(questions.length, start + pageSize) : questions.length;
+    const fragment = document.createDocumentFragment();
+    if (pageSize) fragment.appendChild(renderPager());
+    for (let idx = start; idx < end; idx++) fragment.appendChild(renderCard(idx));
+    if (pageSize) fragment.appendChild(renderPager());
+    container.appendChild(fragment);
+    updateGlobalUI();
+}
+
+// Ne remplace que la carte concernée, sans reconstruire la page
+function refreshCard(idx) {
+    const card = document.getElementById('q-' + idx);
+    if (card) card.replaceWith(renderCard(idx));
+    updateGlobalUI();
+}
+
+window.goToPage = function(page) {
+    if (page < 0 || page >= pageCount) return;
+    state.page = page;
+    scheduleSave();
+    renderQuiz();
+    container.scrollIntoView();
+};
+
+window.goToUnanswered = function() {
+    const start = pageSize ? state.page * pageSize : 0;
+    for (let k = 0; k < questions.length; k++) {
+        const idx = (start + k) % questions.length;
+        if (state.answered[idx] === undefined) {
+            if (pageSize && Math.floor(idx / pageSize) !== state.page) goToPage(Math.floor(idx / pageSize));
+            const card = document.getElementById('q-' + idx);
+            if (card) card.scrollIntoView({ behavior: 'smooth', block: 'center' });
+            return;
+        }
+    }
+};
+
+window.toggleOption = function(qIdx, letter) {
+    if (state.answered[qIdx] || state.timeUp) return;
+    if (!window.tempSelections) window.tempSelections = {};
+    if (!window.tempSelections[qIdx]) window.tempSelections[qIdx] = [];
+
+    const idx = window.tempSelections[qIdx].indexOf(letter);
+    if (idx > -1) window.tempSelections[qIdx].splice(idx, 1);
+    else window.tempSelections[qIdx].push(letter);
+
+    const card = document.getElementById('q-' + qIdx);
+    const btn = document.getElementById('btn-' + qIdx);
+    btn.disabled = window.tempSelections[qIdx].length === 0;
+
+    const opts = card.querySelectorAll('.option');
+    opts.forEach((o, i) => {
+        const l = String.fromCharCode(65 + i);
+        if (window.tempSelections[qIdx].includes(l)) o.classList.add('selected');
+        else o.classList.remove('selected');
+        o.querySelector('input').checked = window.tempSelections[qIdx].includes(l);
+    });
+};
+
+window.validateQuestion = function(idx) {
+    if (state.timeUp) return;
+    const selected = window.tempSelections ? window.tempSelections[idx] : [];
+    if (!selected || selected.length === 0) return;
+
+    const correctAnswers = questions[idx].ans.split('').sort();
+    const userAnswers = selected.sort();
+
+    // ALL OR NOTHING scoring
+    const isCorrect = JSON.stringify(correctAnswers) === JSON.stringify(userAnswers);
+    const points = isCorrect ? 1 : 0;
+
+    recordAnswer(idx, { selected: selected, score: points });
+    scheduleSave(idx);
+    refreshCard(idx);
+};
+
+window.resetProgress = function() {
+    if (confirm("Voulez-vous vraiment réinitialiser ce quiz ?")) {
+        clearTimeout(saveTimer);
+        const keys = [];
+        for (let i = 0; i < localStorage.length; i++) {
+            const key = localStorage.key(i);
+            if (key && (key === storageKey || key.indexOf(storageKey + ":") === 0)) keys.push(key);
+        }
+        keys.forEach(key => localStorage.removeItem(key));
+        window.removeEventListener('pagehide', flushSave);
+        dirty.clear();
+        metaDirty = false;
+        location.reload();
+    }
+};
+
+window.toggleTheme = function() {
+    const current = document.body.getAttribute('data-theme');
+    const newTheme = current === 'dark' ? '' : 'dark';
+    document.body.setAttribute('data-theme', newTheme);
+    localStorage.setItem('qcm_theme', newTheme);
+};
+
+function showResults() {
+    state.showResults = true;
+    scheduleSave();
+
+    container.style.display = 'none';
+    resultsContainer.style.display = 'block';
+
+    const percentage = (state.score / questions.length * 100).toFixed(1);
+    const correctCount = state.score;
+    const incorrectCount = questions.length - state.score;
+
+    let emoji = '🎉';
+    let message = 'Excellent travail !';
+    let titleText = 'Félicitations !';
+
+    if (percentage >= 90) {
+        emoji = '🏆';
+        message = 'Performance exceptionnelle ! Vous maîtrisez parfaitement ce sujet.';
+        titleText = 'Résultat Exceptionnel !';
+    } else if (percentage >= 75) {
+        emoji = '🌟';
+        message = 'Très bonne performance ! Continuez ainsi.';
+        titleText = 'Très Bien !';
+    } else if (percentage >= 50) {
+        emoji = '👍';
+        message = 'Bon résultat. Il y a encore quelques points à réviser.';
+        titleText = 'Pas mal !';
+    } else {
+        emoji = '📚';
+        message = 'Continuez à travailler. La pratique vous aidera à progresser.';
+        titleText = 'À réviser';
+    }
+
+    resultsContainer.innerHTML = `
+        <div class="results-page">
+            <div class="results-card">
+                <div class="results-icon">${emoji}</div>
+                <div class="results-title">${titleText}</div>
+                <div class="results-score">${percentage}%</div>
+
+                <div class="results-stats">
+                    <div class="results-stat">
+                        <div class="results-stat-value">${correctCount}</div>
+                        <div class="results-stat-label">✅ Correctes</div>
+                    </div>
+                    <div class="results-stat">
+                        <div class="results-stat-value">${incorrectCount}</div>
+                        <div class="results-stat-label">❌ Incorrectes</div>
+                    </div>
+                    <div class="results-stat">
+                        <div class="results-stat-value">${questions.length}</div>
+                        <div class="results-stat-label">📝 Total</div>
+                    </div>
+                </div>
+
+                <div class="results-message">${message}</div>
+
+                <div class="results-actions">
+                    <button class="btn" onclick="reviewAnswers()">👁️ Revoir les réponses</button>
+                    <button class="btn btn-secondary" onclick="window.print()">🖨️ Imprimer le résultat</button>
+                    <button class="btn btn-secondary" onclick="resetProgress()">🔄 Recommencer</button>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+window.reviewAnswers = function() {
+    state.showResults = false;
+    scheduleSave();
+    renderQuiz();
+};
+
+function revealAll() {
+    state.timeUp = true;
+    questions.forEach((q, idx) => {
+        if (state.answered[idx] === undefined) {
+            recordAnswer(idx, { selected: [], score: 0 });
+            dirty.add(idx);
+        }
+    });
+    scheduleSave();
+    renderQuiz();
+}
+
+if (hasTimer && !state.timeUp) {
+    const timerEl = document.getElementById('timer');
+    const interval = setInterval(() => {
+        state.timeLeft--;
+        const m = Math.floor(state.timeLeft / 60);
+        const s = state.timeLeft % 60;
+        timerEl.textContent = `${m.toString().padStart(2, '0')}:${s.toString().padStart(2, '0')}`;
+        if (state.timeLeft <= 0) {
+            clearInterval(interval);
+            revealAll();
+        } else if (state.timeLeft % 5 === 0) {
+            // Le temps restant n'est sauvegardé que toutes les 5 secondes
+            scheduleSave();
+        }
+    }, 1000);
+} else if (state.timeUp) {
+    const timerEl = document.getElementById('timer');
+    if(timerEl) timerEl.textContent = "00:00";
+}
+
+// Load theme preference
+const savedTheme = localStorage.getItem('qcm_theme');
+if (savedTheme) document.body.setAttribute('data-theme', savedTheme);
+
+renderQuiz();
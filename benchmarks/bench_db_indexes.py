@@ -0,0 +1,95 @@
+"""Benchmark des requêtes chaudes avant/après la migration d'index (v1 -> v2).
+
+Crée une base temporaire au schéma v1, la peuple (1M lignes d'historique par
+défaut), mesure les requêtes de l'application, applique les migrations puis
+mesure à nouveau.
+
+Usage : python benchmarks/bench_db_indexes.py [nb_lignes_historique] [nb_requêtes]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_engine import CONNECTION_PRAGMAS, apply_migrations  # noqa: E402
+
+N_USERS = 20000
+N_COURSES = 300
+N_FAVORITES = 200000
+N_MODULES = 5000
+TYPES = ["QCM", "QCM_JS", "QA", "DEF", "SUM"]
+
+# Requêtes copiées des helpers db_* de qcm_web_app
+QUERIES = {
+    "db_get_modules_status (score)": ("SELECT course, MAX(score), total FROM history WHERE email = ? AND course IN (?) GROUP BY course",
+                                      lambda r: (f"user{r.randrange(N_USERS)}@ecole.ma", f"Cours {r.randrange(N_COURSES)}")),
+    "db_get_history": ("SELECT date as Date, course as Examen, (score || ' / ' || total) as Score FROM history WHERE email = ? ORDER BY date DESC",
+                       lambda r: (f"user{r.randrange(N_USERS)}@ecole.ma",)),
+    "db_toggle_favorite (lookup)": ("SELECT id FROM favorites WHERE email = ? AND question_text = ?",
+                                    lambda r: (f"user{r.randrange(N_USERS)}@ecole.ma", f"Question {r.randrange(500)}")),
+    "db_list_modules(type)": ("SELECT id, name, category, type, created_at FROM educational_modules WHERE type = ? ORDER BY created_at DESC LIMIT 20",
+                             lambda r: (r.choice(TYPES),)),
+}
+
+
+def seed(conn, n_history):
+    rnd = random.Random(42)
+    conn.executemany("INSERT INTO history (email, course, score, total, date) VALUES (?, ?, ?, ?, ?)",
+                     ((f"user{rnd.randrange(N_USERS)}@ecole.ma", f"Cours {rnd.randrange(N_COURSES)}",
+                       rnd.randrange(41), 40, f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 10:00")
+                      for _ in range(n_history)))
+    conn.executemany("INSERT INTO favorites (email, module_name, question_text, options, answer, explanation, created_at) "
+                     "VALUES (?, ?, ?, '[]', 'A', '', '2025-01-01 10:00')",
+                     ((f"user{rnd.randrange(N_USERS)}@ecole.ma", f"Cours {rnd.randrange(N_COURSES)}", f"Question {rnd.randrange(500)}")
+                      for _ in range(N_FAVORITES)))
+    conn.executemany("INSERT INTO educational_modules (name, category, type, content, created_at) VALUES (?, 'Général', ?, ?, ?)",
+                     ((f"Module {i}", rnd.choice(TYPES), "Question|A|B|C|D|E|F|Réponse|Explication\n" * 20,
+                       f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} {rnd.randint(0, 23):02d}:00")
+                      for i in range(N_MODULES)))
+    conn.commit()
+
+
+def measure(conn, n_queries):
+    results = {}
+    for name, (sql, make_params) in QUERIES.items():
+        rnd = random.Random(7)
+        params = [make_params(rnd) for _ in range(n_queries)]
+        start = time.perf_counter()
+        for p in params:
+            conn.execute(sql, p).fetchall()
+        results[name] = (time.perf_counter() - start) / n_queries * 1000
+    return results
+
+
+def main():
+    n_history = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        apply_migrations(conn, target=1)
+        start = time.perf_counter()
+        seed(conn, n_history)
+        print(f"Base peuplée : {n_history} lignes d'historique en {time.perf_counter() - start:.1f}s")
+
+        before = measure(conn, n_queries)
+        start = time.perf_counter()
+        version = apply_migrations(conn)
+        print(f"Migrations jusqu'à v{version} en {time.perf_counter() - start:.1f}s")
+        after = measure(conn, n_queries)
+
+        print(f"{'Requête':32} {'v1 (ms)':>10} {'v2 (ms)':>10} {'gain':>8}")
+        for name in QUERIES:
+            print(f"{name:32} {before[name]:10.3f} {after[name]:10.3f} {before[name] / after[name]:7.0f}x")
+        for name, (sql, make_params) in QUERIES.items():
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql, make_params(random.Random(0))).fetchall()
+            print(f"  {name}: {' / '.join(row[-1] for row in plan)}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Micro-benchmark : parseur unifié (qcm_parser) vs anciennes fonctions de qcm_web_app.
+
+Les anciennes implémentations sont recopiées ici telles quelles, car importer
+qcm_web_app lance l'application Streamlit.
+
+Usage : python benchmarks/bench_parser.py [nb_questions] [répétitions]
+"""
+import csv
+import io
+import os
+import random
+import re
+import sys
+import timeit
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qcm_parser import LETTERS, parse_bank  # noqa: E402
+
+
+# --- Anciennes implémentations (copie de référence) ---
+
+def legacy_validate_csv_data(csv_text, q_type):
+    errors = []
+    warnings = []
+    f = io.StringIO(csv_text.strip())
+    reader = csv.reader(f, delimiter='|')
+    header = next(reader, None)
+    if not header:
+        return ["Le fichier est vide."], []
+    ans_col_idx = -1
+    if header:
+        for j, col in enumerate(header):
+            if col.strip().upper() in ["RÉPONSE", "REPONSE", "ANSWER"]:
+                ans_col_idx = j
+                break
+    for i, row in enumerate(reader, 1):
+        if not any(row): continue
+        if str(row[0]).strip().lower() in ["question", "titre"]: continue
+        if q_type == "QCM Classique":
+            if len(row) < 7:
+                errors.append(f"Ligne {i} : Colonnes insuffisantes ({len(row)}/7 minimum).")
+                continue
+            ans_idx = ans_col_idx
+            if ans_idx == -1 or ans_idx >= len(row):
+                ans_pattern = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
+                search_limit = min(len(row) - 1, 11)
+                for j in range(search_limit, 1, -1):
+                    val = row[j].strip().upper()
+                    if val and len(val) <= 15 and ans_pattern.match(val):
+                        ans_idx = j
+                        break
+                if ans_idx == -1: ans_idx = max(1, len(row) - 2)
+            raw_ans = row[ans_idx].strip().upper()
+            if raw_ans in ["RÉPONSE", "REPONSE", "ANSWER"]: continue
+            opts = [o.strip() for o in row[1:ans_idx] if o.strip()]
+            num_opts = len(opts)
+            lets = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[:num_opts]
+            ans_clean = ""
+            for char in raw_ans:
+                if char in lets: ans_clean += char
+                elif char in [';', ',', ' ', ':', '.', '/', '?']: continue
+                else: break
+            if not ans_clean:
+                errors.append(f"Ligne {i} : Réponse '{raw_ans[:10]}' invalide pour {num_opts} options.")
+    return errors, warnings
+
+
+def legacy_perform_stats(csv_text):
+    f = io.StringIO(csv_text); reader = csv.reader(f, delimiter='|'); header = next(reader, None)
+    ans_col_idx = -1
+    if header:
+        for j, col in enumerate(header):
+            if col.strip().upper() in ["RÉPONSE", "REPONSE", "ANSWER"]:
+                ans_col_idx = j
+                break
+    total, single, multi, all_ans = 0, 0, 0, []
+    for row in reader:
+        if not row or not any(row): continue
+        if str(row[0]).strip().lower() in ["question", "titre"]: continue
+        if len(row) < 7: continue
+        total += 1
+        ans_idx = ans_col_idx
+        if ans_idx == -1 or ans_idx >= len(row):
+            ans_pattern = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
+            search_limit = min(len(row) - 1, 11)
+            for j in range(search_limit, 1, -1):
+                val = row[j].strip().upper()
+                if val and len(val) <= 15 and ans_pattern.match(val):
+                    ans_idx = j
+                    break
+            if ans_idx == -1: ans_idx = max(1, len(row) - 2)
+        opts = [o.strip() for o in row[1:ans_idx] if o.strip()]
+        lets = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[:len(opts)]
+        raw_ans = str(row[ans_idx]).strip().upper()
+        ans = ""
+        for char in raw_ans:
+            if char in lets: ans += char
+            elif char in [';', ',', ' ', ':', '.', '/', '?']: continue
+            else: break
+        if len(ans) > 1: multi += 1
+        else: single += 1
+        for char in ans:
+            if char in lets: all_ans.append(char)
+    counts = Counter(all_ans); total_ans = len(all_ans) if all_ans else 1
+    dist = {k: (v/total_ans * 100) for k, v in counts.items()}
+    return total, single, multi, dist
+
+
+def legacy_parse_csv(text):
+    f = io.StringIO(text); reader = csv.reader(f, delimiter='|'); header = next(reader, None)
+    ans_col_idx = -1
+    if header:
+        for j, col in enumerate(header):
+            if col.strip().upper() in ["RÉPONSE", "REPONSE", "ANSWER"]:
+                ans_col_idx = j
+                break
+    data = []
+    for row in reader:
+        if not row or not any(row): continue
+        if str(row[0]).strip().lower() in ["question", "titre"]: continue
+        if len(row) < 7: continue
+        ans_idx = ans_col_idx
+        if ans_idx == -1 or ans_idx >= len(row):
+            ans_pattern = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
+            search_limit = min(len(row) - 1, 11)
+            for j in range(search_limit, 1, -1):
+                val = row[j].strip().upper()
+                if val and len(val) <= 15 and ans_pattern.match(val):
+                    ans_idx = j
+                    break
+            if ans_idx == -1: ans_idx = max(1, len(row) - 2)
+        opts = [o.strip() for o in row[1:ans_idx] if o.strip()]
+        lets = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[:len(opts)]
+        raw_ans = row[ans_idx].strip().upper()
+        ans_clean = ""
+        for char in raw_ans:
+            if char in lets: ans_clean += char
+            elif char in [';', ',', ' ', ':', '.', '/', '?']: continue
+            else: break
+        data.append({'text': row[0].strip(), 'opts': opts, 'ans': ans_clean, 'expl': "|".join(row[ans_idx+1:])})
+    return data
+
+
+def legacy_html_questions(csv_text):
+    """Partie parsing de l'ancien generate_html_content (mode QCM)."""
+    f = io.StringIO(csv_text)
+    reader = csv.reader(f, delimiter='|')
+    header = next(reader, None)
+    ans_col_idx = -1
+    if header:
+        for j, col in enumerate(header):
+            if col.strip().upper() in ["RÉPONSE", "REPONSE", "ANSWER"]:
+                ans_col_idx = j
+                break
+    raw_questions = []
+    for row in reader:
+        if not row or not any(row): continue
+        if str(row[0]).strip().lower() in ["question", "titre"]: continue
+        if len(row) < 7: continue
+        ans_idx = ans_col_idx
+        if ans_idx == -1 or ans_idx >= len(row):
+            ans_pattern = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
+            search_limit = min(len(row) - 1, 11)
+            for j in range(search_limit, 1, -1):
+                val = row[j].strip().upper()
+                if val and len(val) <= 15 and ans_pattern.match(val):
+                    ans_idx = j
+                    break
+            if ans_idx == -1: ans_idx = max(1, len(row) - 2)
+        opts_text = [o.strip() for o in row[1:ans_idx] if o.strip()]
+        raw_ans_val = row[ans_idx].strip().upper()
+        expl = "|".join(row[ans_idx+1:])
+        lets = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")[:len(opts_text)]
+        ans_clean = ""
+        for char in raw_ans_val:
+            if char in lets: ans_clean += char
+            elif char in [';', ',', ' ', ':', '.', '/', '?']: continue
+            else: break
+        correct_indices = [lets.index(l) for l in ans_clean if l in lets]
+        raw_questions.append({'text': row[0].strip(),
+                              'opts_data': [{'text': o, 'is_correct': (i in correct_indices)} for i, o in enumerate(opts_text)],
+                              'expl': expl, 'type': 'QCM'})
+    return raw_questions
+
+
+# --- Données et mesures ---
+
+def make_bank(n, header=False, seed=0):
+    """Génère une banque de n questions à 6 options au format du Transformateur."""
+    rnd = random.Random(seed)
+    lines = ["Question|A|B|C|D|E|F|Réponse|Explication" if header else "Question|A|B|C|D|E|F|Rep|Explication"]
+    for i in range(n):
+        ans = "".join(sorted(rnd.sample("ABCDEF", rnd.choice([1, 1, 2]))))
+        opts = "|".join(f"Option {l} de la question {i} avec un peu de texte" for l in "ABCDEF")
+        lines.append(f"Question {i} : quel énoncé est correct ?|{opts}|{ans}|Explication détaillée numéro {i}.")
+    return "\n".join(lines)
+
+
+def opts_data(bank):
+    """Appariement option/bonne réponse fait par generate_html_content au rendu."""
+    return [[(o, l in q['ans']) for l, o in zip(LETTERS, q['opts'])] for q in bank.questions]
+
+
+# Un rerun du Créateur : validation + statistiques + rendu (QCM Classique ou JS)
+SCENARIOS = {
+    "Créateur QCM Classique": (
+        lambda t: (legacy_validate_csv_data(t, "QCM Classique"), legacy_perform_stats(t), legacy_html_questions(t)),
+        lambda t: opts_data(parse_bank(t, "QCM Classique")),
+    ),
+    "Créateur QCM JS": (
+        lambda t: (legacy_validate_csv_data(t, "QCM JS Interactif"), legacy_perform_stats(t), legacy_parse_csv(t)),
+        lambda t: [dict(q, opts=list(q['opts'])) for q in parse_bank(t, "QCM JS Interactif").questions],
+    ),
+}
+
+
+def check_equivalence(text):
+    bank = parse_bank(text)
+    assert bank.questions == legacy_parse_csv(text), "questions divergentes"
+    assert bank.stats == legacy_perform_stats(text), "statistiques divergentes"
+    assert bank.errors == legacy_validate_csv_data(text, "QCM Classique")[0], "erreurs divergentes"
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    for header in (False, True):
+        text = make_bank(n, header=header)
+        check_equivalence(text)
+        label = "en-tête Réponse" if header else "heuristique droite-gauche"
+        for name, (legacy_fn, unified_fn) in SCENARIOS.items():
+            legacy = min(timeit.repeat(lambda: legacy_fn(text), number=3, repeat=repeat)) / 3
+            unified = min(timeit.repeat(lambda: unified_fn(text), number=3, repeat=repeat)) / 3
+            print(f"{name} - {n} questions ({label}) : ancien {legacy * 1000:.1f} ms "
+                  f"| unifié {unified * 1000:.1f} ms | gain x{legacy / unified:.1f}")
+
+
+if __name__ == "__main__":
+    main()
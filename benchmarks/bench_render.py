@@ -0,0 +1,403 @@
+"""Micro-benchmark : rendus HTML par gabarits compilés (render_engine) vs f-strings concaténées.
+
+Les anciennes implémentations sont recopiées ici telles quelles, car importer
+qcm_web_app lance l'application Streamlit. Le script vérifie d'abord que les
+deux rendus produisent un HTML identique, puis mesure temps et pic
+d'allocation (tracemalloc) pour des banques de taille croissante.
+
+Usage : python benchmarks/bench_render.py [tailles séparées par des virgules] [répétitions]
+"""
+import csv
+import io
+import os
+import random
+import re
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qcm_parser import LETTERS, parse_bank  # noqa: E402
+from render_engine import (render_answer_sheet, render_def_html, render_print_document,  # noqa: E402
+                           render_print_html, render_qa_html, render_result_report)
+from shuffle_engine import shuffle_questions  # noqa: E402
+
+cached_parse_bank = parse_bank
+
+
+# --- Anciennes implémentations (copie de référence) ---
+
+def legacy_answer_sheet(num_questions):
+    """Génère une feuille de cochage propre sur 3 colonnes"""
+    def make_table(q_range):
+        rows = ""
+        for i in q_range:
+            rows += f"""<tr><td style='font-weight:bold; width:30px;'>{i}</td>""" + "".join([f"<td style='width:30px; border:1px solid #000;'></td>" for _ in range(6)]) + "</tr>"
+        return f"""
+        <table style="width:100%; border-collapse: collapse; text-align:center; font-size:9pt; margin-bottom:20px;">
+            <thead><tr><th>N°</th><th>A</th><th>B</th><th>C</th><th>D</th><th>E</th><th>F</th></tr></thead>
+            <tbody>{rows}</tbody>
+        </table>"""
+
+    # Split into 3 chunks
+    q_per_col = (num_questions + 2) // 3
+    c1 = range(1, min(num_questions + 1, q_per_col + 1))
+    c2 = range(q_per_col + 1, min(num_questions + 1, 2 * q_per_col + 1))
+    c3 = range(2 * q_per_col + 1, num_questions + 1)
+
+    return f"""
+    <div style="page-break-before: always; margin-top:30px;">
+        <h2 style="text-align:center;">FEUILLE DE RÉPONSES (À COCHER)</h2>
+        <div style="display:flex; justify-content: space-between; gap: 20px;">
+            <div style="flex:1;">{make_table(c1)}</div>
+            <div style="flex:1;">{make_table(c2) if c2 else ""}</div>
+            <div style="flex:1;">{make_table(c3) if c3 else ""}</div>
+        </div>
+        <p style="font-size:8pt; text-align:center; margin-top:10px;">Cochez la case correspondante à votre réponse.</p>
+    </div>"""
+
+
+def legacy_html_content(csv_text, title, use_columns, add_qr=True, mode="Examen", shuffle_q=False, shuffle_o=False, q_type="QCM Classique", add_sheet=True, open_all=False, bank=None):
+    col_css = "column-count: 3; -webkit-column-count: 3; -moz-column-count: 3; column-gap: 30px;" if use_columns else ""
+    # Only show QR for QCM mode as it links to a correction sheet
+    qr_code_html = ""
+    if add_qr and q_type == "QCM Classique":
+        qr_code_html = f'<div style="text-align:right;"><img src="https://api.qrserver.com/v1/create-qr-code/?size=100x100&data=https://qcmwebapppy-bfxlibcaaelehxbv6qjyif.streamlit.app/#correction" alt="QR Correction" style="width:80px;"/> <br/><small>Scan pour correction</small></div>'
+    
+    html_content = f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8">
+<title>{title}</title>
+<style>
+    body {{ font-family: 'Georgia', serif; line-height: 1.4; color: #000; padding: 20px; }}
+    h1 {{ text-align: center; border-bottom: 2px solid #000; padding-bottom: 5px; }}
+    .questions-wrapper {{ {col_css} margin-top: 15px; width: 100%; }}
+    .question-block {{ margin-bottom: 12px; padding-bottom: 8px; border-bottom: 1px dashed #ccc; break-inside: avoid; page-break-inside: avoid; }}
+    .question-text {{ font-weight: bold; font-size: 10pt; }}
+    .options {{ list-style: none; padding: 0; margin: 0; font-size: 9pt; }}
+    .options li {{ margin-bottom: 2px; }}
+    .options li::before {{ content: attr(data-letter) ". "; font-weight: bold; }}
+    table {{ width: 100%; border-collapse: collapse; margin-top: 20px; font-size: 9pt; }}
+    th, td {{ border: 1px solid #000; padding: 8px; text-align: left; vertical-align: top; }}
+    th {{ background-color: #eee; }}
+    .col-concept {{ width: 20%; font-weight: bold; }}
+    .col-def {{ width: 80%; }}
+    details {{ cursor: pointer; margin-top: 5px; font-size: 9pt; }}
+    details summary {{ list-style: none; font-weight: bold; color: #3498db; }}
+    details summary::-webkit-details-marker {{ display: none; }}
+    .qa-answer {{ padding: 10px; background: #f9f9f9; border-left: 3px solid #3498db; margin-top: 5px; }}
+    @media print {{ .no-print {{ display: none; }} }}
+</style>
+</head>
+<body>
+    {qr_code_html}
+    <h1>{title}</h1>
+    <div class="questions-wrapper">
+"""
+    
+    if bank is None:
+        bank = cached_parse_bank(csv_text, q_type)
+    
+    # Les questions partagées ne sont jamais modifiées : on ne copie que la liste
+    raw_questions = list(bank.questions)
+
+    if shuffle_q:
+        random.shuffle(raw_questions)
+
+    questions_html = ""
+    answers_rows = ""
+    glossary_table = ""
+    
+    if q_type == "Glossaire (Concept | Définition)":
+        glossary_table = "<table><thead><tr><th>Concept</th><th>Définition</th></tr></thead><tbody>"
+        for q in raw_questions:
+            glossary_table += f"<tr><td class='col-concept'>{q['text']}</td><td class='col-def'>{q['ans']}</td></tr>"
+        glossary_table += "</tbody></table>"
+        questions_html = glossary_table
+    else:
+        for q_idx, q in enumerate(raw_questions):
+            q_num = q_idx + 1
+            if q.get('type') == 'QA':
+                questions_html += f"""
+                <div class="question-block">
+                    <div class="question-text">{q_num}. {q['text']}</div>
+                    <details {"open" if open_all else ""}>
+                        <summary>▶ Réponse</summary>
+                        <div class="qa-answer">{q['ans']}</div>
+                    </details>
+                </div>"""
+                answers_rows += f"<tr><td>{q_num}</td><td colspan='2' style='font-weight:bold;'>{q['ans']}</td></tr>"
+            else:
+                opts_list = [(o, l in q['ans']) for l, o in zip(LETTERS, q['opts'])]
+                if shuffle_o: random.shuffle(opts_list)
+                final_lets = LETTERS[:len(opts_list)]
+                new_ans_letters = "".join([final_lets[i] for i, (_, is_correct) in enumerate(opts_list) if is_correct])
+                
+                questions_html += f'<div class="question-block"><div class="question-text">{q_num}. {q["text"]}</div><ul class="options">'
+                for i, (opt_text, _) in enumerate(opts_list):
+                    questions_html += f'<li data-letter="{final_lets[i]}">{opt_text}</li>'
+                questions_html += "</ul>"
+                
+                if mode == "Révision":
+                    questions_html += f'<div style="margin-top: 5px; padding: 8px; background: #f0fdf4; border: 1px solid #27ae60; border-radius: 4px; font-size: 9pt;">'
+                    questions_html += f'<strong>Réponse : {new_ans_letters}</strong><br/>'
+                    questions_html += f'<em>💡 {q["expl"]}</em>'
+                    questions_html += '</div>'
+                questions_html += "</div>"
+                answers_rows += f"<tr><td>{q_num}</td><td style='font-weight:bold;'>{new_ans_letters}</td><td>{q['expl']}</td></tr>"
+
+    # Only show correction footer for QCM mode
+    if mode == "Examen" and q_type == "QCM Classique":
+        sheet_html = legacy_answer_sheet(len(raw_questions)) if add_sheet else ""
+        footer = f"""
+        </div>
+        {sheet_html}
+        <div style="page-break-before: always;" id="correction">
+            <h2>Correction</h2>
+            <table><thead><tr><th>N°</th><th>Réponse</th><th>Explication</th></tr></thead><tbody>{answers_rows}</tbody></table>
+        </div>
+    </body></html>"""
+    else:
+        footer = "</div></body></html>"
+    
+    return html_content + questions_html + footer
+
+
+def legacy_qa_html(content, title):
+    """Génère un HTML propre pour les Questions / Réponses (Style Classique, Font Georgia)."""
+    f = io.StringIO(content)
+    reader = csv.reader(f, delimiter='|')
+    next(reader, None)
+    
+    items_html = ""
+    for i, row in enumerate(reader, 1):
+        if len(row) < 2: continue
+        q, a = row[0].strip(), row[1].strip()
+        items_html += f"""
+        <div class="qa-card">
+            <div class="qa-question">Q{i}. {q}</div>
+            <details>
+                <summary>▶ Afficher la réponse</summary>
+                <div class="qa-answer">{a}</div>
+            </details>
+        </div>"""
+    
+    return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8"><title>{title}</title>
+<style>
+    body {{ font-family: 'Georgia', serif; max-width: 900px; margin: auto; padding: 30px; color: #1e293b; background: #f8fafc; }}
+    h1 {{ text-align: center; color: #1e40af; border-bottom: 3px solid #3b82f6; padding-bottom: 10px; }}
+    .qa-card {{ background: white; border-radius: 10px; padding: 18px; margin-bottom: 16px; box-shadow: 0 2px 6px rgba(0,0,0,0.06); border-left: 4px solid #3b82f6; }}
+    .qa-question {{ font-weight: 700; font-size: 1.05em; color: #1e293b; }}
+    details {{ margin-top: 8px; }}
+    details summary {{ cursor: pointer; font-weight: 600; color: #3b82f6; list-style: none; }}
+    details summary::-webkit-details-marker {{ display: none; }}
+    .qa-answer {{ padding: 12px; background: #eff6ff; border-radius: 6px; margin-top: 6px; line-height: 1.6; }}
+    @media print {{ body {{ background: white; }} .qa-card {{ box-shadow: none; border: 1px solid #ddd; }} }}
+</style>
+</head>
+<body>
+    <h1>❓ {title}</h1>
+    {items_html}
+</body></html>"""
+
+
+def legacy_def_html(content, title):
+    """Génère un HTML propre pour les Définitions / Glossaire (Style Classique, Font Georgia)."""
+    f = io.StringIO(content)
+    reader = csv.reader(f, delimiter='|')
+    next(reader, None)
+    
+    rows_html = ""
+    for i, row in enumerate(reader, 1):
+        if len(row) < 2: continue
+        concept, definition = row[0].strip(), row[1].strip()
+        rows_html += f"""<tr><td class="concept">{concept}</td><td class="definition">{definition}</td></tr>"""
+    
+    return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8"><title>{title}</title>
+<style>
+    body {{ font-family: 'Georgia', serif; max-width: 960px; margin: auto; padding: 30px; color: #1e293b; background: #f8fafc; }}
+    h1 {{ text-align: center; color: #7c3aed; border-bottom: 3px solid #8b5cf6; padding-bottom: 10px; }}
+    table {{ width: 100%; border-collapse: collapse; margin-top: 20px; background: white; border-radius: 10px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.06); }}
+    th {{ background: #7c3aed; color: white; padding: 14px; text-align: left; font-size: 1em; }}
+    td {{ padding: 12px 14px; border-bottom: 1px solid #f1f5f9; vertical-align: top; }}
+    tr:hover {{ background: #faf5ff; }}
+    .concept {{ font-weight: 700; width: 25%; color: #6d28d9; font-size: 1em; }}
+    .definition {{ line-height: 1.6; color: #334155; }}
+    @media print {{ body {{ background: white; }} table {{ box-shadow: none; border: 1px solid #ddd; }} }}
+</style>
+</head>
+<body>
+    <h1>📜 {title}</h1>
+    <table>
+        <thead><tr><th>Concept</th><th>Définition</th></tr></thead>
+        <tbody>{rows_html}</tbody>
+    </table>
+</body></html>"""
+
+
+def legacy_result_report(questions, user_answers, score, title, identity=None, cheat_warnings=0):
+    """Génère le HTML du rapport de résultats personnalisé avec identité et stats de triche"""
+    from datetime import datetime
+    now = datetime.now().strftime("%d/%m/%Y %H:%M")
+    name = f"{identity['prenom']} {identity['nom']}" if identity and identity['nom'] else "Étudiant Anonyme"
+    user_id = f" (ID: {identity['id']})" if identity and identity['id'] else ""
+    
+    warnings_html = ""
+    if cheat_warnings > 0:
+        warnings_html = f'<p style="color:red; font-weight:bold;">⚠️ ALERTES SÉCURITÉ (Sorties d\'onglet) : {cheat_warnings}</p>'
+    else:
+        warnings_html = '<p style="color:green; font-weight:bold;">✅ Environnement sécurisé respecté.</p>'
+    
+    rows = ""
+    for idx, q in enumerate(questions):
+        u_ans_letters = user_answers.get(idx, "")
+        is_correct = "✅" if u_ans_letters == q['ans'] else "❌"
+        color = "#27ae60" if u_ans_letters == q['ans'] else "#e74c3c"
+        
+        mapping = {'A':0, 'B':1, 'C':2, 'D':3, 'E':4, 'F':5}
+        inv_mapping = {v: k for k, v in mapping.items()}
+        
+        opts_html = '<ul style="list-style:none; padding-left:0; margin: 10px 0;">'
+        for i, opt in enumerate(q['opts']):
+            letter = inv_mapping.get(i)
+            box = "[ &nbsp; ]"
+            if letter in q['ans']: box = "[ X ]"
+            elif letter in u_ans_letters: box = "[ x ]"
+            
+            line_style = "margin-bottom: 4px; font-size: 10pt;"
+            if letter in q['ans']: line_style += " color: #27ae60; font-weight: bold;"
+            elif letter in u_ans_letters: line_style += " color: #e74c3c;"
+            opts_html += f'<li style="{line_style}">{box} {letter}. {opt}</li>'
+        opts_html += "</ul>"
+
+        rows += f"""
+        <div style="margin-bottom: 30px; border-left: 6px solid {color}; padding: 15px 20px; background: #fff; box-shadow: 0 2px 4px rgba(0,0,0,0.02); border-radius: 0 8px 8px 0; page-break-inside: avoid;">
+            <p style="font-family: 'Georgia', serif; font-weight:bold; font-size:12pt; margin-bottom:10px; color:#1a1a1a;">Q{idx+1}. {q['text']} {is_correct}</p>
+            {opts_html}
+            <div style="margin-top: 15px; border-top: 1px dashed #eee; padding-top: 10px;">
+                <p style="font-family: 'Georgia', serif; font-size: 10.5pt; margin: 5px 0;"><strong>Votre sélection :</strong> <span style="color:{color}; font-weight:bold;">{u_ans_letters if u_ans_letters else "AUCUNE"}</span></p>
+                <div style="font-family: 'Georgia', serif; font-size: 10pt; color: #444; background: #fdfdfd; padding: 12px; border: 1px solid #f0f0f0; border-radius: 6px; margin-top: 8px; line-height: 1.5;">
+                    💡 <strong>Explication :</strong> <span style="font-style: italic;">{q['expl']}</span>
+                </div>
+            </div>
+        </div>
+        """
+    
+    html = f"""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="UTF-8"><title>Résultats {title}</title>
+<style>
+    body {{ font-family: 'Georgia', serif; padding: 40px; color: #333; }}
+    h1 {{ color: #2c3e50; text-align: center; border-bottom: 2px solid #2c3e50; }}
+    .header-box {{ background: #f8f9fa; padding: 15px; border: 1px solid #ddd; margin-bottom: 30px; border-radius: 8px; }}
+    .score-box {{ background: #eef9f0; border: 2px solid #27ae60; padding: 20px; text-align: center; font-size: 18pt; margin-bottom: 30px; border-radius: 8px; }}
+</style></head><body>
+    <div style="max-width: 900px; margin: auto;">
+        <h1>Rapport d'Examen : {title}</h1>
+        <div class="header-box">
+            <p><strong>Candidat :</strong> {name}{user_id}</p>
+            <p><strong>Date de passage :</strong> {now}</p>
+            {warnings_html}
+        </div>
+        <div class="score-box">Score Final : <strong>{score} / {len(questions)}</strong> ({(score/len(questions)*100):.1f}%)</div>
+        <hr style="border: 0; border-top: 2px solid #eee; margin-bottom: 40px;">
+        {rows}
+    </div>
+</body></html>"""
+    return html
+
+
+# --- Banques synthétiques ---
+
+def make_qcm(n, n_opts=5):
+    rng = random.Random(n)
+    lines = ["Question|" + "|".join(LETTERS[:n_opts]) + "|Réponse|Explication"]
+    for i in range(n):
+        opts = [f"Option {l} de la question {i} <b>importante</b>" for l in LETTERS[:n_opts]]
+        ans = "".join(sorted(rng.sample(LETTERS[:n_opts], rng.choice((1, 1, 2)))))
+        lines.append(f"Question {i} : quel énoncé est exact ?|" + "|".join(opts) + f"|{ans}|Parce que {i} est pair ou impair.")
+    return "\n".join(lines)
+
+
+def make_pairs(n):
+    lines = ["Question|Réponse"]
+    lines += [f"Concept numéro {i}|Définition détaillée du concept {i}, avec un <i>exemple</i>." for i in range(n)]
+    return "\n".join(lines)
+
+
+_DATE = re.compile(r'(Date de passage :</strong> )[^<]*')
+
+
+def check_equivalence():
+    """Les nouveaux rendus doivent produire exactement le même HTML."""
+    qcm, pairs = make_qcm(200), make_pairs(200)
+    for n in (0, 1, 2, 3, 4, 7, 200):
+        assert legacy_answer_sheet(n) == render_answer_sheet(n), n
+    variants = [dict(mode=m, add_qr=qr, add_sheet=sh, use_columns=col)
+                for m in ("Examen", "Révision") for qr in (True, False) for sh in (True, False) for col in (True, False)]
+    for kw in variants:
+        assert legacy_html_content(qcm, "Titre", **kw) == render_print_html(qcm, "Titre", **kw), kw
+    for q_type in ("Questions / Réponses", "Glossaire (Concept | Définition)"):
+        for open_all in (True, False):
+            assert (legacy_html_content(pairs, "T", True, q_type=q_type, open_all=open_all)
+                    == render_print_html(pairs, "T", True, q_type=q_type, open_all=open_all)), q_type
+    # Le mélange passe par shuffle_engine : même graine, même copie que le rendu de la copie mélangée
+    for q_type, content in (("QCM Classique", qcm), ("Questions / Réponses", pairs)):
+        shuffled, _ = shuffle_questions(parse_bank(content, q_type).questions, 7)
+        expected = render_print_document(shuffled, "T", False, q_type=q_type)
+        assert expected == render_print_html(content, "T", False, shuffle_q=True, shuffle_o=True, q_type=q_type, seed=7)
+    for content in (pairs, pairs + "\n\nligne seule\n", 'a|"b|c"\r\nd|e', ""):
+        assert legacy_qa_html(content, "T") == render_qa_html(content, "T")
+        assert legacy_def_html(content, "T") == render_def_html(content, "T")
+    questions = parse_bank(qcm).questions
+    answers = {i: q['ans'] if i % 3 else "A" for i, q in enumerate(questions) if i % 5}
+    for identity, warnings in ((None, 0), ({'prenom': 'Sara', 'nom': 'Idrissi', 'id': '42'}, 3)):
+        old = legacy_result_report(questions, answers, 120, "Examen", identity, warnings)
+        new = render_result_report(questions, answers, 120, "Examen", identity, warnings)
+        assert _DATE.sub(r'\1', old) == _DATE.sub(r'\1', new)
+
+
+def measure(fn, repeat):
+    best = min(timeit.repeat(fn, number=1, repeat=repeat))
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024 / 1024
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 2000, 5000, 10000]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    check_equivalence()
+    print("Sorties identiques (QCM, QA, glossaire, feuille de réponses, rapport).\n")
+    print(f"{'rendu':<14}{'questions':>10}{'ancien ms':>12}{'nouveau ms':>12}{'gain':>7}{'ancien Mo':>11}{'nouveau Mo':>12}")
+    for n in sizes:
+        qcm, pairs = make_qcm(n), make_pairs(n)
+        bank = parse_bank(qcm)
+        questions = bank.questions
+        answers = {i: q['ans'] for i, q in enumerate(questions) if i % 2}
+        cases = [
+            ("examen", lambda: legacy_html_content(qcm, "T", True, bank=bank),
+             lambda: render_print_html(qcm, "T", True, bank=bank)),
+            ("révision", lambda: legacy_html_content(qcm, "T", True, mode="Révision", bank=bank),
+             lambda: render_print_html(qcm, "T", True, mode="Révision", bank=bank)),
+            ("qa", lambda: legacy_qa_html(pairs, "T"), lambda: render_qa_html(pairs, "T")),
+            ("glossaire", lambda: legacy_def_html(pairs, "T"), lambda: render_def_html(pairs, "T")),
+            ("rapport", lambda: legacy_result_report(questions, answers, 1, "T"),
+             lambda: render_result_report(questions, answers, 1, "T")),
+        ]
+        for label, old, new in cases:
+            old_ms, old_mb = measure(old, repeat)
+            new_ms, new_mb = measure(new, repeat)
+            print(f"{label:<14}{n:>10}{old_ms:>12.1f}{new_ms:>12.1f}{old_ms / new_ms:>6.1f}x{old_mb:>11.1f}{new_mb:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark de la recherche de modules : LIKE historique contre FTS5.
+
+Peuple une base temporaire de 50k modules (200 thèmes, français et arabe),
+applique les migrations puis mesure la latence moyenne de recherche.
+
+Usage : python benchmarks/bench_search.py [nb_modules] [nb_requêtes]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_engine import (CONNECTION_PRAGMAS, apply_migrations, count_search_modules,  # noqa: E402
+                       module_search_text, search_modules)
+
+SYLLABLES = "ba be bi bo cal cel che co da de di dro é en es fa fi ga gé in la le li ma me mi mo na ne no pa pe po ra re ri ro sa se si ta te ti to tra tri va ve vi".split()
+ARABIC = "الكِتَابُ المَدْرَسَة الطَّالِب العِلْم الدَّرْس الاِمْتِحَان الجُغْرَافِيَا التَّارِيخ الاِقْتِصَاد الأَحْيَاء".split()
+TYPES = ["QCM", "QCM_JS", "QA", "DEF"]
+N_TOPICS = 200
+# Un terme rare, un mot de thème, un préfixe en cours de frappe, deux mots, de l'arabe, et un
+# mot présent dans presque tous les modules (pire cas : le classement bm25 est borné par RANK_WINDOW)
+QUERIES = ["mitochondrie", "sujet7", "sujet1", "mitoch", "cellule energie", "الكتاب", "التاريخ", "question"]
+
+LEGACY_SQL = ("SELECT id, name, category, type, content, created_at FROM educational_modules "
+              "WHERE (name LIKE ? OR category LIKE ?) ORDER BY created_at DESC LIMIT 20")
+
+
+def make_vocabulary(rnd, n=3000):
+    return ["".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))) for _ in range(n)]
+
+
+def sentence(rnd, vocab, topic, n):
+    # Vocabulaire de Zipf commun + mots propres au thème du module
+    words = [vocab[min(int(rnd.paretovariate(1.1)) - 1, len(vocab) - 1)] for _ in range(n)]
+    words[rnd.randrange(n)] = rnd.choice(topic)
+    return " ".join(words)
+
+
+def make_module(rnd, vocab, topics, i):
+    topic = topics[rnd.randrange(len(topics))]
+    m_type = rnd.choice(TYPES)
+    if m_type in ("QCM", "QCM_JS"):
+        lines = ["Question|A|B|C|D|E|F|Réponse|Explication"]
+        for _ in range(10):
+            opts = [sentence(rnd, vocab, topic, 2) for _ in range(4)] + ["", ""]
+            lines.append("|".join(["question " + sentence(rnd, vocab, topic, 8) + " ?", *opts,
+                                   rnd.choice("ABCD"), sentence(rnd, vocab, topic, 10)]))
+    else:
+        lines = ["Question|Réponse"] + [f"question {sentence(rnd, vocab, topic, 6)}|{sentence(rnd, vocab, topic, 8)}"
+                                        for _ in range(10)]
+    content = "\n".join(lines)
+    return (f"{topic[0]} {sentence(rnd, vocab, topic, 2)} {i}", rnd.choice(["Biologie", "Maths", "Gestion", "Histoire", "Général"]),
+            m_type, content, f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", module_search_text(content, m_type))
+
+
+def make_topics(rnd, vocab):
+    topics = [[f"sujet{t}"] + rnd.sample(vocab, 20) for t in range(N_TOPICS)]
+    topics[0] += ["mitochondrie", "cellule", "énergie"]
+    topics[1] += ARABIC
+    return topics
+
+
+def timed(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        result = fn()
+    return (time.perf_counter() - start) / n * 1000, result
+
+
+def main():
+    n_modules = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rnd = random.Random(42)
+    vocab = make_vocabulary(rnd)
+    topics = make_topics(rnd, vocab)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        apply_migrations(conn)
+        start = time.perf_counter()
+        conn.executemany("INSERT INTO educational_modules (name, category, type, content, created_at, search_text) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (make_module(rnd, vocab, topics, i) for i in range(n_modules)))
+        conn.commit()
+        print(f"{n_modules} modules indexés en {time.perf_counter() - start:.1f}s")
+
+        print(f"{'Recherche':24} {'LIKE (ms)':>10} {'FTS5 (ms)':>10} {'total':>8} {'résultats LIKE/FTS':>20}")
+        for q in QUERIES:
+            like_ms, like_rows = timed(lambda: conn.execute(LEGACY_SQL, (f"%{q}%", f"%{q}%")).fetchall(), n_queries)
+            fts_ms, fts_rows = timed(lambda: search_modules(conn, q, limit=20), n_queries)
+            count_ms, total = timed(lambda: count_search_modules(conn, q), n_queries)
+            print(f"{q:24} {like_ms:10.2f} {fts_ms:10.2f} {count_ms:8.2f} {len(like_rows):>10}/{len(fts_rows)} ({total})")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Micro-benchmark : mélange par permutations (shuffle_engine, exam_engine) vs anciens mélanges de qcm_web_app.
+
+Les anciennes implémentations (quiz JS : recherche de lettre ; quiz Streamlit :
+comparaison de textes) sont recopiées ici telles quelles, car importer
+qcm_web_app lance l'application Streamlit.
+
+Usage : python benchmarks/bench_shuffle.py [nb_questions] [nb_copies]
+"""
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qcm_parser import parse_bank  # noqa: E402
+from exam_engine import plan_variants, write_exam_variants  # noqa: E402
+from shuffle_engine import generate_variants, shuffle_questions, verify_shuffle  # noqa: E402
+
+
+# --- Anciennes implémentations (copie de référence) ---
+
+def legacy_js_shuffle(questions):
+    shuffled_questions = []
+    for q in questions:
+        q_copy = q.copy()
+        options_with_letters = [(chr(65 + i), opt) for i, opt in enumerate(q['opts'])]
+        random.shuffle(options_with_letters)
+        new_letters = [item[0] for item in options_with_letters]
+        q_copy['opts'] = [item[1] for item in options_with_letters]
+        correct_answers = list(q['ans'])
+        new_correct = ''.join([chr(65 + new_letters.index(old_letter))
+                               for old_letter in correct_answers if old_letter in new_letters])
+        q_copy['ans'] = new_correct
+        shuffled_questions.append(q_copy)
+    random.shuffle(shuffled_questions)
+    return shuffled_questions
+
+
+def legacy_quiz_shuffle(questions):
+    questions = random.sample(questions, len(questions))
+    for q_item in questions:
+        if len(q_item['opts']) > 1:
+            original_ans_letters = list(q_item['ans'])
+            letters = ['A', 'B', 'C', 'D', 'E', 'F']
+            correct_texts = [q_item['opts'][letters.index(l)] for l in original_ans_letters if letters.index(l) < len(q_item['opts'])]
+            random.shuffle(q_item['opts'])
+            new_ans_letters = []
+            for i, opt_text in enumerate(q_item['opts']):
+                if opt_text in correct_texts:
+                    new_ans_letters.append(letters[i])
+            q_item['ans'] = "".join(sorted(new_ans_letters))
+    return questions
+
+
+def make_bank(n, seed=0):
+    """Banque de n questions à 6 options ; une sur dix a deux options identiques (« Aucune »)."""
+    rnd = random.Random(seed)
+    lines = ["Question|A|B|C|D|E|F|Réponse|Explication"]
+    for i in range(n):
+        ans = "".join(sorted(rnd.sample("ABCDEF", rnd.choice([1, 1, 2]))))
+        opts = [f"Option {l} de la question {i}" for l in "ABCDEF"]
+        if i % 10 == 0:
+            opts[4] = opts[5] = "Aucune"
+        lines.append(f"Question {i} : quel énoncé est correct ?|{'|'.join(opts)}|{ans}|Explication {i}.")
+    return "\n".join(lines)
+
+
+def copies(questions):
+    return [dict(q, opts=list(q['opts'])) for q in questions]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    questions = parse_bank(make_bank(n)).questions
+
+    # Les doublons faussent l'ancien remappage par texte, pas les permutations
+    expected = {q['text']: len(q['ans']) for q in questions}
+    broken = 0
+    for k in range(count):
+        shuffled, shuffle = shuffle_questions(questions, k)
+        assert not verify_shuffle(questions, shuffled, shuffle), "réponses faussées par les permutations"
+        broken += sum(1 for q in legacy_quiz_shuffle(copies(questions)) if len(q['ans']) != expected[q['text']])
+    print(f"Copies dont une réponse est faussée par l'ancien remappage par texte : {broken} question(s) sur {count * n}")
+
+    for name, fn in (("ancien quiz JS", lambda: [legacy_js_shuffle(questions) for _ in range(count)]),
+                     ("ancien quiz Streamlit", lambda: [legacy_quiz_shuffle(copies(questions)) for _ in range(count)]),
+                     ("permutations", lambda: generate_variants(questions, count, "bench", verify=False)),
+                     ("permutations + vérification", lambda: generate_variants(questions, count, "bench")),
+                     # Chemin des copies d'examen de l'application, rendu HTML exclu
+                     ("copies d'examen (ZIP + corrigé)", lambda: write_exam_variants(
+                         io.BytesIO(), questions, plan_variants("bench", count), lambda shuffled, variant: ""))):
+        start = time.perf_counter()
+        fn()
+        print(f"{name} - {count} copies de {n} questions : {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    first = generate_variants(questions, 3, "bench")
+    assert [s.order for _, s in first] == [s.order for _, s in generate_variants(questions, 3, "bench")], \
+        "variantes non reproductibles"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""Infrastructure SQLite : pool de connexions, réglages (PRAGMA), migrations et recherche.
+
+Les helpers db_* de l'application empruntent une connexion au pool le temps
+d'un bloc `with db_context()` au lieu d'ouvrir/fermer un fichier à chaque
+appel. La base passe en WAL : les lectures ne bloquent plus l'écriture des
+progressions et inversement.
+"""
+import atexit
+import logging
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from qcm_parser import parse_bank, search_document
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_MS = 5000
+
+# Appliqués à chaque nouvelle connexion
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",        # ~16 Mo de cache de pages
+    "PRAGMA mmap_size=268435456",      # 256 Mo mappés en mémoire
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class SQLitePool:
+    """Pool de connexions SQLite réutilisables, une connexion par thread à la fois.
+
+    Un bloc connection() imbriqué dans le même thread réutilise la connexion
+    déjà empruntée. Au retour, la connexion rejoint le pool (au plus max_idle).
+    """
+
+    def __init__(self, path, max_idle=8):
+        self.path = path
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.checkouts = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.reused += 1
+        except queue.Empty:
+            conn = self._connect()
+        with self._lock:
+            self.checkouts += 1
+        return conn
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._idle.qsize() < self.max_idle:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Emprunte une connexion pour la durée du bloc."""
+        current = getattr(self._local, "conn", None)
+        if current is not None:
+            yield current
+            return
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close_all(self):
+        """Ferme les connexions au repos (appelé à l'arrêt du processus, voir get_pool)."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        """Compteurs de réutilisation pour le tableau de bord."""
+        with self._lock:
+            return {"created": self.created, "reused": self.reused,
+                    "checkouts": self.checkouts, "idle": self._idle.qsize()}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path):
+    """Pool partagé par le processus pour ce fichier de base.
+
+    Streamlit ré-exécute le script à chaque interaction : un pool créé au
+    niveau du script serait recréé, donc vide, à chaque relance. Les
+    connexions au repos sont fermées à l'arrêt du processus.
+    """
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = SQLitePool(path)
+                atexit.register(pool.close_all)
+    return pool
+
+
+# --- LECTURE PAR LOTS (exports) ---
+EXPORT_BATCH = 1000
+
+
+def iter_rows(conn, query, params=(), batch=EXPORT_BATCH):
+    """(colonnes, générateur de lignes) d'une requête lue par lots via fetchmany, sans tout charger."""
+    c = conn.cursor()
+    c.execute(query, params)
+    columns = [d[0] for d in c.description]
+
+    def rows():
+        while True:
+            chunk = c.fetchmany(batch)
+            if not chunk:
+                return
+            yield from chunk
+    return columns, rows()
+
+
+# --- RECHERCHE PLEIN TEXTE (FTS5) ---
+# unicode61 retire déjà les accents latins (remove_diacritics 2) mais traite les
+# harakat arabes comme des séparateurs (« كِتَاب » devient « ك ت اب »). On les
+# retire donc avant indexation : en Python pour le corps, en SQL (replace
+# imbriqués) dans les triggers pour le nom et la catégorie.
+ARABIC_FOLDS = (
+    [(chr(c), "") for c in range(0x064B, 0x0653)]  # fathatan … soukoun
+    + [("ٰ", ""), ("ـ", "")]              # alif suscrit, tatweel
+    + [("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا")]
+)
+_FOLD_TABLE = str.maketrans({src: dst for src, dst in ARABIC_FOLDS})
+_SEARCH_TOKEN = re.compile(r'\w+')
+
+# Poids bm25 des colonnes (name, category, body) : un titre qui correspond pèse plus
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+SNIPPET_OPEN, SNIPPET_CLOSE = "\x02", "\x03"
+# Colonnes des lignes de modules : complètes, ou métadonnées seules (listes, sans le CSV)
+MODULE_COLUMNS = ("id", "name", "category", "type", "content", "created_at")
+MODULE_META_COLUMNS = ("id", "name", "category", "type", "created_at", "question_count")
+# Nombre de correspondances récentes classées par bm25 (au-delà : ordre chronologique)
+RANK_WINDOW = 1000
+
+
+def fold_search_text(text):
+    """Normalise un texte arabe pour l'index (harakat, tatweel, variantes d'alif)."""
+    return (text or "").translate(_FOLD_TABLE)
+
+
+def fold_sql(expr):
+    """Équivalent SQL de fold_search_text() appliqué à une expression."""
+    for src, dst in ARABIC_FOLDS:
+        expr = f"replace({expr}, '{src}', '{dst}')"
+    return expr
+
+
+def module_search_text(content, m_type):
+    """Valeur de la colonne educational_modules.search_text pour un module."""
+    return fold_search_text(search_document(content or "", m_type or "QCM"))
+
+
+def module_index_fields(content, m_type):
+    """(search_text, question_count) d'un module, en une seule passe de parsing."""
+    bank = parse_bank(content or "", m_type or "QCM")
+    return fold_search_text(search_document(content or "", m_type or "QCM", bank)), bank.total
+
+
+def fts_match_expression(query):
+    """Traduit une saisie libre en requête MATCH sûre (mots en ET, préfixe sur le dernier)."""
+    tokens = _SEARCH_TOKEN.findall(fold_search_text(query))
+    if not tokens:
+        return ""
+    terms = [f'"{t}"' for t in tokens[:-1]]
+    # Préfixe seulement à partir de 2 caractères (index prefix='2 3')
+    terms.append(f'"{tokens[-1]}"*' if len(tokens[-1]) >= 2 else f'"{tokens[-1]}"')
+    return " ".join(terms)
+
+
+def _fts_row_values(prefix):
+    return f"{prefix}.id, {fold_sql(prefix + '.name')}, {fold_sql(prefix + '.category')}, COALESCE({prefix}.search_text, '')"
+
+
+def _backfill_search_text(conn):
+    rows = conn.execute("SELECT id, type, content FROM educational_modules").fetchall()
+    conn.executemany("UPDATE educational_modules SET search_text = ? WHERE id = ?",
+                     [(module_search_text(content, m_type), m_id) for m_id, m_type, content in rows])
+
+
+def _backfill_question_count(conn):
+    rows = conn.execute("SELECT id, type, content FROM educational_modules").fetchall()
+    conn.executemany("UPDATE educational_modules SET question_count = ? WHERE id = ?",
+                     [(parse_bank(content or "", m_type or "QCM").total, m_id) for m_id, m_type, content in rows])
+
+
+def _match_filter(m_type):
+    """Clause FROM/WHERE commune aux requêtes de recherche (filtre de type optionnel)."""
+    if m_type:
+        return ("FROM modules_fts JOIN educational_modules m ON m.id = modules_fts.rowid "
+                "WHERE modules_fts MATCH ? AND m.type = ?")
+    return "FROM modules_fts WHERE modules_fts MATCH ?"
+
+
+def search_modules(conn, query, m_type=None, limit=20, offset=0, columns=MODULE_COLUMNS):
+    """Modules classés par pertinence : colonnes demandées puis extrait.
+
+    Seuls les RANK_WINDOW modules les plus récents qui correspondent sont classés
+    par bm25 ; les plus anciens suivent par date. Le coût reste ainsi borné même
+    pour un terme présent dans presque toute la base. L'extrait marque les termes
+    trouvés entre SNIPPET_OPEN et SNIPPET_CLOSE.
+    """
+    match = fts_match_expression(query)
+    if not match:
+        return []
+    base = _match_filter(m_type)
+    params = [match, m_type] if m_type else [match]
+    limit = limit if limit else -1
+    offset = offset or 0
+
+    row = conn.execute(f"SELECT modules_fts.rowid {base} ORDER BY modules_fts.rowid DESC LIMIT 1 OFFSET ?",
+                       params + [RANK_WINDOW - 1]).fetchone()
+    floor = row[0] if row else 0
+    weights = ", ".join(map(str, FTS_WEIGHTS))
+    ids = [r[0] for r in conn.execute(
+        f"SELECT modules_fts.rowid {base} AND modules_fts.rowid >= ? ORDER BY bm25(modules_fts, {weights}) LIMIT ? OFFSET ?",
+        params + [floor, limit, offset])]
+    if floor and (limit < 0 or len(ids) < limit):
+        remaining = -1 if limit < 0 else limit - len(ids)
+        ids += [r[0] for r in conn.execute(
+            f"SELECT modules_fts.rowid {base} AND modules_fts.rowid < ? ORDER BY modules_fts.rowid DESC LIMIT ? OFFSET ?",
+            params + [floor, remaining, max(0, offset - RANK_WINDOW)])]
+    if not ids:
+        return []
+
+    # Extraits en une passe bornée par l'intervalle des ids (le « + » empêche
+    # SQLite de transformer l'IN en une recherche par id, chacune re-parcourant l'index)
+    placeholders = ",".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT {', '.join('m.' + col for col in columns)}, "
+        f"snippet(modules_fts, -1, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', '…', 12) "
+        f"FROM modules_fts JOIN educational_modules m ON m.id = modules_fts.rowid "
+        f"WHERE modules_fts MATCH ? AND modules_fts.rowid BETWEEN ? AND ? AND +modules_fts.rowid IN ({placeholders})",
+        [match, min(ids), max(ids)] + ids).fetchall()
+    by_id = {r[0]: r for r in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def count_search_modules(conn, query, m_type=None):
+    """Nombre de modules correspondant à la recherche."""
+    match = fts_match_expression(query)
+    if not match:
+        return 0
+    params = (match, m_type) if m_type else (match,)
+    return conn.execute(f"SELECT COUNT(*) {_match_filter(m_type)}", params).fetchone()[0]
+
+
+# --- MIGRATIONS ---
+# Chaque migration porte la base à la version indiquée (PRAGMA user_version).
+# Une étape est soit une requête SQL, soit une fonction recevant la connexion.
+# Ne jamais modifier une migration publiée : en ajouter une nouvelle.
+MIGRATIONS = [
+    (1, "Schéma initial", [
+        """CREATE TABLE IF NOT EXISTS users
+           (email TEXT PRIMARY KEY, nom TEXT, prenom TEXT, user_id TEXT)""",
+        """CREATE TABLE IF NOT EXISTS history
+           (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT, course TEXT, score INTEGER, total INTEGER, date TEXT)""",
+        """CREATE TABLE IF NOT EXISTS educational_modules
+           (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, category TEXT, type TEXT, content TEXT, created_at TEXT)""",
+        """CREATE TABLE IF NOT EXISTS quiz_progress
+           (email TEXT, module_name TEXT, current_idx INTEGER, answers TEXT, last_updated TEXT,
+            PRIMARY KEY(email, module_name))""",
+        """CREATE TABLE IF NOT EXISTS favorites
+           (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT, module_name TEXT, question_text TEXT,
+            options TEXT, answer TEXT, explanation TEXT, created_at TEXT)""",
+    ]),
+    (2, "Index couvrants des requêtes fréquentes", [
+        # db_get_modules_status : WHERE email, course, MAX(score) (score/total lus dans l'index)
+        "CREATE INDEX IF NOT EXISTS idx_history_email_course_score ON history(email, course, score DESC, total)",
+        # db_get_history : WHERE email ORDER BY date DESC
+        "CREATE INDEX IF NOT EXISTS idx_history_email_date ON history(email, date)",
+        # db_toggle_favorite : WHERE email AND question_text (id = rowid, donc couvert)
+        "CREATE INDEX IF NOT EXISTS idx_favorites_email_question ON favorites(email, question_text)",
+        # db_list_modules : WHERE type ORDER BY created_at DESC
+        "CREATE INDEX IF NOT EXISTS idx_modules_type_created ON educational_modules(type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_modules_created ON educational_modules(created_at)",
+        "ANALYZE",
+    ]),
+    (3, "Recherche plein texte FTS5 des modules", [
+        "ALTER TABLE educational_modules ADD COLUMN search_text TEXT",
+        _backfill_search_text,
+        """CREATE VIRTUAL TABLE IF NOT EXISTS modules_fts USING fts5(
+               name, category, body,
+               tokenize = 'unicode61 remove_diacritics 2',
+               prefix = '2 3')""",
+        f"INSERT INTO modules_fts(rowid, name, category, body) SELECT {_fts_row_values('educational_modules')} FROM educational_modules",
+        f"""CREATE TRIGGER IF NOT EXISTS modules_fts_ai AFTER INSERT ON educational_modules BEGIN
+               INSERT INTO modules_fts(rowid, name, category, body) VALUES ({_fts_row_values('new')});
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS modules_fts_ad AFTER DELETE ON educational_modules BEGIN
+               DELETE FROM modules_fts WHERE rowid = old.id;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS modules_fts_au AFTER UPDATE OF name, category, search_text ON educational_modules BEGIN
+               DELETE FROM modules_fts WHERE rowid = old.id;
+               INSERT INTO modules_fts(rowid, name, category, body) VALUES ({_fts_row_values('new')});
+           END""",
+    ]),
+    (4, "Listes de modules sans le contenu CSV", [
+        "ALTER TABLE educational_modules ADD COLUMN question_count INTEGER DEFAULT 0",
+        _backfill_question_count,
+        # Index couvrants : created_at est stocké après content, le lire dans la table
+        # obligerait à parcourir les pages de débordement du CSV.
+        "DROP INDEX IF EXISTS idx_modules_type_created",
+        "DROP INDEX IF EXISTS idx_modules_created",
+        "CREATE INDEX IF NOT EXISTS idx_modules_list_type ON educational_modules(type, created_at, name, category, question_count)",
+        "CREATE INDEX IF NOT EXISTS idx_modules_list ON educational_modules(created_at, type, name, category, question_count)",
+        "ANALYZE",
+    ]),
+    (5, "Mélange du quiz sauvegardé avec la progression", [
+        # JSON {"seed", "q", "o"} : la reprise refait exactement la même copie
+        "ALTER TABLE quiz_progress ADD COLUMN shuffle TEXT",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn, migrations=MIGRATIONS, target=None):
+    """Met la base à jour sur place ; chaque migration est atomique. Retourne la version finale."""
+    version = get_schema_version(conn)
+    for mig_version, description, steps in migrations:
+        if mig_version <= version or (target is not None and mig_version > target):
+            continue
+        logger.info(f"Migration BD v{mig_version} : {description}")
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(mig_version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Échec de la migration v{mig_version}, base laissée en v{version}")
+            raise
+        version = mig_version
+    return version
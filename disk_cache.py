@@ -0,0 +1,129 @@
+"""Cache disque clé → octets, borné en taille avec éviction LRU.
+
+Chaque entrée est un fichier du répertoire de cache ; la date de modification
+sert d'horodatage d'accès (rafraîchie à chaque lecture). Les écritures sont
+atomiques (fichier temporaire puis os.replace) pour supporter plusieurs
+sessions Streamlit en parallèle.
+"""
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_SAFE_KEY = re.compile(r'[^A-Za-z0-9._-]')
+
+
+class DiskCache:
+    """Cache persistant LRU borné à max_bytes."""
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, suffix=".bin"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, _SAFE_KEY.sub('_', key) + self.suffix)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def _current_size(self):
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    @staticmethod
+    def _touch(path):
+        # Horodatage explicite : certains systèmes de fichiers ont une horloge
+        # trop grossière pour départager des accès rapprochés.
+        now = time.time()
+        os.utime(path, (now, now))
+
+    def get(self, key):
+        """Octets en cache pour la clé, ou None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            self._touch(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Enregistre les octets puis évince les entrées les plus anciennes si besoin."""
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        with self._lock:
+            self._current_size()
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            tmp_path = None
+            self._touch(path)
+        except OSError as e:
+            # Le fichier temporaire n'est ni compté ni évincé : il ne doit pas rester
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            logger.warning(f"Cache disque {self.directory} : écriture impossible ({e})")
+            return
+        with self._lock:
+            self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        for _, size, name in sorted(self._entries()):
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for _, _, name in self._entries():
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {"bytes": self._current_size(), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,86 @@
+"""Copies d'examen personnalisées, générées en lot.
+
+Une copie par variante (N copies numérotées ou une par candidat d'une liste) :
+questions et options mélangées avec la graine de la variante (shuffle_engine),
+contrôlées contre le corrigé d'origine, puis rendues et converties en PDF sur
+un pool de workers. Le ZIP contient un fichier par copie et un corrigé
+consolidé (CSV, une ligne par variante). Les copies sont écrites dans le ZIP
+dès qu'elles sont prêtes (export_engine.iter_completed) : seules celles en
+cours de rendu restent en mémoire.
+"""
+import csv
+import io
+import zipfile
+from dataclasses import dataclass
+
+from export_engine import bundle_filename, iter_completed
+from shuffle_engine import answer_keys, derive_seed, student_seed, verified_shuffle
+
+MAX_VARIANTS = 1000
+ANSWER_KEY_NAME = "corrige.csv"
+
+
+@dataclass
+class ExamVariant:
+    """Une copie : identifiant (V001…), candidat éventuel et graine du mélange."""
+    variant_id: str
+    student: str
+    seed: int
+
+    @property
+    def label(self):
+        return f"{self.variant_id} · {self.student}" if self.student else self.variant_id
+
+
+def plan_variants(module, count=0, roster=None, base_seed=None):
+    """Variantes à produire : une par candidat de roster, sinon count copies numérotées.
+
+    Un candidat reçoit la graine student_seed(candidat, module), celle du quiz
+    en ligne pour le même identifiant : sa copie est reproductible.
+    """
+    students = [s.strip() for s in roster or [] if s.strip()]
+    total = len(students) or count
+    if total > MAX_VARIANTS:
+        raise ValueError(f"{total} copies demandées (maximum {MAX_VARIANTS}).")
+    width = max(3, len(str(total)))
+    if students:
+        return [ExamVariant(f"V{k:0{width}d}", s, student_seed(s, module)) for k, s in enumerate(students, 1)]
+    base = module if base_seed is None else base_seed
+    return [ExamVariant(f"V{k:0{width}d}", "", derive_seed(base, k)) for k in range(1, total + 1)]
+
+
+def write_exam_variants(target, questions, variants, render, convert=None, workers=4,
+                        shuffle_q=True, shuffle_o=True, progress=None):
+    """Écrit les copies et le corrigé dans le ZIP target (chemin ou fichier) ; retourne le nombre de copies.
+
+    render(questions_mélangées, variante) produit le HTML d'une copie ;
+    convert(html) le convertit (PDF), sinon la copie est gardée en HTML.
+    Une copie dont le corrigé ne survit pas au mélange lève une ValueError.
+    """
+    keys = answer_keys(questions)
+    ext = ".pdf" if convert else ".html"
+
+    def build(variant):
+        shuffled, shuffle = verified_shuffle(questions, variant.seed, shuffle_q, shuffle_o, keys,
+                                             f"Copie {variant.variant_id}")
+        html = render(shuffled, variant)
+        row = [variant.variant_id, variant.student, variant.seed, " ".join(str(i + 1) for i in shuffle.order)]
+        return row + [q['ans'] for q in shuffled], convert(html) if convert else html
+
+    rows, used = {}, set()
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+        for (index, variant), future in iter_completed(lambda item: build(item[1]), enumerate(variants),
+                                                       workers, name="exam"):
+            rows[index], data = future.result()
+            zf.writestr(bundle_filename(variant.label.replace(" · ", "_"), used, ext), data)
+            if progress:
+                progress(len(rows), len(variants))
+
+        header = ["Variante", "Candidat", "Graine", "Ordre"] + [f"Q{i}" for i in range(1, len(questions) + 1)]
+        out = io.StringIO()
+        writer = csv.writer(out, delimiter=';')
+        writer.writerow(header)
+        writer.writerows(rows[i] for i in sorted(rows))
+        # BOM : Excel ouvre le corrigé avec les accents corrects
+        zf.writestr(ANSWER_KEY_NAME, out.getvalue().encode("utf-8-sig"))
+    return len(rows)
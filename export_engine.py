@@ -0,0 +1,187 @@
+"""Exports groupés de modules.
+
+Le pack hors-ligne est un ZIP consultable sans connexion : une page HTML par
+module, un index, et les CSS/JS du quiz et des synthèses écrits une seule
+fois dans assets/ au lieu d'être recopiés dans chaque page.
+
+L'archive des modules (sources, HTML, PDF) est produite en flux : les modules
+sont lus au fur et à mesure, rendus sur un pool de threads avec un nombre
+borné de rendus en vol, et chaque fichier est écrit dans le ZIP dès qu'il est
+prêt. La mémoire ne dépend pas du nombre de modules de la base.
+
+Les exports de la base (Excel, CSV compressé) consomment de même des lignes
+lues par lots et les écrivent une à une.
+"""
+import csv
+import gzip
+import io
+import logging
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from render_engine import SHARED_ASSETS, compile_template
+
+logger = logging.getLogger(__name__)
+
+ASSETS_URL = "assets/"
+ARCHIVE_MANIFEST = "modules.csv"
+ARCHIVE_ERRORS = "erreurs.txt"
+# Lignes par feuille Excel, en-tête compris
+XLSX_MAX_ROWS = 1048576
+EXPORT_PROGRESS_EVERY = 5000
+
+TYPE_LABELS = {"QCM": "QCM imprimable", "QCM_JS": "Quiz interactif", "QA": "Questions / Réponses",
+               "DEF": "Glossaire", "SUM": "Synthèse"}
+
+INDEX_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8"><title>{{title}}</title>
+<style>
+    body { font-family: 'Georgia', serif; max-width: 800px; margin: auto; padding: 30px; color: #1e293b; }
+    h1 { border-bottom: 3px solid #3b82f6; padding-bottom: 10px; }
+    li { margin-bottom: 8px; }
+    small { color: #64748b; }
+</style>
+</head>
+<body>
+    <h1>{{title}}</h1>
+    <ul>{{items|join}}</ul>
+</body></html>""")
+INDEX_ITEM = compile_template('<li><a href="{{href}}">{{name}}</a> <small>{{kind}}</small></li>')
+
+
+def bundle_filename(name, used, ext=".html"):
+    """Nom de fichier sûr et unique dans le pack pour un module."""
+    base = re.sub(r'[^\w\-]+', '_', name).strip('_')[:80] or "module"
+    filename, n = f"{base}{ext}", 1
+    while filename in used:
+        n += 1
+        filename = f"{base}_{n}{ext}"
+    used.add(filename)
+    return filename
+
+
+def write_offline_bundle(target, modules, render, title="Modules hors-ligne"):
+    """Écrit le pack dans target (chemin ou fichier) ; retourne le nombre de pages.
+
+    modules : itérable de lignes (id, nom, catégorie, type, ...) ;
+    render(module, assets_url) produit le HTML d'une page, rendue puis écrite
+    aussitôt pour ne garder qu'une page en mémoire.
+    """
+    used, items = set(), []
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in SHARED_ASSETS.items():
+            zf.writestr(ASSETS_URL + name, data)
+        for module in modules:
+            name, m_type = module[1], module[3]
+            filename = bundle_filename(name, used)
+            zf.writestr(filename, render(module, ASSETS_URL))
+            items.append(INDEX_ITEM(href=filename, name=name, kind=TYPE_LABELS.get(m_type, m_type)))
+        zf.writestr("index.html", INDEX_PAGE(title=title, items=items))
+    return len(items)
+
+
+def iter_completed(fn, items, workers=4, in_flight=None, name="export"):
+    """Applique fn aux items sur un pool de threads ; rend (item, future) au fil des fins de tâche.
+
+    Les items sont consommés paresseusement, avec au plus in_flight tâches en
+    vol (2 par worker par défaut) : un itérable de milliers d'éléments ne
+    charge jamais plus que quelques résultats à la fois.
+    """
+    limit = in_flight or 2 * workers
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) as pool:
+        pending, todo = {}, iter(items)
+        while True:
+            for item in todo:
+                pending[pool.submit(fn, item)] = item
+                if len(pending) >= limit:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future
+
+
+def write_module_archive(target, modules, render, workers=4, progress=None):
+    """Écrit l'archive des modules dans target (chemin ou fichier) ; retourne (modules exportés, erreurs).
+
+    modules : itérable paresseux de lignes (id, nom, catégorie, type, contenu) ;
+    render(module) tourne sur le pool et retourne [(dossier, extension, données)].
+    Un module en échec est consigné dans erreurs.txt sans interrompre l'export.
+    """
+    used, manifest, errors = set(), [], []
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+        for module, future in iter_completed(render, modules, workers):
+            m_id, name, category, m_type = module[:4]
+            try:
+                files = future.result()
+            except Exception as e:
+                logger.error(f"Export du module {m_id} ({name}) : {e}")
+                errors.append(f"{name} (id {m_id}) : {e}")
+                continue
+            base = bundle_filename(name, used, ext="")
+            for folder, ext, data in files:
+                zf.writestr(f"{folder}/{base}{ext}", data)
+            manifest.append([m_id, name, category, m_type, " ".join(f"{folder}/{base}{ext}" for folder, ext, _ in files)])
+            if progress:
+                progress(len(manifest) + len(errors))
+
+        out = io.StringIO()
+        writer = csv.writer(out, delimiter=';')
+        writer.writerow(["ID", "Nom", "Catégorie", "Type", "Fichiers"])
+        writer.writerows(sorted(manifest, key=lambda row: row[1].lower()))
+        zf.writestr(ARCHIVE_MANIFEST, out.getvalue().encode("utf-8-sig"))
+        if errors:
+            zf.writestr(ARCHIVE_ERRORS, "\n".join(errors))
+    return len(manifest), errors
+
+
+def write_xlsx(path, sheets, progress=None):
+    """Classeur Excel en mode constant_memory ; retourne le nombre de lignes écrites.
+
+    sheets : itérable de (nom, colonnes, lignes), lignes consommées une à une ;
+    xlsxwriter vide chaque ligne sur disque dès la suivante, la mémoire reste
+    constante. Une table plus longue que la limite d'Excel continue sur
+    « nom (2) », « nom (3) »… progress(lignes écrites) est appelé tous les
+    EXPORT_PROGRESS_EVERY lignes.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_urls": False,
+                                          "strings_to_formulas": False})
+    header_format = workbook.add_format({"bold": True, "border": 1})
+    total = 0
+    try:
+        for name, columns, rows in sheets:
+            sheet, part, r = None, 0, XLSX_MAX_ROWS
+            for row in rows:
+                if r >= XLSX_MAX_ROWS:
+                    part += 1
+                    sheet = workbook.add_worksheet(name if part == 1 else f"{name} ({part})")
+                    sheet.write_row(0, 0, columns, header_format)
+                    r = 1
+                sheet.write_row(r, 0, row)
+                r += 1
+                total += 1
+                if progress and total % EXPORT_PROGRESS_EVERY == 0:
+                    progress(total)
+            if sheet is None:
+                workbook.add_worksheet(name).write_row(0, 0, columns, header_format)
+    finally:
+        workbook.close()
+    return total
+
+
+def write_csv_gz(target, columns, rows):
+    """CSV compressé (gzip) écrit ligne à ligne dans target (fichier binaire) ; retourne le nombre de lignes."""
+    count = 0
+    with gzip.GzipFile(fileobj=target, mode="wb") as gz, io.TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+        writer = csv.writer(text)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
@@ -0,0 +1,271 @@
+"""Extraction du texte des documents de cours (PDF), page par page et en parallèle.
+
+Les gros PDF (syllabus de plusieurs centaines de pages) sont découpés en plages
+de pages réparties sur un pool de processus : PyPDF2 est du Python pur, seuls
+des processus séparés contournent le GIL. Chaque worker ouvre le document une
+fois (initializer) puis extrait les plages qu'on lui confie ; les pages sont
+ensuite réassemblées dans l'ordre. Les workers sont lancés en « spawn » : le
+serveur Streamlit est multi-threadé et un fork pourrait hériter d'un verrou
+tenu par un autre thread. Un compteur partagé, incrémenté à chaque page, sert
+à la progression.
+
+L'OCR des PDF scannés est un pipeline en flux : les pages sont rastérisées par
+petits lots (first_page/last_page) et reconnues par un pool de threads
+(tesseract tourne dans son propre processus, les threads suffisent à occuper
+tous les cœurs). La mémoire reste plate quelle que soit la taille du document.
+En mode hybride, seules les pages sans couche texte exploitable passent par
+l'OCR ; les autres gardent le texte extrait par PyPDF2.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import subprocess
+from dataclasses import dataclass, field
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+
+try:
+    import pytesseract
+    import pdf2image
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+OCR_LANG = 'fra'
+OCR_DPI = 200
+# Pages rastérisées à la fois : au plus deux lots d'images vivent en mémoire
+OCR_BATCH_PAGES = 8
+# Durée max (s) de reconnaissance d'une page
+OCR_TIMEOUT = 120
+
+# Page considérée sans couche texte (scan, diapositive image) sous ce nombre de caractères visibles
+MIN_PAGE_CHARS = 40
+
+# En dessous, le démarrage des processus coûte plus que l'extraction elle-même
+MIN_PAGES_PARALLEL = 24
+# Plages par worker : assez pour équilibrer la charge
+CHUNKS_PER_WORKER = 4
+# Intervalle (s) de relève du compteur de pages pour la progression
+PROGRESS_INTERVAL = 0.2
+
+_worker_reader = None
+_worker_counter = None
+
+
+def _open_reader(file_bytes):
+    return PyPDF2.PdfReader(io.BytesIO(file_bytes))
+
+
+def _page_text(reader, index):
+    try:
+        return reader.pages[index].extract_text() or ""
+    except Exception as e:
+        logger.warning(f"Page {index + 1} illisible : {e}")
+        return ""
+
+
+def _init_worker(file_bytes, counter):
+    global _worker_reader, _worker_counter
+    _worker_reader = _open_reader(file_bytes)
+    _worker_counter = counter
+
+
+def _extract_range(start, stop):
+    texts = []
+    for i in range(start, stop):
+        texts.append(_page_text(_worker_reader, i))
+        with _worker_counter.get_lock():
+            _worker_counter.value += 1
+    return start, texts
+
+
+def page_ranges(n_pages, n_chunks):
+    """Découpe [0, n_pages) en n_chunks plages contiguës de tailles proches."""
+    n_chunks = max(1, min(n_chunks, n_pages))
+    size, extra = divmod(n_pages, n_chunks)
+    ranges, start = [], 0
+    for k in range(n_chunks):
+        stop = start + size + (1 if k < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def default_workers():
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def count_pages(file_bytes):
+    return len(_open_reader(file_bytes).pages)
+
+
+def _extract_sequential(reader, n_pages, progress):
+    pages = []
+    for i in range(n_pages):
+        pages.append(_page_text(reader, i))
+        if progress:
+            progress(i + 1, n_pages)
+    return pages
+
+
+def extract_pdf_pages(file_bytes, max_workers=None, progress=None):
+    """Texte de chaque page, dans l'ordre du document.
+
+    progress(pages_faites, total) est appelé au fil de l'eau (depuis le thread
+    appelant, donc utilisable pour mettre à jour l'UI Streamlit).
+    """
+    reader = _open_reader(file_bytes)
+    n_pages = len(reader.pages)
+    workers = max_workers or default_workers()
+    if workers < 2 or n_pages < MIN_PAGES_PARALLEL:
+        return _extract_sequential(reader, n_pages, progress)
+
+    pages = [None] * n_pages
+    ctx = multiprocessing.get_context("spawn")
+    counter = ctx.Value("i", 0)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(file_bytes, counter)) as pool:
+            pending = {pool.submit(_extract_range, start, stop)
+                       for start, stop in page_ranges(n_pages, workers * CHUNKS_PER_WORKER)}
+            reported = 0
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, texts = future.result()
+                    pages[start:start + len(texts)] = texts
+                if progress and counter.value != reported:
+                    reported = counter.value
+                    progress(reported, n_pages)
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning(f"Extraction parallèle impossible ({e}), repli séquentiel")
+        return _extract_sequential(reader, n_pages, progress)
+    return pages
+
+
+def join_pages(pages):
+    """Concatène les pages non vides (une seule allocation, pas de += en boucle)."""
+    return "\n".join(p for p in pages if p).strip()
+
+
+def _ocr_batches(pages, batch_size):
+    """Regroupe des index de pages triés en plages consécutives d'au plus batch_size pages."""
+    batches = []
+    for index in pages:
+        if batches and index == batches[-1][1] + 1 and index - batches[-1][0] < batch_size:
+            batches[-1][1] = index
+        else:
+            batches.append([index, index])
+    return batches
+
+
+def _tesseract(image, lang, env):
+    """Texte d'une image : tesseract lit le PNG sur stdin et écrit sur stdout."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    proc = subprocess.run([pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout", "-l", lang],
+                          input=buffer.getvalue(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          env=env, timeout=OCR_TIMEOUT)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace").strip()[-300:])
+    return proc.stdout.decode("utf-8", "replace")
+
+
+def _ocr_image(index, image, lang, env):
+    try:
+        return index, _tesseract(image, lang, env)
+    except Exception as e:
+        logger.warning(f"OCR page {index + 1} impossible : {e}")
+        return index, ""
+    finally:
+        image.close()
+
+
+def iter_ocr_pages(file_bytes, pages=None, dpi=OCR_DPI, lang=OCR_LANG, batch_size=OCR_BATCH_PAGES, max_workers=None):
+    """Génère (index_page, texte) au fur et à mesure que les pages sont reconnues.
+
+    pages : index (base 0) à traiter, toutes les pages par défaut. L'ordre de
+    sortie est celui de fin d'OCR, pas celui du document.
+    """
+    if not OCR_AVAILABLE:
+        raise RuntimeError("OCR non disponible - Installez pytesseract et pdf2image")
+    pages = sorted(set(pages)) if pages is not None else range(count_pages(file_bytes))
+    workers = max_workers or default_workers()
+    # Un tesseract par cœur : chacun est limité à un thread OpenMP, via son seul environnement
+    env = dict(os.environ, OMP_THREAD_LIMIT="1")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as pool:
+        pending = set()
+        for first, last in _ocr_batches(pages, batch_size):
+            images = pdf2image.convert_from_bytes(file_bytes, dpi=dpi, first_page=first + 1, last_page=last + 1,
+                                                  thread_count=min(workers, last - first + 1))
+            for index, image in zip(range(first, last + 1), images):
+                pending.add(pool.submit(_ocr_image, index, image, lang, env))
+            del images
+            # Le lot suivant n'est rastérisé qu'une fois ce lot en grande partie reconnu
+            while len(pending) > batch_size:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def ocr_pdf_pages(file_bytes, pages=None, progress=None, **ocr_options):
+    """OCR des pages demandées ; retourne {index_page: texte}."""
+    targets = sorted(set(pages)) if pages is not None else list(range(count_pages(file_bytes)))
+    results = {}
+    for index, text in iter_ocr_pages(file_bytes, targets, **ocr_options):
+        results[index] = text
+        if progress:
+            progress(len(results), len(targets))
+    return results
+
+
+@dataclass
+class ExtractionResult:
+    """Texte par page d'un document et pages passées par l'OCR."""
+    pages: list = field(default_factory=list)
+    ocr_pages: list = field(default_factory=list)
+
+    @property
+    def text(self):
+        return join_pages(self.pages)
+
+    @property
+    def stats(self):
+        """(pages, pages OCR) pour l'UI."""
+        return len(self.pages), len(self.ocr_pages)
+
+
+def needs_ocr(page_text, min_chars=MIN_PAGE_CHARS):
+    """Vrai si la page n'a pas (ou presque pas) de couche texte."""
+    return len("".join(page_text.split())) < min_chars
+
+
+def extract_pdf(file_bytes, use_ocr=False, progress=None, min_chars=MIN_PAGE_CHARS, **ocr_options):
+    """Extraction hybride : couche texte partout, OCR seulement des pages vides ou trop pauvres.
+
+    progress(faites, total, étape) avec étape 'text' puis 'ocr'.
+    """
+    report = (lambda stage: (lambda done, total: progress(done, total, stage))) if progress else (lambda stage: None)
+    result = ExtractionResult(pages=extract_pdf_pages(file_bytes, progress=report("text")))
+    if not (use_ocr and OCR_AVAILABLE):
+        return result
+
+    targets = [i for i, page in enumerate(result.pages) if needs_ocr(page, min_chars)]
+    if not targets:
+        return result
+    logger.info(f"OCR de {len(targets)}/{len(result.pages)} page(s) sans couche texte")
+    for index, text in ocr_pdf_pages(file_bytes, targets, progress=report("ocr"), **ocr_options).items():
+        # On garde le texte natif si l'OCR ne fait pas mieux (page réellement vide)
+        if len(text.strip()) > len(result.pages[index].strip()):
+            result.pages[index] = text
+            result.ocr_pages.append(index)
+    result.ocr_pages.sort()
+    return result
@@ -0,0 +1,86 @@
+"""Fusion de PDF à faible empreinte mémoire.
+
+Les fichiers sont recopiés par blocs dans un répertoire temporaire puis
+fusionnés depuis leurs descripteurs : PyPDF2 lit les pages à la demande au
+lieu de travailler sur des copies BytesIO complètes de chaque entrée. Le
+résultat est écrit dans un fichier temporaire et non dans un tampon mémoire.
+"""
+import os
+import re
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+import PyPDF2
+
+COPY_BUFFER = 1024 * 1024
+_RANGE = re.compile(r'^(\d*)\s*(-\s*(\d*))?$')
+
+
+def parse_page_ranges(spec, n_pages):
+    """Traduit « 1-3, 5, 8- » en plages (début, fin) base 0, fin exclue. Vide : tout le document."""
+    spec = (spec or "").strip()
+    if not spec:
+        return [(0, n_pages)]
+    ranges = []
+    for part in spec.replace(';', ',').split(','):
+        part = part.strip()
+        m = _RANGE.match(part)
+        if not part or not m or not (m.group(1) or m.group(3)):
+            raise ValueError(f"Plage de pages invalide : « {part} » (ex: 1-3, 5, 8-)")
+        first = int(m.group(1)) if m.group(1) else 1
+        if m.group(2):
+            last = int(m.group(3)) if m.group(3) else n_pages
+        else:
+            last = first
+        if first > n_pages:
+            raise ValueError(f"Page {first} hors du document ({n_pages} pages)")
+        if first < 1 or last < first:
+            raise ValueError(f"Plage de pages invalide : « {part} »")
+        last = min(last, n_pages)
+        ranges.append((first - 1, last))
+    return ranges
+
+
+def spool_upload(uploaded_file, directory):
+    """Recopie un fichier uploadé sur disque par blocs ; retourne le chemin."""
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".pdf")
+    uploaded_file.seek(0)
+    with os.fdopen(fd, 'wb') as out:
+        shutil.copyfileobj(uploaded_file, out, COPY_BUFFER)
+    return path
+
+
+def merge_pdf_files(sources, output_path):
+    """Fusionne [(chemin, spécification de pages)] dans output_path ; retourne le nombre de pages."""
+    merger = PyPDF2.PdfMerger(strict=False)
+    with ExitStack() as stack:
+        for path, spec in sources:
+            reader = PyPDF2.PdfReader(stack.enter_context(open(path, 'rb')), strict=False)
+            n_pages = len(reader.pages)
+            ranges = parse_page_ranges(spec, n_pages)
+            # Signets conservés pour un document pris en entier ; sur des plages, PyPDF2
+            # recopierait tous les signets à chaque plage, y compris vers des pages absentes
+            whole = ranges == [(0, n_pages)]
+            for page_range in ranges:
+                merger.append(reader, pages=page_range, import_outline=whole)
+        # Les descripteurs doivent rester ouverts jusqu'à l'écriture (lecture paresseuse)
+        with open(output_path, 'wb') as out:
+            merger.write(out)
+        total = len(merger.pages)
+        merger.close()
+    return total
+
+
+@contextmanager
+def merged_pdf(uploaded_files, page_specs=None):
+    """Spoule les uploads, fusionne et fournit (chemin du PDF fusionné, nb de pages).
+
+    Tous les fichiers temporaires sont supprimés à la sortie du bloc.
+    """
+    page_specs = page_specs or {}
+    with tempfile.TemporaryDirectory(prefix="qcm_merge_") as tmp:
+        sources = [(spool_upload(f, tmp), page_specs.get(f.name, "")) for f in uploaded_files]
+        output_path = os.path.join(tmp, "fusion.pdf")
+        total = merge_pdf_files(sources, output_path)
+        yield output_path, total
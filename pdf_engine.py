@@ -0,0 +1,189 @@
+"""Service de rendu PDF (wkhtmltopdf) partagé par toute l'application.
+
+Le binaire est résolu une seule fois. Les rendus passent par une file bornée
+et un pool de workers de taille fixe : sous charge (toute une classe qui clique
+sur « Télécharger PDF »), le nombre de processus wkhtmltopdf simultanés reste
+plafonné au lieu d'en lancer un par requête. Le HTML est envoyé sur stdin et
+le PDF lu sur stdout, sans fichier temporaire.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+WINDOWS_WKHTMLTOPDF = r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe'
+
+DEFAULT_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '1.5cm',
+    'margin-right': '1.5cm',
+    'margin-bottom': '1.5cm',
+    'margin-left': '1.5cm',
+    'encoding': "UTF-8",
+    'no-outline': None,
+    'quiet': ''
+}
+
+
+class PdfRenderError(Exception):
+    """Échec de rendu (binaire absent, file pleine, timeout, erreur wkhtmltopdf)."""
+
+
+def find_wkhtmltopdf():
+    """Chemin du binaire wkhtmltopdf (installation Windows standard puis PATH)."""
+    if os.path.exists(WINDOWS_WKHTMLTOPDF):
+        return WINDOWS_WKHTMLTOPDF
+    return shutil.which("wkhtmltopdf")
+
+
+def build_args(options):
+    """Traduit un dict d'options façon pdfkit en arguments de ligne de commande."""
+    args = []
+    for key, value in (options or {}).items():
+        flag = key if key.startswith('--') else f"--{key}"
+        args.append(flag)
+        if value not in (None, ''):
+            args.append(str(value))
+    return args
+
+
+def render_key(html, options):
+    """Clé de mémoïsation : SHA-256 du HTML et des options normalisées."""
+    payload = json.dumps(options if options is not None else DEFAULT_OPTIONS, sort_keys=True, default=str)
+    return hashlib.sha256(html.encode('utf-8') + b'\x00' + payload.encode('utf-8')).hexdigest()
+
+
+class PdfCache:
+    """Cache LRU en mémoire des PDF rendus, borné en octets."""
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self.current_bytes -= len(old)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.current_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class PdfRenderer:
+    """Pool borné de rendus wkhtmltopdf avec file d'attente et timeout."""
+
+    def __init__(self, binary=None, max_workers=None, max_queue=32, timeout=60, queue_timeout=30):
+        self.binary = binary or find_wkhtmltopdf()
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.max_workers + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="wkhtmltopdf")
+        self._lock = threading.Lock()
+        self.cache = PdfCache()
+        self.renders = 0
+        self.failures = 0
+
+    @property
+    def available(self):
+        return bool(self.binary)
+
+    def render(self, html, options=None, timeout=None):
+        """Rend le HTML en PDF et retourne les octets."""
+        if not self.binary:
+            raise PdfRenderError("wkhtmltopdf introuvable. Installez-le ou ajoutez-le au PATH.")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PdfRenderError("File de rendu PDF saturée, réessayez dans un instant.")
+        try:
+            future = self._executor.submit(self._run, html, options, timeout or self.timeout)
+            return future.result()
+        finally:
+            self._slots.release()
+
+    def cached(self, html, options=None):
+        """PDF déjà rendu pour ce (HTML, options), sinon None. Ne lance aucun rendu."""
+        return self.cache.get(render_key(html, options))
+
+    def render_cached(self, html, options=None, timeout=None):
+        """Comme render(), mais sert les demandes répétées depuis le cache."""
+        key = render_key(html, options)
+        data = self.cache.get(key)
+        if data is None:
+            data = self.render(html, options, timeout)
+            self.cache.put(key, data)
+        return data
+
+    def _run(self, html, options, timeout):
+        cmd = [self.binary, *build_args(options if options is not None else DEFAULT_OPTIONS), '-', '-']
+        try:
+            proc = subprocess.run(cmd, input=html.encode('utf-8'), stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._count(failed=True)
+            raise PdfRenderError(f"Rendu PDF interrompu après {timeout}s.")
+        # wkhtmltopdf sort parfois en code 1 sur des ressources externes manquantes
+        # tout en produisant un PDF valide : seul un PDF vide est une erreur.
+        if not proc.stdout.startswith(b'%PDF'):
+            self._count(failed=True)
+            detail = proc.stderr.decode('utf-8', 'replace').strip()[-300:]
+            raise PdfRenderError(f"wkhtmltopdf a échoué (code {proc.returncode}) : {detail}")
+        self._count()
+        return proc.stdout
+
+    def _count(self, failed=False):
+        with self._lock:
+            if failed:
+                self.failures += 1
+            else:
+                self.renders += 1
+
+    def stats(self):
+        with self._lock:
+            return {"binary": self.binary, "workers": self.max_workers,
+                    "renders": self.renders, "failures": self.failures,
+                    "cache": self.cache.stats()}
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_pdf_renderer():
+    """Instance partagée par le processus (créée au premier rendu)."""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PdfRenderer()
+                logger.info(f"Moteur PDF : {_renderer.binary or 'wkhtmltopdf absent'} ({_renderer.max_workers} workers)")
+    return _renderer
@@ -0,0 +1,215 @@
+"""Aperçu incrémental du créateur de contenu.
+
+À chaque frappe, Streamlit relance le script et l'aperçu était entièrement
+re-rendu puis rechargé dans son iframe. Ici, chaque ligne du module donne des
+fragments HTML mis en cache selon leur contenu : seules les lignes modifiées
+sont re-rendues, le document complet (téléchargement, PDF) n'est qu'un
+assemblage des fragments.
+
+Côté navigateur, l'iframe d'aperçu (la « coquille ») reste identique d'une
+relance à l'autre, donc n'est pas rechargée : un petit composant invisible lui
+transmet un patch (ordre des blocs par clé et HTML des seuls blocs inconnus
+de la coquille), appliqué sur place en conservant le défilement. Le patch est
+cumulatif par rapport à la coquille, donc idempotent. Quand il devient trop
+gros, ou que la structure change (options, titre, nombre de questions avec
+feuille de réponses), une nouvelle coquille est émise.
+
+Le patch atteint la coquille par window.parent.frames : les deux iframes
+srcdoc de st.components.v1.html héritent de l'origine de la page Streamlit et
+peuvent donc se scripter. Si l'hébergement isole ces iframes (sandbox sans
+allow-same-origin, origines différentes), le patch ne peut pas atteindre la
+coquille, le signale dans la console du navigateur et l'aperçu reste figé sur la
+dernière coquille émise : il faut alors décocher l'aperçu incrémental, qui
+repasse au rendu complet à chaque relance.
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from render_engine import (compile_template, script_json, render_print_head, render_print_question, render_print_footer,
+                           two_column_rows, QA_CARD, QA_PAGE, DEF_ROW, DEF_PAGE)
+
+# Types du créateur pris en charge ; les autres (quiz JS, synthèse) sont rendus en entier
+INCREMENTAL_TYPES = frozenset(["QCM Classique", "Questions / Réponses", "Glossaire (Concept | Définition)"])
+
+MAX_FRAGMENTS = 20000
+# Au-delà de cette part de blocs absents de la coquille, on ré-émet une coquille
+REBASE_RATIO = 0.2
+MIN_REBASE_BLOCKS = 32
+
+# Listes de blocs patchables : (conteneur, sélecteur des blocs, élément qui précède le premier bloc)
+LIST_SELECTORS = {
+    "questions": (".questions-wrapper", ".question-block", None),
+    "answers": ("#correction tbody", "tr", None),
+    "cards": ("body", ".qa-card", "h1"),
+    "rows": ("tbody", "tr", None),
+}
+
+SHELL_SCRIPT = compile_template("""<script>
+(function () {
+    var lists = {{lists|raw}}, selectors = {{selectors|raw}}, nodes = {};
+    Object.keys(lists).forEach(function (name) {
+        var sel = selectors[name], box = document.querySelector(sel[0]), map = new Map();
+        if (box) box.querySelectorAll(':scope > ' + sel[1]).forEach(function (n, i) {
+            if (i < lists[name].length) map.set(lists[name][i], n);
+        });
+        nodes[name] = map;
+    });
+    function sync(name, order, html) {
+        var sel = selectors[name], box = document.querySelector(sel[0]), have = nodes[name];
+        if (!box || !have) return;
+        var want = new Set(order);
+        // Les blocs retirés sont gardés détachés : une annulation les réinsère sans HTML
+        have.forEach(function (n, k) { if (!want.has(k)) n.remove(); });
+        var prev = sel[2] ? box.querySelector(':scope > ' + sel[2]) : null;
+        order.forEach(function (k) {
+            var n = have.get(k);
+            if (!n) {
+                if (!(k in html)) return;
+                var t = document.createElement('template');
+                t.innerHTML = html[k];
+                n = t.content.firstElementChild;
+                have.set(k, n);
+            }
+            var next = prev ? prev.nextElementSibling : box.firstElementChild;
+            if (n !== next) { if (prev) prev.after(n); else box.prepend(n); }
+            prev = n;
+        });
+    }
+    var preview = {id: "{{shell_id|raw}}", apply: function (patch) {
+        if (patch.id !== preview.id) return;
+        Object.keys(patch.lists).forEach(function (name) { sync(name, patch.lists[name], patch.html); });
+    }};
+    window.__qcmPreview = preview;
+    try { if (window.parent.__qcmPreviewPatch) preview.apply(window.parent.__qcmPreviewPatch); } catch (e) {}
+})();
+</script>""")
+
+PATCH_SCRIPT = compile_template("""<script>
+(function () {
+    var patch = {{patch|raw}}, root = window.parent, blocked = false;
+    // Une coquille encore en chargement applique elle-même le patch laissé sur la page
+    try { root.__qcmPreviewPatch = patch; } catch (e) { blocked = true; }
+    for (var i = 0; i < root.frames.length; i++) {
+        try { var p = root.frames[i].__qcmPreview; if (p) p.apply(patch); } catch (e) { blocked = true; }
+    }
+    if (blocked) console.warn("Aperçu incrémental : coquille inaccessible (iframes isolées), désactivez l'option.");
+})();
+</script>""")
+
+
+@dataclass
+class PreviewDocument:
+    """Document assemblé : HTML complet et blocs patchables (listes de clés, fragments par clé)."""
+    html: str
+    lists: dict = field(default_factory=dict)
+    fragments: dict = field(default_factory=dict)
+    structure: tuple = ()
+    rendered: int = 0
+
+
+class IncrementalPreview:
+    """Fragments par ligne en cache et coquille d'aperçu patchée sur place (une instance par session)."""
+
+    def __init__(self, max_fragments=MAX_FRAGMENTS):
+        self.max_fragments = max_fragments
+        self._cache = OrderedDict()
+        self._next_id = 0
+        self.shell = None
+        self.shell_id = None
+        self._shell_keys = frozenset()
+        self._shell_structure = None
+
+    def _fragment(self, key, render):
+        """(clé DOM, fragments) depuis le cache, en ne rendant la ligne qu'au premier passage."""
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            return entry, False
+        self._next_id += 1
+        entry = (f"b{self._next_id}", render())
+        self._cache[key] = entry
+        while len(self._cache) > self.max_fragments:
+            self._cache.popitem(last=False)
+        return entry, True
+
+    def build(self, content, title, q_type, bank=None, use_columns=True, add_qr=True, mode="Examen",
+              add_sheet=True, open_all=False):
+        """Assemble le document depuis les fragments en cache ; ne rend que les lignes nouvelles ou modifiées."""
+        if q_type == "QCM Classique":
+            return self._build_print(bank, title, use_columns, add_qr, mode, add_sheet, open_all)
+        if q_type == "Questions / Réponses":
+            return self._build_rows(content, title, "cards", QA_CARD, QA_PAGE)
+        return self._build_rows(content, title, "rows", DEF_ROW, DEF_PAGE)
+
+    def _build_print(self, bank, title, use_columns, add_qr, mode, add_sheet, open_all):
+        questions = bank.questions
+        blocks, answers, fragments = [], [], {}
+        question_keys, answer_keys = [], []
+        rendered = 0
+        for q_num, q in enumerate(questions, 1):
+            key = ("print", mode, open_all, q_num, q['text'], tuple(q.get('opts', ())), q['ans'], q.get('expl'))
+            (dom_key, (block, answer_row)), fresh = self._fragment(
+                key, lambda: render_print_question(q, q_num, mode, open_all=open_all))
+            rendered += fresh
+            blocks.append(block)
+            answers.append(answer_row)
+            question_keys.append("q" + dom_key)
+            answer_keys.append("a" + dom_key)
+            fragments["q" + dom_key] = block
+            fragments["a" + dom_key] = answer_row
+
+        exam = mode == "Examen"
+        lists = {"questions": question_keys}
+        if exam:
+            lists["answers"] = answer_keys
+        footer = render_print_footer(len(questions), answers, mode, add_sheet=add_sheet)
+        html = "".join([render_print_head(title, use_columns, add_qr), *blocks, footer])
+        # La feuille de réponses dépend du nombre de questions : elle fait partie de la structure
+        structure = ("QCM Classique", title, use_columns, add_qr, mode, add_sheet, open_all,
+                     len(questions) if exam and add_sheet else None)
+        return PreviewDocument(html, lists, fragments, structure, rendered)
+
+    def _build_rows(self, content, title, list_name, row_template, page_template):
+        items, keys, fragments = [], [], {}
+        seen = {}
+        rendered = 0
+        for i, first, second in two_column_rows(content):
+            if list_name == "cards":
+                key = ("qa", i, first, second)
+                render = lambda: row_template(num=i, question=first, answer=second)
+            else:
+                # Pas de numéro dans le glossaire : les doublons sont distingués par leur rang
+                seen[(first, second)] = n = seen.get((first, second), 0) + 1
+                key = ("def", n, first, second)
+                render = lambda: row_template(concept=first, definition=second)
+            (dom_key, item), fresh = self._fragment(key, render)
+            rendered += fresh
+            items.append(item)
+            keys.append(dom_key)
+            fragments[dom_key] = item
+        html = page_template(title=title, **{"items" if list_name == "cards" else "rows": items})
+        return PreviewDocument(html, {list_name: keys}, fragments, (list_name, title), rendered)
+
+    def update(self, doc):
+        """(coquille, patch) à afficher ; la coquille n'est régénérée que si nécessaire."""
+        missing = {k: doc.fragments[k] for keys in doc.lists.values() for k in keys if k not in self._shell_keys}
+        total = sum(len(keys) for keys in doc.lists.values())
+        if (self.shell is None or doc.structure != self._shell_structure
+                or len(missing) > max(MIN_REBASE_BLOCKS, total * REBASE_RATIO)):
+            self._rebase(doc)
+            missing = {}
+        patch = {"id": self.shell_id, "lists": doc.lists, "html": missing}
+        return self.shell, PATCH_SCRIPT(patch=script_json(patch))
+
+    def _rebase(self, doc):
+        self.shell_id = hashlib.sha1(doc.html.encode("utf-8")).hexdigest()[:16]
+        script = SHELL_SCRIPT(lists=script_json(doc.lists), shell_id=self.shell_id,
+                              selectors=script_json({name: LIST_SELECTORS[name] for name in doc.lists}))
+        cut = doc.html.rfind("</body>")
+        self.shell = doc.html[:cut] + script + doc.html[cut:] if cut != -1 else doc.html + script
+        self._shell_keys = frozenset(k for keys in doc.lists.values() for k in keys)
+        self._shell_structure = doc.structure
+
+    def stats(self):
+        return {"fragments": len(self._cache), "shell_blocks": len(self._shell_keys)}
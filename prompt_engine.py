@@ -0,0 +1,213 @@
+"""Découpage du texte extrait en morceaux bornés en tokens et prompts IA associés.
+
+Le texte d'un cours est coupé aux frontières de titres et de paragraphes en
+morceaux d'au plus max_tokens, avec un recouvrement configurable pour ne pas
+perdre le contexte d'une coupure. Chaque morceau donne un prompt complet :
+un long cours est couvert en entier et chaque prompt tient dans la fenêtre de
+contexte du modèle.
+"""
+import re
+
+# Estimation sans tokenizer : ~4 octets UTF-8 par token (français/anglais ; l'arabe,
+# sur 2 octets par lettre, compte donc environ 2 lettres par token)
+BYTES_PER_TOKEN = 4
+DEFAULT_MAX_TOKENS = 8000
+DEFAULT_OVERLAP_TOKENS = 200
+# Marque en tête d'un morceau du texte répété depuis le précédent
+OVERLAP_PREFIX = "[…] "
+# Une coupure sur un titre est préférée dès que le morceau est rempli à moitié
+HEADING_BREAK_RATIO = 0.5
+
+_HEADING = re.compile(
+    r'^(#{1,6}\s+\S'                                                       # Markdown
+    r'|(?i:chapitre|partie|section|module|leçon|annexe|chapter|part)\s*(\d+|[IVXLC]+\b|[A-Z]\b|:)'
+    r'|الفصل|الباب|المحور|الدرس)')
+# Numérotation (I. / B) / 2. / 2.3) suivie d'une majuscule ; sensible à la casse : « a. » est un item de liste
+_NUMBERED_HEADING = re.compile(r'^(([IVXLC]+|[A-Z]|\d+)[.)]|\d+(\.\d+)+\.?)\s+[A-ZÀ-ÖØ-Þ\u0600-\u06FF]')
+NUMBERED_HEADING_MAX_CHARS = 80
+_SENTENCE_END = re.compile(r'(?<=[.!?؟;])\s+')
+
+PROMPT_TEMPLATES = {
+    "QCM (Interactif)": ("_QCM.csv", """Tu es un expert en ingénierie pédagogique. À partir du texte fourni, génère un examen QCM de haute qualité.
+
+CONSIGNES STRICTES :
+1. Format : CSV strict (délimiteur '|')
+2. Colonnes : Question|A|B|C|D|E|F|Réponse|Explication
+3. Réponse : Indique la lettre (ex: A) ou les lettres (ex: AC) sans séparateur.
+4. Qualité : Crée des distracteurs plausibles. L'explication doit justifier la bonne réponse.
+5. Langue : {target_lang}.
+{part_note}
+TEXTE DE RÉFÉRENCE :
+{text}"""),
+    "Q&A (Flashcards)": ("_QA.csv", """Génère une série de questions-réponses (Flashcards) pour aider à la mémorisation du texte suivant.
+
+CONSIGNES STRICTES :
+1. Format : CSV strict (délimiteur '|')
+2. Colonnes : Question|Réponse
+3. Langue : {target_lang}.
+{part_note}
+TEXTE DE RÉFÉRENCE :
+{text}"""),
+    "Glossaire": ("_DEF.csv", """Identifie tous les concepts clés, termes techniques et définitions importantes dans le texte suivant.
+
+CONSIGNES STRICTES :
+1. Format : CSV strict (délimiteur '|')
+2. Colonnes : Concept|Définition
+3. Langue : {target_lang}.
+{part_note}
+TEXTE DE RÉFÉRENCE :
+{text}"""),
+    "Synthèse": ("_SUM.md", """Rédige une synthèse structurée et pédagogique du texte suivant.
+Utilise du Markdown pour la mise en forme (titres, listes, gras).
+
+CONSIGNES :
+1. Style : Clair, concis et professionnel.
+2. Langue : {target_lang}.
+3. Format : Résumé structuré.
+{part_note}
+TEXTE DE RÉFÉRENCE :
+{text}"""),
+}
+
+PART_NOTE = """
+PARTIE {part}/{total} : ce texte est un extrait d'un cours plus long, découpé en {total} parties.
+Traite uniquement cet extrait.{header_note}
+"""
+# Parties 2 et suivantes d'un CSV : les lignes seront concaténées à celles de la partie 1
+CSV_HEADER_NOTE = " N'ajoute pas de ligne d'en-tête CSV (elle est fournie par la partie 1)."
+
+
+def estimate_tokens(text):
+    """Nombre de tokens approché (sans dépendance à un tokenizer)."""
+    return (len(text.encode('utf-8')) + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+
+
+def is_heading(line):
+    """Ligne de titre : Markdown, « Chapitre 2 », numérotation (I., 2.3, A)) ou titre arabe."""
+    stripped = line.strip()
+    if not 0 < len(stripped) <= 120:
+        return False
+    if _HEADING.match(stripped):
+        return True
+    # Un item numéroté long ou terminé par une ponctuation (« 2. Les cellules se divisent. ») n'est pas un titre
+    return (len(stripped) <= NUMBERED_HEADING_MAX_CHARS and stripped[-1] not in ".;,:!?"
+            and bool(_NUMBERED_HEADING.match(stripped)))
+
+
+def split_blocks(text):
+    """Découpe le texte en blocs (titre, bool) aux lignes vides et aux titres."""
+    blocks, current = [], []
+    for line in text.splitlines():
+        if not line.strip():
+            if current:
+                blocks.append((" ".join(current), False))
+                current = []
+        elif is_heading(line):
+            if current:
+                blocks.append((" ".join(current), False))
+                current = []
+            blocks.append((" ".join(line.split()), True))
+        else:
+            current.append(" ".join(line.split()))
+    if current:
+        blocks.append((" ".join(current), False))
+    return blocks
+
+
+def _split_oversized(block, max_tokens):
+    """Coupe un bloc trop long aux fins de phrases, puis aux mots si nécessaire."""
+    pieces, current, size = [], [], 0
+    for unit in _SENTENCE_END.split(block):
+        unit_tokens = estimate_tokens(unit) + 1
+        if unit_tokens > max_tokens:
+            # Phrase démesurée (texte sans ponctuation) : coupe aux mots, voire dans le mot
+            # (jusqu'à 4 octets par caractère : un morceau de step caractères tient dans le budget)
+            step = max(1, max_tokens - 1)
+            words = [w[k:k + step] for w in unit.split() for k in range(0, len(w), step)]
+            for word in words:
+                word_tokens = estimate_tokens(word) + 1
+                if current and size + word_tokens > max_tokens:
+                    pieces.append(" ".join(current))
+                    current, size = [], 0
+                current.append(word)
+                size += word_tokens
+            continue
+        if current and size + unit_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += unit_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _overlap_tail(text, overlap_tokens):
+    """Fin du morceau précédent (au plus overlap_tokens), coupée sur un mot."""
+    if overlap_tokens <= 0:
+        return ""
+    data = text.encode("utf-8")
+    tail = data[-overlap_tokens * BYTES_PER_TOKEN:].decode("utf-8", "ignore")
+    if len(tail) < len(text):
+        tail = tail.split(" ", 1)[-1]
+    return tail
+
+
+def chunk_text(text, max_tokens=DEFAULT_MAX_TOKENS, overlap_tokens=DEFAULT_OVERLAP_TOKENS):
+    """Morceaux d'au plus max_tokens (recouvrement inclus), coupés aux titres et paragraphes.
+
+    Un texte vide ou blanc donne un seul morceau : il y a toujours un prompt.
+    """
+    if not text.strip():
+        return [text]
+    max_tokens = max(50, int(max_tokens))
+    overlap_tokens = max(0, min(int(overlap_tokens), max_tokens // 4))
+    # Le préfixe « […] », la fin répétée et son retour à la ligne comptent dans le budget
+    budget = max_tokens - (overlap_tokens + estimate_tokens(OVERLAP_PREFIX + "\n") if overlap_tokens else 0)
+
+    units = []
+    for block, heading in split_blocks(text):
+        if estimate_tokens(block) > budget:
+            units.extend((piece, False) for piece in _split_oversized(block, budget))
+        else:
+            units.append((block, heading))
+
+    chunks, current, size = [], [], 0
+    for unit, heading in units:
+        unit_tokens = estimate_tokens(unit) + 1
+        full = size + unit_tokens > budget
+        if current and (full or (heading and size >= budget * HEADING_BREAK_RATIO)):
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += unit_tokens
+    if current:
+        chunks.append("\n".join(current))
+
+    if overlap_tokens:
+        for i in range(len(chunks) - 1, 0, -1):
+            tail = _overlap_tail(chunks[i - 1], overlap_tokens)
+            if tail:
+                chunks[i] = f"{OVERLAP_PREFIX}{tail}\n{chunks[i]}"
+    return chunks
+
+
+def build_prompts(ex_type, chunks, target_lang):
+    """Un prompt par morceau ; retourne (suffixe de fichier, liste de prompts)."""
+    suffix, template = PROMPT_TEMPLATES[ex_type]
+    total = len(chunks)
+    prompts = []
+    for part, chunk in enumerate(chunks, 1):
+        part_note = ""
+        if total > 1:
+            header_note = CSV_HEADER_NOTE if part > 1 and suffix.endswith(".csv") else ""
+            part_note = PART_NOTE.format(part=part, total=total, header_note=header_note)
+        # Texte aplati comme avant le découpage : les retours à la ligne n'apportent rien au modèle
+        prompts.append(template.format(target_lang=target_lang, part_note=part_note, text=" ".join(chunk.split())))
+    return suffix, prompts
+
+
+def merge_prompts(prompts):
+    """Tous les prompts dans un seul fichier texte, séparés et numérotés."""
+    total = len(prompts)
+    return "\n\n".join(f"{'=' * 30} PROMPT {i}/{total} {'=' * 30}\n{p}" for i, p in enumerate(prompts, 1))
@@ -0,0 +1,257 @@
+"""Parseur unique des banques de questions (CSV délimité par '|').
+
+Toute la logique de lecture des modules (détection de la colonne Réponse,
+heuristique droite-gauche, extraction des lettres par préfixe) vit ici afin
+que la validation, les statistiques et les rendus HTML consomment un seul
+résultat au lieu de relire le texte chacun de leur côté.
+"""
+import csv
+import hashlib
+import io
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+
+ANSWER_HEADERS = frozenset(["RÉPONSE", "REPONSE", "ANSWER"])
+HEADER_FIRST_CELLS = frozenset(["question", "titre"])
+ANSWER_SEPARATORS = frozenset([';', ',', ' ', ':', '.', '/', '?'])
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+QA_TYPES = {"Questions / Réponses": "QA", "QA": "QA",
+            "Glossaire (Concept | Définition)": "GLOSSARY", "DEF": "GLOSSARY"}
+SUM_TYPES = frozenset(["Synthèse MD (Style Pro)", "Synthèse (Markdown)", "SUM"])
+
+_ANS_PATTERN = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
+
+
+@dataclass
+class ParsedBank:
+    """Résultat d'une passe de parsing : questions, diagnostics et statistiques."""
+    kind: str
+    questions: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+    total: int = 0
+    single: int = 0
+    multi: int = 0
+    distribution: dict = field(default_factory=dict)
+
+    @property
+    def stats(self):
+        """Tuple (total, unique, multiple, distribution) attendu par l'UI."""
+        return self.total, self.single, self.multi, self.distribution
+
+
+def bank_kind(q_type):
+    """Retourne 'QCM', 'QA', 'GLOSSARY' ou 'SUM' pour un type UI ou BD."""
+    if q_type in SUM_TYPES:
+        return "SUM"
+    return QA_TYPES.get(q_type, "QCM")
+
+
+def find_answer_column(row):
+    """Index de la colonne Réponse sans en-tête exploitable : recherche de droite à gauche."""
+    for j in range(min(len(row) - 1, 11), 1, -1):
+        val = row[j].strip()
+        if val and len(val) <= 15 and _ANS_PATTERN.match(val.upper()):
+            return j
+    return max(1, len(row) - 2)
+
+
+def extract_answer(raw_ans, lets):
+    """Garde les lettres valides jusqu'au premier caractère parasite."""
+    ans = []
+    for char in raw_ans:
+        if char in lets:
+            ans.append(char)
+        elif char in ANSWER_SEPARATORS:
+            continue
+        else:
+            break
+    return "".join(ans)
+
+
+def split_rows(text):
+    """Découpe le texte en lignes de cellules, comme csv.reader(delimiter='|').
+
+    Sans guillemet ni retour chariot, le découpage csv équivaut à un simple
+    split, bien plus rapide sur les grosses banques. Comme csv.reader, une ligne
+    vide donne [] et le dernier saut de ligne ne produit pas de ligne.
+    """
+    if '"' not in text and '\r' not in text:
+        lines = text.split('\n')
+        if not lines[-1]:
+            lines.pop()
+        return iter([line.split('|') if line else [] for line in lines])
+    return csv.reader(io.StringIO(text), delimiter='|')
+
+
+def parse_bank(text, q_type="QCM Classique"):
+    """Parse le texte en une seule passe et retourne un ParsedBank."""
+    kind = bank_kind(q_type)
+    bank = ParsedBank(kind=kind)
+    if kind == "SUM":
+        return bank
+
+    reader = split_rows(text.strip())
+    header = next(reader, None)
+    if not header:
+        bank.errors.append("Le fichier est vide.")
+        return bank
+
+    ans_col_idx = -1
+    for j, col in enumerate(header):
+        if col.strip().upper() in ANSWER_HEADERS:
+            ans_col_idx = j
+            break
+
+    questions = bank.questions
+    errors = bank.errors
+    answered_letters = []
+    strip = str.strip
+    multi = 0
+
+    for i, row in enumerate(reader, 1):
+        if not any(row):
+            continue
+        first = row[0].strip()
+        if len(first) <= 8 and first.lower() in HEADER_FIRST_CELLS:
+            continue
+
+        if kind != "QCM":
+            if len(row) < 2:
+                errors.append(f"Ligne {i} : Format attendu 'A|B', trouvé seulement {len(row)} colonnes.")
+                continue
+            questions.append({'text': first, 'ans': row[1].strip(), 'type': kind})
+            continue
+
+        n_cols = len(row)
+        if n_cols < 7:
+            errors.append(f"Ligne {i} : Colonnes insuffisantes ({n_cols}/7 minimum).")
+            continue
+
+        # Colonne Réponse : celle de l'en-tête si la ligne l'atteint (cas courant, sans appel)
+        ans_idx = ans_col_idx if ans_col_idx != -1 and ans_col_idx < n_cols else find_answer_column(row)
+
+        raw_ans = row[ans_idx].strip().upper()
+        if raw_ans in ANSWER_HEADERS:
+            continue
+
+        opts = [o for o in map(strip, row[1:ans_idx]) if o]
+        lets = LETTERS[:len(opts)]
+        # Cas courant : la cellule ne contient que des lettres valides
+        ans = raw_ans if raw_ans and not raw_ans.strip(lets) else extract_answer(raw_ans, lets)
+        if not ans:
+            errors.append(f"Ligne {i} : Réponse '{raw_ans[:10]}' invalide pour {len(opts)} options.")
+
+        questions.append({
+            'text': first,
+            'opts': opts,
+            'ans': ans,
+            'expl': "|".join(row[ans_idx + 1:])
+        })
+        if len(ans) > 1:
+            multi += 1
+        answered_letters.append(ans)
+
+    bank.total = len(questions)
+    if kind == "QCM":
+        bank.multi = multi
+        bank.single = bank.total - multi
+    letter_counts = Counter("".join(answered_letters))
+    total_ans = sum(letter_counts.values()) or 1
+    bank.distribution = {k: (v / total_ans * 100) for k, v in letter_counts.items()}
+    return bank
+
+
+def search_document(text, q_type="QCM Classique", bank=None):
+    """Texte indexable d'un module : questions, options et explications (sans lettres de réponse)."""
+    if not text:
+        return ""
+    if bank is None:
+        bank = parse_bank(text, q_type)
+    if bank.kind == "SUM":
+        return text
+    parts = []
+    for q in bank.questions:
+        parts.append(q['text'])
+        if bank.kind == "QCM":
+            parts.extend(q['opts'])
+            if q['expl']:
+                parts.append(q['expl'].replace('|', ' '))
+        else:
+            parts.append(q['ans'])
+    return "\n".join(parts)
+
+
+class ParseCache:
+    """Cache LRU des banques parsées, indexé par SHA-256 du texte.
+
+    Borné à la fois en nombre d'entrées et en mémoire estimée. Les banques
+    retournées sont partagées : les appelants ne doivent pas les modifier.
+    """
+
+    # Une banque parsée pèse environ 4 fois son texte source (listes, dicts, chaînes)
+    BYTES_PER_CHAR = 4
+
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(text, kind):
+        return hashlib.sha256(f"{kind}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text, q_type="QCM Classique"):
+        """Retourne la banque parsée, en ne tokenisant le texte qu'au premier appel."""
+        kind = bank_kind(q_type)
+        key = self.key(text, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        bank = parse_bank(text, q_type)
+        size = len(text) * self.BYTES_PER_CHAR
+        if size > self.max_bytes:
+            return bank
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (bank, size)
+                self.current_bytes += size
+                while self._entries and (len(self._entries) > self.max_entries
+                                         or self.current_bytes > self.max_bytes):
+                    _, (_, old_size) = self._entries.popitem(last=False)
+                    self.current_bytes -= old_size
+                    self.evictions += 1
+        return bank
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Compteurs pour le tableau de bord."""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.current_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+PARSE_CACHE = ParseCache()
+
+
+def cached_parse_bank(text, q_type="QCM Classique"):
+    """parse_bank() via le cache partagé du processus."""
+    return PARSE_CACHE.get(text, q_type)
@@ -1,28 +1,42 @@
 import streamlit as st
 import pandas as pd
-import csv
 import io
 import os
 import time
-from collections import Counter
 import webbrowser
-import pdfkit
-import random
 import datetime
 from datetime import timedelta
 import logging
 import re
-import sqlite3
 import json
-import shutil
 import hashlib
+import html
 from contextlib import contextmanager
+from dataclasses import asdict
 from streamlit_option_menu import option_menu
-import markdown
 import tempfile
-
-# --- ADVANCED LIBS ---
-import PyPDF2
+import importlib.machinery
+from qcm_parser import cached_parse_bank, PARSE_CACHE, QA_TYPES
+from pdf_engine import get_pdf_renderer, PdfRenderError, DEFAULT_OPTIONS as PDF_DEFAULT_OPTIONS
+from disk_cache import DiskCache
+from merge_engine import merged_pdf
+from render_engine import (render_print_html, render_print_document, render_qa_html, render_def_html, render_result_report,
+                           render_sum_html, render_js_quiz, MARKDOWN_CACHE)
+from preview_engine import IncrementalPreview, INCREMENTAL_TYPES
+from export_engine import write_offline_bundle, write_module_archive, write_xlsx, write_csv_gz
+from shuffle_engine import derive_seed, shuffle_questions, student_seed
+from exam_engine import plan_variants, write_exam_variants, MAX_VARIANTS
+from prompt_engine import chunk_text, build_prompts, merge_prompts, DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS
+from extraction_engine import (extract_pdf, ExtractionResult,
+                               OCR_AVAILABLE, OCR_DPI, OCR_LANG, MIN_PAGE_CHARS)
+from db_engine import (get_pool, apply_migrations, module_index_fields, search_modules, iter_rows,
+                       count_search_modules, SNIPPET_OPEN, SNIPPET_CLOSE, MODULE_COLUMNS, MODULE_META_COLUMNS)
+
+# Streamlit exécute ce script dans un module __main__ sans __spec__ : les workers
+# multiprocessing en « spawn » (extraction PDF) le ré-exécuteraient en entier.
+# Un __spec__ nommé __main__ leur indique de ne pas recharger le module principal.
+if __spec__ is None:
+    __spec__ = importlib.machinery.ModuleSpec("__main__", None)
 
 # --- LOGGING CONFIGURATION ---
 logging.basicConfig(
@@ -36,13 +50,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # --- OCR & DOCUMENT PARSING (optional imports) ---
-try:
-    import pytesseract
-    from PIL import Image
-    import pdf2image
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+if not OCR_AVAILABLE:
     logger.warning("OCR non disponible. Installez: pip install pytesseract Pillow pdf2image")
 
 try:
@@ -52,51 +60,45 @@ except ImportError:
     DOCX_AVAILABLE = False
     logger.warning("Support DOCX non disponible. Installez: pip install python-docx")
 
-def extract_text_from_pdf(file_bytes, use_ocr=False):
-    """Extraie le texte d'un fichier PDF (avec option OCR pour PDFs scannés)."""
-    try:
-        reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        
-        # Si le texte est vide ou trop court, essayer l'OCR
-        if use_ocr and OCR_AVAILABLE and len(text.strip()) < 50:
-            logger.info("Texte extrait trop court, tentative OCR...")
-            return extract_text_with_ocr(file_bytes)
-        
-        return text.strip() if text.strip() else "[PDF vide ou scanné - Activez l'OCR]"
-    except Exception as e:
-        logger.error(f"Erreur extraction PDF: {e}")
-        return f"Erreur d'extraction : {e}"
+# Textes extraits persistés : clé (SHA-256 du fichier, mode d'extraction)
+EXTRACTION_CACHE = DiskCache(os.path.join("cache", "extraction"), max_bytes=256 * 1024 * 1024, suffix=".json")
 
-def extract_text_with_ocr(file_bytes):
-    """Applique l'OCR sur un PDF scanné."""
-    if not OCR_AVAILABLE:
-        return "[OCR non disponible - Installez pytesseract et pdf2image]"
-    
-    try:
-        # Convertir PDF en images
-        images = pdf2image.convert_from_bytes(file_bytes)
-        text = ""
-        for i, img in enumerate(images):
-            logger.info(f"OCR page {i+1}/{len(images)}...")
-            text += pytesseract.image_to_string(img, lang='fra') + "\n"
-        return text.strip()
-    except Exception as e:
-        logger.error(f"Erreur OCR: {e}")
-        return f"Erreur OCR : {e}"
+def extraction_cache_key(file_bytes, mode):
+    return f"{hashlib.sha256(file_bytes).hexdigest()}_{mode}"
+
+def extract_pdf_with_stats(file_bytes, use_ocr=False, progress=None, ocr_dpi=OCR_DPI):
+    """Extraction hybride d'un PDF : (texte ou message d'erreur, ExtractionResult ou None)."""
+    use_ocr = use_ocr and OCR_AVAILABLE
+    mode = f"pdf_ocr_{OCR_LANG}_{ocr_dpi}_{MIN_PAGE_CHARS}" if use_ocr else "pdf_text"
+    key = extraction_cache_key(file_bytes, mode)
+    cached = EXTRACTION_CACHE.get(key)
+    if cached is not None:
+        result = ExtractionResult(**json.loads(cached))
+    else:
+        try:
+            result = extract_pdf(file_bytes, use_ocr=use_ocr, progress=progress, dpi=ocr_dpi)
+        except Exception as e:
+            logger.error(f"Erreur extraction PDF: {e}")
+            return f"Erreur d'extraction : {e}", None
+        EXTRACTION_CACHE.put(key, json.dumps(asdict(result), ensure_ascii=False).encode('utf-8'))
+    text = result.text
+    if not text:
+        return "[PDF vide ou scanné - Activez l'OCR]", result
+    return text, result
 
 def extract_text_from_docx(file_bytes):
     """Extraie le texte d'un fichier Word (.docx)."""
     if not DOCX_AVAILABLE:
         return "[Support DOCX non disponible - Installez python-docx]"
     
+    key = extraction_cache_key(file_bytes, "docx")
+    cached = EXTRACTION_CACHE.get(key)
+    if cached is not None:
+        return cached.decode('utf-8')
     try:
         doc = Document(io.BytesIO(file_bytes))
         text = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
+        EXTRACTION_CACHE.put(key, text.strip().encode('utf-8'))
         return text.strip()
     except Exception as e:
         logger.error(f"Erreur extraction DOCX: {e}")
@@ -118,73 +120,13 @@ def validate_file_upload(uploaded_file, allowed_types=["pdf"], max_size_mb=10):
     
     return True, ""
 
-def validate_csv_data(csv_text, q_type):
+def validate_csv_data(csv_text, q_type, bank=None):
     """Analyse le CSV et retourne une liste d'erreurs/avertissements."""
-    errors = []
-    warnings = []
-    f = io.StringIO(csv_text.strip())
-    reader = csv.reader(f, delimiter='|')
-    
-    # Check header and identify columns
-    header = next(reader, None)
-    if not header:
-        return ["Le fichier est vide."], []
-    
-    ans_col_idx = -1
-    if header:
-        for j, col in enumerate(header):
-            if col.strip().upper() in ["RÉPONSE", "REPONSE", "ANSWER"]:
-                ans_col_idx = j
-                break
-
-    for i, row in enumerate(reader, 1):
-        if not any(row): continue # Skip empty lines
-        if str(row[0]).strip().lower() in ["question", "titre"]: continue
-        
-        if q_type == "QCM Classique":
-            if len(row) < 7:
-                errors.append(f"Ligne {i} : Colonnes insuffisantes ({len(row)}/7 minimum).")
-                continue
-            
-            # Identify Answer Column
-            ans_idx = ans_col_idx
-            if ans_idx == -1 or ans_idx >= len(row):
-                # Robust fallback: Search from right to left
-                ans_pattern = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
-                search_limit = min(len(row) - 1, 11)
-                for j in range(search_limit, 1, -1):
-                    val = row[j].strip().upper()
-                    if val and len(val) <= 15 and ans_pattern.match(val):
-                        ans_idx = j
-                        break
-                if ans_idx == -1: ans_idx = max(1, len(row) - 2)
-            
-            raw_ans = row[ans_idx].strip().upper()
-            if raw_ans in ["RÉPONSE", "REPONSE", "ANSWER"]: continue
-            
-            opts = [o.strip() for o in row[1:ans_idx] if o.strip()]
-            num_opts = len(opts)
-            lets = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[:num_opts]
-            
-            # PREFIX-BASED EXTRACTION: Take letters until first dirty char
-            ans_clean = ""
-            for char in raw_ans:
-                if char in lets: ans_clean += char
-                elif char in [';', ',', ' ', ':', '.', '/', '?']: continue
-                else: break # Stop at first non-answer character
-            
-            if not ans_clean:
-                errors.append(f"Ligne {i} : Réponse '{raw_ans[:10]}' invalide pour {num_opts} options.")
-        
-        elif q_type in ["Questions / Réponses", "Glossaire (Concept | Définition)"]:
-            if len(row) < 2:
-                errors.append(f"Ligne {i} : Format attendu 'A|B', trouvé seulement {len(row)} colonnes.")
-        
-        elif q_type == "Synthèse (Markdown)":
-            # Pas de validation CSV pour le Markdown
-            pass
-    
-    return errors, warnings
+    if bank is None:
+        bank = cached_parse_bank(csv_text, q_type)
+    if q_type == "QCM Classique" or q_type in QA_TYPES:
+        return bank.errors, bank.warnings
+    return [], bank.warnings
 
 # Configuration de la page
 st.set_page_config(page_title="QCM Master Pro v4", layout="wide", page_icon="🎯")
@@ -312,37 +254,18 @@ if selected != st.session_state.current_page:
 
 # --- DATABASE LOGIC (SQLite) ---
 DB_NAME = "qcm_master.db"
+DB_POOL = get_pool(DB_NAME)
 
 @contextmanager
 def db_context():
-    conn = sqlite3.connect(DB_NAME)
-    try:
+    """Connexion empruntée au pool (WAL, busy_timeout) pour la durée du bloc."""
+    with DB_POOL.connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 def init_db():
-    """Initialise les tables SQLite."""
+    """Crée ou met à jour le schéma SQLite (migrations versionnées, cf. db_engine.MIGRATIONS)."""
     with db_context() as conn:
-        c = conn.cursor()
-        # Table des utilisateurs
-        c.execute('''CREATE TABLE IF NOT EXISTS users 
-                     (email TEXT PRIMARY KEY, nom TEXT, prenom TEXT, user_id TEXT)''')
-        # Table de l'historique des scores
-        c.execute('''CREATE TABLE IF NOT EXISTS history 
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT, course TEXT, score INTEGER, total INTEGER, date TEXT)''')
-        # Table des modules éducatifs
-        c.execute('''CREATE TABLE IF NOT EXISTS educational_modules 
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, category TEXT, type TEXT, content TEXT, created_at TEXT)''')
-        # Table de progression
-        c.execute('''CREATE TABLE IF NOT EXISTS quiz_progress 
-                     (email TEXT, module_name TEXT, current_idx INTEGER, answers TEXT, last_updated TEXT, 
-                      PRIMARY KEY(email, module_name))''')
-        # Table des favoris
-        c.execute('''CREATE TABLE IF NOT EXISTS favorites 
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT, module_name TEXT, question_text TEXT, 
-                      options TEXT, answer TEXT, explanation TEXT, created_at TEXT)''')
-        conn.commit()
+        apply_migrations(conn)
 
 def validate_input(text, max_length=10000, allow_html=False):
     """Valide et nettoie les entrées utilisateur."""
@@ -372,39 +295,54 @@ def db_save_score(email, course, score, total):
                  (email, course, score, total, date_str))
         conn.commit()
 
-def db_get_best_score(email, course):
-    """Récupère le meilleur score."""
+def db_get_modules_status(email, module_names):
+    """Meilleur score et progression en cours pour une liste de modules, en une requête.
+
+    Retourne {nom: {"best": "score / total" ou "N/A", "in_progress": bool}}.
+    """
+    names = list(dict.fromkeys(module_names))
+    status = {name: {"best": "N/A", "in_progress": False} for name in names}
+    if not names:
+        return status
     email = email.lower()
+    placeholders = ",".join("?" * len(names))
+    # MAX() sur score : SQLite renvoie le total de la ligne retenue (idx_history_email_course_score)
+    query = f"""SELECT course, MAX(score), total, 0 FROM history
+                WHERE email = ? AND course IN ({placeholders}) GROUP BY course
+                UNION ALL
+                SELECT module_name, NULL, NULL, 1 FROM quiz_progress
+                WHERE email = ? AND module_name IN ({placeholders})"""
     with db_context() as conn:
-        c = conn.cursor()
-        c.execute("SELECT score, total FROM history WHERE email = ? AND course = ? ORDER BY score DESC LIMIT 1",
-                 (email, course))
-        res = c.fetchone()
-        if res:
-            return f"{res[0]} / {res[1]}"
-    return "N/A"
+        rows = conn.execute(query, [email, *names, email, *names]).fetchall()
+    for name, score, total, is_progress in rows:
+        if is_progress:
+            status[name]["in_progress"] = True
+        else:
+            status[name]["best"] = f"{score} / {total}"
+    return status
 
-def db_save_progress(email, module_name, current_idx, answers):
-    """Sauvegarde la progression."""
+def db_save_progress(email, module_name, current_idx, answers, shuffle=None):
+    """Sauvegarde la progression et le mélange de la copie ({"seed", "q", "o"})."""
     email = email.lower()
     ans_json = json.dumps(answers)
+    shuffle_json = json.dumps(shuffle) if shuffle else None
     date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
     with db_context() as conn:
         c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO quiz_progress (email, module_name, current_idx, answers, last_updated) VALUES (?, ?, ?, ?, ?)",
-                 (email, module_name, current_idx, ans_json, date_str))
+        c.execute("INSERT OR REPLACE INTO quiz_progress (email, module_name, current_idx, answers, last_updated, shuffle) VALUES (?, ?, ?, ?, ?, ?)",
+                 (email, module_name, current_idx, ans_json, date_str, shuffle_json))
         conn.commit()
 
 def db_load_progress(email, module_name):
-    """Charge la progression."""
+    """Charge la progression (shuffle vaut None pour une progression antérieure à sa sauvegarde)."""
     email = email.lower()
     with db_context() as conn:
         c = conn.cursor()
-        c.execute("SELECT current_idx, answers FROM quiz_progress WHERE email = ? AND module_name = ?",
+        c.execute("SELECT current_idx, answers, shuffle FROM quiz_progress WHERE email = ? AND module_name = ?",
                  (email, module_name))
         res = c.fetchone()
         if res:
-            return {"idx": res[0], "answers": json.loads(res[1])}
+            return {"idx": res[0], "answers": json.loads(res[1]), "shuffle": json.loads(res[2]) if res[2] else None}
     return None
 
 def db_clear_progress(email, module_name):
@@ -418,52 +356,78 @@ def db_clear_progress(email, module_name):
 def db_save_module(name, category, m_type, content):
     """Sauvegarde le module dans SQLite."""
     date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    search_text, question_count = module_index_fields(content, m_type)
     with db_context() as conn:
         c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO educational_modules (name, category, type, content, created_at) VALUES (?, ?, ?, ?, ?)",
-                 (name, category, m_type, content, date_str))
+        c.execute("INSERT OR REPLACE INTO educational_modules (name, category, type, content, created_at, search_text, question_count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                 (name, category, m_type, content, date_str, search_text, question_count))
         conn.commit()
 
-def db_get_modules(m_type=None, search="", limit=None, offset=0):
-    """Récupère les modules depuis SQL."""
-    query = "SELECT id, name, category, type, content, created_at FROM educational_modules WHERE 1=1"
+def _db_select_modules(columns, m_type=None, limit=None, offset=0):
+    """SELECT des modules par date décroissante, colonnes au choix."""
+    query = f"SELECT {', '.join(columns)} FROM educational_modules WHERE 1=1"
     params = []
     if m_type:
         query += " AND type = ?"
         params.append(m_type)
-    if search:
-        query += " AND (name LIKE ? OR category LIKE ?)"
-        params.extend([f"%{search}%", f"%{search}%"])
     
     query += " ORDER BY created_at DESC"
-    if limit:
-        query += " LIMIT ?"
-        params.append(limit)
-    if offset:
-        query += " OFFSET ?"
-        params.append(offset)
+    if limit or offset:
+        query += " LIMIT ? OFFSET ?"
+        params.extend([limit or -1, offset or 0])
         
     with db_context() as conn:
         c = conn.cursor()
         c.execute(query, params)
         return c.fetchall()
 
+def db_list_modules(m_type=None, search="", limit=None, offset=0):
+    """Liste légère : (id, name, category, type, created_at, question_count), sans le CSV."""
+    if search and search.strip():
+        return [row[:6] for row in db_search_modules(search, m_type, limit, offset, columns=MODULE_META_COLUMNS)]
+    return _db_select_modules(MODULE_META_COLUMNS, m_type, limit, offset)
+
+def db_get_module(m_id):
+    """Module complet (id, name, category, type, content, created_at) ou None."""
+    with db_context() as conn:
+        c = conn.cursor()
+        c.execute(f"SELECT {', '.join(MODULE_COLUMNS)} FROM educational_modules WHERE id = ?", (m_id,))
+        return c.fetchone()
+
+def db_get_module_content(m_id):
+    """Contenu CSV/Markdown d'un module, chargé à la demande."""
+    with db_context() as conn:
+        c = conn.cursor()
+        c.execute("SELECT content FROM educational_modules WHERE id = ?", (m_id,))
+        res = c.fetchone()
+    return res[0] if res else ""
+
 def db_count_modules(m_type=None, search=""):
     """Compte les modules."""
+    if search and search.strip():
+        with db_context() as conn:
+            return count_search_modules(conn, search, m_type)
     query = "SELECT COUNT(*) FROM educational_modules WHERE 1=1"
     params = []
     if m_type:
         query += " AND type = ?"
         params.append(m_type)
-    if search:
-        query += " AND (name LIKE ? OR category LIKE ?)"
-        params.extend([f"%{search}%", f"%{search}%"])
         
     with db_context() as conn:
         c = conn.cursor()
         c.execute(query, params)
         return c.fetchone()[0]
 
+def db_search_modules(search, m_type=None, limit=None, offset=0, columns=MODULE_COLUMNS):
+    """Recherche plein texte (nom, catégorie, questions, options, explications) classée par pertinence."""
+    with db_context() as conn:
+        return search_modules(conn, search, m_type, limit, offset, columns)
+
+def highlight_snippet(snippet):
+    """Extrait FTS échappé pour l'HTML, termes trouvés en <mark>."""
+    safe = html.escape(snippet or "").replace("\n", " • ")
+    return safe.replace(SNIPPET_OPEN, "<mark>").replace(SNIPPET_CLOSE, "</mark>")
+
 def db_delete_module(m_id):
     """Supprime un module."""
     with db_context() as conn:
@@ -523,58 +487,162 @@ def db_get_favorites(email):
             })
         return favs
 
-def db_export_to_excel():
-    """Génère un fichier Excel contenant toute la base de données."""
+def create_offline_bundle(search=""):
+    """Pack hors-ligne (ZIP) des modules, filtrés par la recherche, avec CSS/JS partagés."""
+    def render(module, assets_url):
+        m_id, name, _, m_type = module[:4]
+        return generate_export_html(db_get_module_content(m_id), name, m_type, assets_url=assets_url)
+
     output = io.BytesIO()
-    with db_context() as conn:
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            pd.read_sql_query("SELECT * FROM users", conn).to_excel(writer, sheet_name='Utilisateurs', index=False)
-            pd.read_sql_query("SELECT * FROM educational_modules", conn).to_excel(writer, sheet_name='Modules', index=False)
-            pd.read_sql_query("SELECT * FROM history", conn).to_excel(writer, sheet_name='Historique', index=False)
-            pd.read_sql_query("SELECT * FROM quiz_progress", conn).to_excel(writer, sheet_name='Progressions', index=False)
-            pd.read_sql_query("SELECT * FROM favorites", conn).to_excel(writer, sheet_name='Favoris', index=False)
+    write_offline_bundle(output, db_list_modules(search=search), render)
     return output.getvalue()
 
+def db_iter_modules(search="", batch=50):
+    """Modules complets (id, name, category, type, content) lus par lots sur un curseur, sans tout charger."""
+    if search and search.strip():
+        # Recherche classée : métadonnées d'abord, contenu chargé module par module
+        for m_id, name, category, m_type, *_ in db_list_modules(search=search):
+            yield m_id, name, category, m_type, db_get_module_content(m_id)
+        return
+    with db_context() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, name, category, type, content FROM educational_modules ORDER BY created_at DESC")
+        while True:
+            rows = c.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
+
+# Au-delà, l'export en construction passe de la mémoire à un fichier temporaire
+EXPORT_SPOOL_BYTES = 32 * 1024 * 1024
+
+@contextmanager
+def create_bulk_export_zip(search="", include_pdf=False, progress=None):
+    """ZIP de tous les modules (filtrés par la recherche) : source, HTML et PDF en option.
+
+    L'archive est écrite sur disque ; le bloc with reçoit le fichier ouvert en
+    lecture, supprimé à la sortie.
+    """
+    renderer = get_pdf_renderer()
+    include_pdf = include_pdf and renderer.available
+
+    def render(module):
+        m_id, name, _, m_type, content = module
+        html_code = generate_export_html(content, name, m_type)
+        files = [("sources", ".md" if m_type == "SUM" else ".csv", content), ("html", ".html", html_code)]
+        if include_pdf:
+            try:
+                files.append(("pdf", ".pdf", module_pdf(m_id, content, html_code=html_code,
+                                                        convert=lambda source, zoom: renderer.render(source, pdf_options(zoom)))))
+            except PdfRenderError as e:
+                # Source et HTML restent exportés ; le PDF manquant est signalé dans le manifeste
+                files.append(("pdf", ".txt", f"PDF impossible : {e}"))
+        return files
+
+    with tempfile.TemporaryDirectory(prefix="qcm_export_") as tmp:
+        path = os.path.join(tmp, "modules.zip")
+        count, errors = write_module_archive(path, db_iter_modules(search), render,
+                                             workers=renderer.max_workers, progress=progress)
+        logger.info(f"Export ZIP : {count} module(s), {len(errors)} erreur(s)")
+        with open(path, 'rb') as f:
+            yield f
+
+# Tables exportées et noms des feuilles Excel
+EXPORT_TABLES = {"users": "Utilisateurs", "educational_modules": "Modules", "history": "Historique",
+                 "quiz_progress": "Progressions", "favorites": "Favoris"}
+
+def db_export_to_excel(progress=None):
+    """Génère un fichier Excel contenant toute la base (lecture par lots, écriture en mode constant_memory)."""
+    with tempfile.TemporaryDirectory(prefix="qcm_export_") as tmp:
+        path = os.path.join(tmp, "export.xlsx")
+        with db_context() as conn:
+            # Chaque table n'est interrogée qu'au moment d'écrire sa feuille
+            sheets = ((sheet, *iter_rows(conn, f"SELECT * FROM {table}")) for table, sheet in EXPORT_TABLES.items())
+            write_xlsx(path, sheets, progress)
+        with open(path, 'rb') as f:
+            return f.read()
+
+def db_export_table_csv_gz(table):
+    """Une table en CSV compressé (gzip), pour les tables trop grandes pour Excel (historique)."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Table inconnue : {table}")
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as spool:
+        with db_context() as conn:
+            write_csv_gz(spool, *iter_rows(conn, f"SELECT * FROM {table}"))
+        spool.seek(0)
+        return spool.read()
+
 def get_user_recommendations(email, limit=3):
     """Recommandations simples."""
-    all_qcms = db_get_modules(m_type="QCM")
-    return [(m[1], "Nouveau module", m[2]) for m in all_qcms[:limit]]
+    latest = db_list_modules(m_type="QCM", limit=limit)
+    return [(m[1], "Nouveau module", m[2], m[0]) for m in latest]
 
 # Initialize DB on load
 init_db()
 
 # --- FONCTIONS UTILES ---
+def pdf_options(zoom=1.0, options=None):
+    """Options wkhtmltopdf par défaut (A4, marges 1.5cm) avec le zoom demandé."""
+    if options is None:
+        options = dict(PDF_DEFAULT_OPTIONS, zoom=str(zoom))
+    return options
+
 def convert_html_to_pdf(source_html, zoom=1.0, options=None):
-    """Convertit le HTML en PDF bytes via pdfkit. Supporte le zoom et les options personnalisées."""
+    """Convertit le HTML en PDF bytes via le moteur wkhtmltopdf partagé. Supporte le zoom et les options personnalisées."""
     try:
-        if options is None:
-            options = {
-                'page-size': 'A4',
-                'margin-top': '1.5cm',
-                'margin-right': '1.5cm',
-                'margin-bottom': '1.5cm',
-                'margin-left': '1.5cm',
-                'encoding': "UTF-8",
-                'zoom': str(zoom),
-                'no-outline': None,
-                'quiet': ''
-            }
-        
-        # Tentative de trouver wkhtmltopdf
-        path_wkhtmltopdf = r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe'
-        if not os.path.exists(path_wkhtmltopdf):
-            path_wkhtmltopdf = shutil.which("wkhtmltopdf")
-        
-        if path_wkhtmltopdf:
-            config = pdfkit.configuration(wkhtmltopdf=path_wkhtmltopdf)
-            return pdfkit.from_string(source_html, False, configuration=config, options=options)
-        else:
-            return pdfkit.from_string(source_html, False, options=options)
+        return get_pdf_renderer().render_cached(source_html, pdf_options(zoom, options))
     except Exception as e:
         logger.error(f"Erreur PDF : {e}")
         st.warning(f"⚠️ PDF impossible : {e}. Assurez-vous que wkhtmltopdf est installé.")
         return None
 
+def cached_pdf(source_html, zoom=1.0, options=None):
+    """PDF déjà généré pour ce HTML et ces options (None si jamais demandé)."""
+    return get_pdf_renderer().cached(source_html, pdf_options(zoom, options))
+
+# PDF des modules persistés entre redémarrages : clé (id, hash du contenu, zoom)
+PDF_DISK_CACHE = DiskCache(os.path.join("cache", "pdf"), suffix=".pdf")
+
+def module_pdf(m_id, content, zoom=1.0, html_code=None, convert=None):
+    """PDF d'un module depuis le cache disque ; rendu seulement si html_code est fourni.
+
+    convert(html, zoom) remplace convert_html_to_pdf hors du thread Streamlit (exports en lot).
+    """
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+    key = f"{m_id}_{digest}_{zoom:.2f}"
+    pdf_bytes = PDF_DISK_CACHE.get(key)
+    if pdf_bytes is None and html_code is not None:
+        pdf_bytes = (convert or convert_html_to_pdf)(html_code, zoom=zoom)
+        if pdf_bytes:
+            PDF_DISK_CACHE.put(key, pdf_bytes)
+    return pdf_bytes
+
+def estimate_pdf_zoom(content, m_type, zoom, target_pages):
+    """Ajuste le zoom pour viser un nombre de pages (estimation grossière par nombre de lignes)."""
+    if target_pages > 0:
+        total_q = content.count('\n')
+        est_p = (total_q * 0.05) if m_type == "QCM" else (total_q * 0.08)
+        if est_p > 0:
+            return min(zoom, (target_pages / est_p))
+    return zoom
+
+def render_module_exports(m_id, m_name, m_type, m_content, key_prefix):
+    """Panneau d'export HTML/PDF d'un module, construit uniquement pour la ligne ouverte."""
+    e1, e2, e3 = st.columns(3)
+    html_code = generate_export_html(m_content, m_name, m_type)
+    e1.download_button("🌐 HTML", html_code, f"{m_name}.html", key=f"{key_prefix}_html_{m_id}", use_container_width=True)
+    with e2:
+        z_val = st.slider("Zoom", 0.5, 2.0, 1.0, 0.1, key=f"{key_prefix}_z_{m_id}")
+        t_p = st.number_input("Pages visées", 0, 10, 0, key=f"{key_prefix}_p_{m_id}", help="0 pour auto")
+    zoom = estimate_pdf_zoom(m_content, m_type, z_val, t_p)
+    with e3:
+        pdf_bytes = module_pdf(m_id, m_content, zoom)
+        if pdf_bytes is None and st.button("📄 Générer PDF", key=f"{key_prefix}_gen_{m_id}", use_container_width=True):
+            with st.spinner("Génération du PDF..."):
+                pdf_bytes = module_pdf(m_id, m_content, zoom, html_code=html_code)
+        if pdf_bytes:
+            st.download_button("⬇️ PDF", pdf_bytes, f"{m_name}.pdf", key=f"{key_prefix}_dl_{m_id}", use_container_width=True)
+
 def generate_diploma(name, score, total, course_title):
     """Génère un PDF de diplôme pour les scores > 80%"""
     date_str = datetime.datetime.now().strftime("%d/%m/%Y")
@@ -623,35 +691,6 @@ def open_local_html(content, title, m_type):
         logger.error(f"Erreur preview HTML: {e}")
         return False
 
-def generate_answer_sheet(num_questions):
-    """Génère une feuille de cochage propre sur 3 colonnes"""
-    def make_table(q_range):
-        rows = ""
-        for i in q_range:
-            rows += f"""<tr><td style='font-weight:bold; width:30px;'>{i}</td>""" + "".join([f"<td style='width:30px; border:1px solid #000;'></td>" for _ in range(6)]) + "</tr>"
-        return f"""
-        <table style="width:100%; border-collapse: collapse; text-align:center; font-size:9pt; margin-bottom:20px;">
-            <thead><tr><th>N°</th><th>A</th><th>B</th><th>C</th><th>D</th><th>E</th><th>F</th></tr></thead>
-            <tbody>{rows}</tbody>
-        </table>"""
-
-    # Split into 3 chunks
-    q_per_col = (num_questions + 2) // 3
-    c1 = range(1, min(num_questions + 1, q_per_col + 1))
-    c2 = range(q_per_col + 1, min(num_questions + 1, 2 * q_per_col + 1))
-    c3 = range(2 * q_per_col + 1, num_questions + 1)
-
-    return f"""
-    <div style="page-break-before: always; margin-top:30px;">
-        <h2 style="text-align:center;">FEUILLE DE RÉPONSES (À COCHER)</h2>
-        <div style="display:flex; justify-content: space-between; gap: 20px;">
-            <div style="flex:1;">{make_table(c1)}</div>
-            <div style="flex:1;">{make_table(c2) if c2 else ""}</div>
-            <div style="flex:1;">{make_table(c3) if c3 else ""}</div>
-        </div>
-        <p style="font-size:8pt; text-align:center; margin-top:10px;">Cochez la case correspondante à votre réponse.</p>
-    </div>"""
-
 def generate_certificate_html(user_name, course_name, score, total):
     """Génère un HTML élégant pour le certificat de réussite."""
     from datetime import datetime
@@ -760,1322 +799,62 @@ def generate_certificate_html(user_name, course_name, score, total):
     """
     return html
 
-def generate_html_content(csv_text, title, use_columns, add_qr=True, mode="Examen", shuffle_q=False, shuffle_o=False, q_type="QCM Classique", add_sheet=True, open_all=False):
-    col_css = "column-count: 3; -webkit-column-count: 3; -moz-column-count: 3; column-gap: 30px;" if use_columns else ""
-    # Only show QR for QCM mode as it links to a correction sheet
-    qr_code_html = ""
-    if add_qr and q_type == "QCM Classique":
-        qr_code_html = f'<div style="text-align:right;"><img src="https://api.qrserver.com/v1/create-qr-code/?size=100x100&data=https://qcmwebapppy-bfxlibcaaelehxbv6qjyif.streamlit.app/#correction" alt="QR Correction" style="width:80px;"/> <br/><small>Scan pour correction</small></div>'
-    
-    html_content = f"""<!DOCTYPE html>
-<html lang="fr">
-<head>
-<meta charset="UTF-8">
-<title>{title}</title>
-<style>
-    body {{ font-family: 'Georgia', serif; line-height: 1.4; color: #000; padding: 20px; }}
-    h1 {{ text-align: center; border-bottom: 2px solid #000; padding-bottom: 5px; }}
-    .questions-wrapper {{ {col_css} margin-top: 15px; width: 100%; }}
-    .question-block {{ margin-bottom: 12px; padding-bottom: 8px; border-bottom: 1px dashed #ccc; break-inside: avoid; page-break-inside: avoid; }}
-    .question-text {{ font-weight: bold; font-size: 10pt; }}
-    .options {{ list-style: none; padding: 0; margin: 0; font-size: 9pt; }}
-    .options li {{ margin-bottom: 2px; }}
-    .options li::before {{ content: attr(data-letter) ". "; font-weight: bold; }}
-    table {{ width: 100%; border-collapse: collapse; margin-top: 20px; font-size: 9pt; }}
-    th, td {{ border: 1px solid #000; padding: 8px; text-align: left; vertical-align: top; }}
-    th {{ background-color: #eee; }}
-    .col-concept {{ width: 20%; font-weight: bold; }}
-    .col-def {{ width: 80%; }}
-    details {{ cursor: pointer; margin-top: 5px; font-size: 9pt; }}
-    details summary {{ list-style: none; font-weight: bold; color: #3498db; }}
-    details summary::-webkit-details-marker {{ display: none; }}
-    .qa-answer {{ padding: 10px; background: #f9f9f9; border-left: 3px solid #3498db; margin-top: 5px; }}
-    @media print {{ .no-print {{ display: none; }} }}
-</style>
-</head>
-<body>
-    {qr_code_html}
-    <h1>{title}</h1>
-    <div class="questions-wrapper">
-"""
-    
-    import random
-    f = io.StringIO(csv_text)
-    reader = csv.reader(f, delimiter='|')
-    header = next(reader, None)
-    
-    ans_col_idx = -1
-    if header:
-        for j, col in enumerate(header):
-            if col.strip().upper() in ["RÉPONSE", "REPONSE", "ANSWER"]:
-                ans_col_idx = j
-                break
-    
-    raw_questions = []
-    if q_type in ["Questions / Réponses", "Glossaire (Concept | Définition)"]:
-        for row in reader:
-            if len(row) < 2: continue
-            raw_questions.append({
-                'text': row[0].strip(),
-                'ans': row[1].strip(),
-                'type': 'QA' if q_type == "Questions / Réponses" else 'GLOSSARY'
-            })
-    else:
-        for row in reader:
-            if not row or not any(row): continue
-            if str(row[0]).strip().lower() in ["question", "titre"]: continue
-            if len(row) < 7: continue
-            q_text = row[0].strip()
-            
-            # Identify Answer Column
-            ans_idx = ans_col_idx
-            if ans_idx == -1 or ans_idx >= len(row):
-                ans_pattern = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
-                search_limit = min(len(row) - 1, 11)
-                for j in range(search_limit, 1, -1):
-                    val = row[j].strip().upper()
-                    if val and len(val) <= 15 and ans_pattern.match(val):
-                        ans_idx = j
-                        break
-                if ans_idx == -1: ans_idx = max(1, len(row) - 2)
-            
-            opts_text = [o.strip() for o in row[1:ans_idx] if o.strip()]
-            raw_ans_val = row[ans_idx].strip().upper()
-            expl = "|".join(row[ans_idx+1:])
-            
-            lets = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'][:len(opts_text)]
-            
-            # Robust answer extraction
-            ans_clean = ""
-            for char in raw_ans_val:
-                if char in lets: ans_clean += char
-                elif char in [';', ',', ' ', ':', '.', '/', '?']: continue
-                else: break
-            
-            correct_indices = [lets.index(l) for l in ans_clean if l in lets]
-            
-            raw_questions.append({
-                'text': q_text,
-                'opts_data': [{'text': o, 'is_correct': (i in correct_indices)} for i, o in enumerate(opts_text)],
-                'expl': expl,
-                'type': 'QCM'
-            })
-
-    if shuffle_q:
-        random.shuffle(raw_questions)
-
-    questions_html = ""
-    answers_rows = ""
-    glossary_table = ""
-    
-    if q_type == "Glossaire (Concept | Définition)":
-        glossary_table = "<table><thead><tr><th>Concept</th><th>Définition</th></tr></thead><tbody>"
-        for q in raw_questions:
-            glossary_table += f"<tr><td class='col-concept'>{q['text']}</td><td class='col-def'>{q['ans']}</td></tr>"
-        glossary_table += "</tbody></table>"
-        questions_html = glossary_table
-    else:
-        for q_idx, q in enumerate(raw_questions):
-            q_num = q_idx + 1
-            if q.get('type') == 'QA':
-                questions_html += f"""
-                <div class="question-block">
-                    <div class="question-text">{q_num}. {q['text']}</div>
-                    <details {"open" if open_all else ""}>
-                        <summary>▶ Réponse</summary>
-                        <div class="qa-answer">{q['ans']}</div>
-                    </details>
-                </div>"""
-                answers_rows += f"<tr><td>{q_num}</td><td colspan='2' style='font-weight:bold;'>{q['ans']}</td></tr>"
-            else:
-                opts_list = q['opts_data']
-                if shuffle_o: random.shuffle(opts_list)
-                final_lets = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'][:len(opts_list)]
-                new_ans_letters = "".join([final_lets[i] for i, opt in enumerate(opts_list) if opt['is_correct']])
-                
-                questions_html += f'<div class="question-block"><div class="question-text">{q_num}. {q["text"]}</div><ul class="options">'
-                for i, opt in enumerate(opts_list):
-                    questions_html += f'<li data-letter="{final_lets[i]}">{opt["text"]}</li>'
-                questions_html += "</ul>"
-                
-                if mode == "Révision":
-                    questions_html += f'<div style="margin-top: 5px; padding: 8px; background: #f0fdf4; border: 1px solid #27ae60; border-radius: 4px; font-size: 9pt;">'
-                    questions_html += f'<strong>Réponse : {new_ans_letters}</strong><br/>'
-                    questions_html += f'<em>💡 {q["expl"]}</em>'
-                    questions_html += '</div>'
-                questions_html += "</div>"
-                answers_rows += f"<tr><td>{q_num}</td><td style='font-weight:bold;'>{new_ans_letters}</td><td>{q['expl']}</td></tr>"
-
-    # Only show correction footer for QCM mode
-    if mode == "Examen" and q_type == "QCM Classique":
-        sheet_html = generate_answer_sheet(len(raw_questions)) if add_sheet else ""
-        footer = f"""
-        </div>
-        {sheet_html}
-        <div style="page-break-before: always;" id="correction">
-            <h2>Correction</h2>
-            <table><thead><tr><th>N°</th><th>Réponse</th><th>Explication</th></tr></thead><tbody>{answers_rows}</tbody></table>
-        </div>
-    </body></html>"""
-    else:
-        footer = "</div></body></html>"
-    
-    return html_content + questions_html + footer
+def generate_html_content(csv_text, title, use_columns, add_qr=True, mode="Examen", shuffle_q=False, shuffle_o=False, q_type="QCM Classique", add_sheet=True, open_all=False, bank=None, seed=None):
+    """Imprimable QCM/QA/glossaire ; le mélange est tiré de seed (derive_seed(titre, k) = copie d'examen V00k)."""
+    return render_print_html(csv_text, title, use_columns, add_qr=add_qr, mode=mode, shuffle_q=shuffle_q, shuffle_o=shuffle_o,
+                             q_type=q_type, add_sheet=add_sheet, open_all=open_all, bank=bank, seed=seed)
 
 # --- TEMPLATES HTML SPÉCIFIQUES PAR TYPE ---
 
 def generate_qa_html(content, title):
     """Génère un HTML propre pour les Questions / Réponses (Style Classique, Font Georgia)."""
-    f = io.StringIO(content)
-    reader = csv.reader(f, delimiter='|')
-    next(reader, None)
-    
-    items_html = ""
-    for i, row in enumerate(reader, 1):
-        if len(row) < 2: continue
-        q, a = row[0].strip(), row[1].strip()
-        items_html += f"""
-        <div class="qa-card">
-            <div class="qa-question">Q{i}. {q}</div>
-            <details>
-                <summary>▶ Afficher la réponse</summary>
-                <div class="qa-answer">{a}</div>
-            </details>
-        </div>"""
-    
-    return f"""<!DOCTYPE html>
-<html lang="fr">
-<head>
-<meta charset="UTF-8"><title>{title}</title>
-<style>
-    body {{ font-family: 'Georgia', serif; max-width: 900px; margin: auto; padding: 30px; color: #1e293b; background: #f8fafc; }}
-    h1 {{ text-align: center; color: #1e40af; border-bottom: 3px solid #3b82f6; padding-bottom: 10px; }}
-    .qa-card {{ background: white; border-radius: 10px; padding: 18px; margin-bottom: 16px; box-shadow: 0 2px 6px rgba(0,0,0,0.06); border-left: 4px solid #3b82f6; }}
-    .qa-question {{ font-weight: 700; font-size: 1.05em; color: #1e293b; }}
-    details {{ margin-top: 8px; }}
-    details summary {{ cursor: pointer; font-weight: 600; color: #3b82f6; list-style: none; }}
-    details summary::-webkit-details-marker {{ display: none; }}
-    .qa-answer {{ padding: 12px; background: #eff6ff; border-radius: 6px; margin-top: 6px; line-height: 1.6; }}
-    @media print {{ body {{ background: white; }} .qa-card {{ box-shadow: none; border: 1px solid #ddd; }} }}
-</style>
-</head>
-<body>
-    <h1>❓ {title}</h1>
-    {items_html}
-</body></html>"""
+    return render_qa_html(content, title)
 
 def generate_def_html(content, title):
     """Génère un HTML propre pour les Définitions / Glossaire (Style Classique, Font Georgia)."""
-    f = io.StringIO(content)
-    reader = csv.reader(f, delimiter='|')
-    next(reader, None)
-    
-    rows_html = ""
-    for i, row in enumerate(reader, 1):
-        if len(row) < 2: continue
-        concept, definition = row[0].strip(), row[1].strip()
-        rows_html += f"""<tr><td class="concept">{concept}</td><td class="definition">{definition}</td></tr>"""
-    
-    return f"""<!DOCTYPE html>
-<html lang="fr">
-<head>
-<meta charset="UTF-8"><title>{title}</title>
-<style>
-    body {{ font-family: 'Georgia', serif; max-width: 960px; margin: auto; padding: 30px; color: #1e293b; background: #f8fafc; }}
-    h1 {{ text-align: center; color: #7c3aed; border-bottom: 3px solid #8b5cf6; padding-bottom: 10px; }}
-    table {{ width: 100%; border-collapse: collapse; margin-top: 20px; background: white; border-radius: 10px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.06); }}
-    th {{ background: #7c3aed; color: white; padding: 14px; text-align: left; font-size: 1em; }}
-    td {{ padding: 12px 14px; border-bottom: 1px solid #f1f5f9; vertical-align: top; }}
-    tr:hover {{ background: #faf5ff; }}
-    .concept {{ font-weight: 700; width: 25%; color: #6d28d9; font-size: 1em; }}
-    .definition {{ line-height: 1.6; color: #334155; }}
-    @media print {{ body {{ background: white; }} table {{ box-shadow: none; border: 1px solid #ddd; }} }}
-</style>
-</head>
-<body>
-    <h1>📜 {title}</h1>
-    <table>
-        <thead><tr><th>Concept</th><th>Définition</th></tr></thead>
-        <tbody>{rows_html}</tbody>
-    </table>
-</body></html>"""
-
-def generate_sum_html(content, title, theme="theme-ocean", font_size="11pt", margin="2.5cm", justified=True):
-    """Génère un HTML brillant pour les synthèses avec thèmes injectés depuis l'app."""
-    html_body = markdown.markdown(content, extensions=['extra', 'sane_lists', 'nl2br', 'toc'])
-    
-    just_class = "justified" if justified else ""
-    
-    return f"""<!DOCTYPE html>
-<html lang="fr">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>{title}</title>
-<style>
-    :root {{
-        --p-color: #1e293b;
-        --s-color: #64748b;
-        --accent: #2563eb;
-        --bg: #ffffff;
-        --paper: #ffffff;
-        --border: #e2e8f0;
-        --page-margin: {margin};
-        --font-size: {font_size};
-    }}
-
-    /* --- THÈMES --- */
-    body.theme-ocean {{
-        --p-color: #1e1b4b; --s-color: #4338ca; --accent: #3b82f6; --bg: #f8fafc; --border: #bfdbfe;
-    }}
-    body.theme-ocean h1 {{ background: linear-gradient(135deg, #1e3a8a, #3b82f6); -webkit-background-clip: text; -webkit-text-fill-color: transparent; border-bottom: 3px solid #3b82f6; }}
-    body.theme-ocean h2 {{ color: #1e40af; border-left: 4px solid #3b82f6; padding-left: 15px; }}
-    body.theme-ocean ul li::marker {{ color: #3b82f6; }}
-
-    body.theme-emerald {{
-        --p-color: #064e3b; --s-color: #059669; --accent: #10b981; --bg: #f0fdf4; --border: #bcfdec;
-    }}
-    body.theme-emerald h2 {{ color: #047857; background: #ecfdf5; padding: 8px 15px; border-radius: 6px; }}
-    body.theme-emerald ol li::marker {{ color: #059669; font-weight: bold; }}
-
-    body.theme-lavender {{
-        --p-color: #4c1d95; --s-color: #7c3aed; --accent: #8b5cf6; --bg: #f5f3ff; --border: #ddd6fe;
-    }}
-    body.theme-lavender h1 {{ color: #5b21b6; border-bottom: 3px dashed #8b5cf6; }}
-    body.theme-lavender h2 {{ color: #6d28d9; border-bottom: 2px solid #ddd6fe; }}
-
-    body.theme-midnight {{
-        --p-color: #0f172a; --s-color: #334155; --accent: #38bdf8; --bg: #f1f5f9; --border: #cbd5e0;
-    }}
-    body.theme-midnight h1 {{ color: #1e293b; text-transform: uppercase; letter-spacing: 2px; }}
-
-    body.theme-sepia {{
-        --p-color: #431407; --s-color: #92400e; --accent: #b45309; --bg: #fffbeb; --border: #fde68a;
-    }}
-    body.theme-sepia h1 {{ color: #78350f; font-family: 'Times New Roman', serif; }}
-
-    /* Thème Minimaliste (Compact pour Impression) */
-    body.theme-minimal {{
-        --p-color: #000000; --s-color: #000000; --accent: #000000; --bg: #ffffff; --border: #000000;
-    }}
-    body.theme-minimal {{ line-height: 1.3; }}
-    body.theme-minimal h1 {{ font-size: 1.8em; margin-bottom: 15px; border-bottom: 1px solid #000; }}
-    body.theme-minimal h2 {{ font-size: 1.3em; margin-top: 15px; margin-bottom: 5px; border: none; padding: 0; }}
-    body.theme-minimal h3 {{ font-size: 1.1em; margin-top: 10px; margin-bottom: 3px; }}
-    body.theme-minimal p {{ margin-bottom: 0.4em; }}
-    body.theme-minimal ul, body.theme-minimal ol {{ margin: 10px 0 10px 25px; }}
-    body.theme-minimal li {{ margin-bottom: 2px; }}
-
-    /* Thème Mémorisation (Vibrant & Structuré) */
-    body.theme-memo {{
-        --p-color: #1e293b; --s-color: #4f46e5; --accent: #f59e0b; --bg: #ffffff; --border: #e2e8f0;
-    }}
-    body.theme-memo h1 {{ background: #1e293b; color: white; padding: 30px; border-radius: 15px; text-transform: uppercase; letter-spacing: 3px; border: none; }}
-    body.theme-memo h2 {{ background: #fef3c7; color: #92400e; padding: 12px 20px; border-radius: 12px; border-left: 8px solid #f59e0b; box-shadow: 3px 3px 0px #fde68a; }}
-    body.theme-memo h3 {{ color: #4338ca; border-bottom: 2px solid #e0e7ff; display: inline-block; padding-bottom: 2px; }}
-    body.theme-memo blockquote {{ background: #fff7ed; border-color: #f59e0b; color: #7c2d12; }}
-    body.theme-memo ul li::marker {{ color: #f59e0b; content: "⚡ "; }}
-
-    body.theme-classic {{
-        --p-color: #000000; --s-color: #334155; --accent: #000000; --bg: #ffffff; --border: #cbd5e0;
-    }}
-
-    * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-    @page {{ size: A4; margin: var(--page-margin); }}
-    
-    body {{ 
-        font-family: 'Georgia', serif; 
-        font-size: var(--font-size); 
-        line-height: 1.7; 
-        color: var(--p-color); 
-        background: var(--bg);
-        max-width: 900px;
-        margin: 0 auto;
-        padding: 50px 40px;
-        counter-reset: h2counter;
-    }}
-
-    h1 {{ text-align: center; font-size: 2.6em; margin-bottom: 40px; padding-bottom: 20px; font-weight: bold; }}
-    h2 {{ counter-reset: h3counter; margin-top: 2em; margin-bottom: 15px; font-size: 1.8em; font-weight: bold; }}
-    h2::before {{ counter-increment: h2counter; content: counter(h2counter) ". "; }}
-    h3 {{ margin-top: 1.5em; margin-bottom: 10px; font-size: 1.3em; color: var(--s-color); }}
-    h3::before {{ counter-increment: h3counter; content: counter(h2counter) "." counter(h3counter) " "; }}
-    
-    .justified p {{ text-align: justify; }}
-    p {{ margin-bottom: 1.2em; white-space: pre-wrap; }}
-    
-    ul, ol {{ margin: 20px 0 20px 40px; }}
-    li {{ margin-bottom: 10px; padding-left: 5px; }}
-    ul li::marker {{ font-size: 1.2em; }}
-    
-    table {{ width: 100%; border-collapse: collapse; margin: 30px 0; border: 2px solid var(--p-color); background: white; }}
-    th {{ background: #f8fafc; padding: 15px; border: 1px solid var(--p-color); text-align: left; font-weight: bold; }}
-    td {{ padding: 12px; border: 1px solid var(--p-color); }}
-    
-    blockquote {{
-        border-left: 6px solid var(--accent); background: #f1f5f9; padding: 20px 30px; margin: 25px 0;
-        font-style: italic; border-radius: 0 10px 10px 0; box-shadow: 2px 2px 10px rgba(0,0,0,0.05);
-    }}
-
-    @media print {{
-        body {{ padding: 0; max-width: 100%; }}
-        .no-print {{ display: none !important; }}
-    }}
-    @media (max-width: 600px) {{ body {{ padding: 20px; }} h1 {{ font-size: 2em; }} }}
-</style>
-</head>
-<body class="{theme} {just_class}">
-    <h1>{title}</h1>
-    <div class="content">
-        {html_body}
-    </div>
-</body>
-</html>"""
-
-    
+    return render_def_html(content, title)
 
+def generate_sum_html(content, title, theme="theme-ocean", font_size="11pt", margin="2.5cm", justified=True, assets_url=None):
+    """Génère un HTML brillant pour les synthèses avec thèmes injectés depuis l'app."""
+    return render_sum_html(content, title, theme=theme, font_size=font_size, margin=margin, justified=justified,
+                           assets_url=assets_url)
 
-def generate_js_quiz_html(content, title, timer_seconds=0):
+def generate_js_quiz_html(content, title, timer_seconds=0, bank=None, assets_url=None, seed=None):
     """Génère un QCM interactif Premium avec Randomisation, All-or-Nothing Scoring, Dark Mode et Export PDF."""
-    questions = parse_csv(content)
-    import json
-    import random
-    
-    # Shuffle questions AND options for each question
-    shuffled_questions = []
-    for q in questions:
-        q_copy = q.copy()
-        # Create option mapping before shuffling
-        options_with_letters = [(chr(65 + i), opt) for i, opt in enumerate(q['opts'])]
-        random.shuffle(options_with_letters)
-        
-        # Build new mapping
-        new_letters = [item[0] for item in options_with_letters]
-        q_copy['opts'] = [item[1] for item in options_with_letters]
-        
-        # Update correct answer to match new positions
-        correct_answers = list(q['ans'])
-        new_correct = ''.join([chr(65 + new_letters.index(old_letter)) 
-                              for old_letter in correct_answers if old_letter in new_letters])
-        q_copy['ans'] = new_correct
-        shuffled_questions.append(q_copy)
-    
-    # Shuffle question order
-    random.shuffle(shuffled_questions)
-    
-    q_json = json.dumps(shuffled_questions, ensure_ascii=False)
-    
-    html = f"""<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title} - Quiz Interactif Premium</title>
-    <style>
-        :root {{
-            --primary: #1a365d;
-            --primary-dark: #0f2644;
-            --primary-light: #2c5282;
-            --success: #16a34a;
-            --success-dark: #15803d;
-            --danger: #dc2626;
-            --danger-dark: #b91c1c;
-            --warning: #d69e2e;
-            --bg: #fafaf9;
-            --card-bg: #ffffff;
-            --text: #1a202c;
-            --text-secondary: #4a5568;
-            --border: #e2e8f0;
-            --shadow: rgba(0, 0, 0, 0.08);
-            --shadow-lg: rgba(0, 0, 0, 0.12);
-            --radius: 12px;
-            --radius-lg: 16px;
-        }}
-        
-        [data-theme="dark"] {{
-            --bg: #0f172a;
-            --card-bg: #1e293b;
-            --text: #f1f5f9;
-            --text-secondary: #94a3b8;
-            --border: #334155;
-            --shadow: rgba(0, 0, 0, 0.3);
-            --shadow-lg: rgba(0, 0, 0, 0.5);
-        }}
-        
-        * {{ 
-            margin: 0; 
-            padding: 0; 
-            box-sizing: border-box; 
-        }}
-        
-        html {{
-            scroll-behavior: smooth;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }}
-        
-        body {{
-            font-family: Georgia, 'Times New Roman', Times, serif;
-            background: var(--bg);
-            color: var(--text);
-            line-height: 1.8;
-            transition: background-color 0.3s ease, color 0.3s ease;
-            overflow-x: hidden;
-        }}
-        
-        /* ===== HEADER ===== */
-        header {{
-            background: var(--card-bg);
-            padding: 0.75rem 1rem;
-            border-bottom: 2px solid var(--border);
-            position: sticky;
-            top: 0;
-            z-index: 1000;
-            box-shadow: 0 1px 3px var(--shadow);
-            transition: all 0.3s ease;
-        }}
-        
-        .header-content {{
-            max-width: 1000px;
-            margin: 0 auto;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            gap: 1rem;
-        }}
-        
-        .header-title {{
-            flex: 1;
-            min-width: 150px;
-        }}
-        
-        h1 {{
-            font-size: clamp(1.125rem, 4vw, 1.5rem);
-            font-weight: 600;
-            color: var(--primary);
-            margin-bottom: 0.5rem;
-            letter-spacing: 0.01em;
-        }}
-        
-        .progress-container {{
-            height: 6px;
-            background: var(--border);
-            border-radius: 999px;
-            overflow: hidden;
-            position: relative;
-        }}
-        
-        .progress-bar {{
-            height: 100%;
-            background: var(--success);
-            transition: width 0.5s cubic-bezier(0.4, 0, 0.2, 1);
-            border-radius: 999px;
-        }}
-        
-        .header-stats {{
-            display: flex;
-            gap: clamp(0.75rem, 2vw, 1.5rem);
-            align-items: center;
-        }}
-        
-        .stat-box {{
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            gap: 0.125rem;
-        }}
-        
-        .stat-label {{
-            font-size: 0.625rem;
-            color: var(--text-secondary);
-            text-transform: uppercase;
-            letter-spacing: 0.05em;
-            font-weight: 600;
-        }}
-        
-        .stat-value {{
-            font-size: clamp(1rem, 3vw, 1.25rem);
-            font-weight: 700;
-            color: var(--primary);
-            font-variant-numeric: tabular-nums;
-        }}
-        
-        .timer-box .stat-value {{
-            color: var(--danger);
-            font-family: 'SF Mono', 'Monaco', 'Courier New', monospace;
-        }}
-        
-        .action-buttons {{
-            display: flex;
-            gap: 0.5rem;
-        }}
-        
-        .icon-btn {{
-            min-width: 44px;
-            min-height: 44px;
-            width: 44px;
-            height: 44px;
-            border-radius: 10px;
-            border: none;
-            background: var(--border);
-            color: var(--text);
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.25rem;
-            transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
-        }}
-        
-        .icon-btn:active {{
-            transform: scale(0.95);
-        }}
-        
-        .icon-btn:hover {{
-            background: var(--primary);
-            color: white;
-        }}
-        
-        /* ===== CONTAINER ===== */
-        .container {{
-            max-width: 900px;
-            margin: 0 auto;
-            padding: clamp(1rem, 3vw, 2rem) 1rem;
-        }}
-        
-        /* ===== CARDS ===== */
-        .card {{
-            background: var(--card-bg);
-            border: 1px solid var(--border);
-            border-radius: var(--radius);
-            padding: clamp(1rem, 3vw, 1.5rem);
-            margin-bottom: clamp(0.75rem, 2vw, 1rem);
-            box-shadow: 0 2px 8px var(--shadow), 0 0 0 1px rgba(0,0,0,0.02);
-            transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        }}
-        
-        .card.answered {{
-            opacity: 0.92;
-            border-color: var(--success);
-        }}
-        
-        .question-header {{
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 1rem;
-            gap: 0.5rem;
-        }}
-        
-        .question-number {{
-            font-size: 0.75rem;
-            font-weight: 700;
-            color: var(--text-secondary);
-            background: var(--border);
-            padding: 0.375rem 0.875rem;
-            border-radius: 999px;
-            letter-spacing: 0.02em;
-        }}
-        
-        .question-status {{
-            font-size: 1.5rem;
-            animation: popIn 0.3s cubic-bezier(0.68, -0.55, 0.265, 1.55);
-        }}
-        
-        @keyframes popIn {{
-            0% {{ transform: scale(0); opacity: 0; }}
-            100% {{ transform: scale(1); opacity: 1; }}
-        }}
-        
-        .question-text {{
-            font-size: clamp(1rem, 3vw, 1.125rem);
-            font-weight: 600;
-            margin-bottom: 1.5rem;
-            line-height: 1.7;
-            color: var(--text);
-        }}
-        
-        /* ===== OPTIONS ===== */
-        .options {{
-            display: flex;
-            flex-direction: column;
-            gap: 0.75rem;
-        }}
-        
-        .option {{
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-            padding: 0.75rem 1rem;
-            border: 2px solid var(--border);
-            border-radius: 8px;
-            cursor: pointer;
-            transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
-            position: relative;
-            overflow: hidden;
-            min-height: 48px;
-        }}
-        
-        .option::before {{
-            content: '';
-            position: absolute;
-            left: 0;
-            top: 0;
-            height: 100%;
-            width: 0;
-            background: var(--primary);
-            opacity: 0.05;
-            transition: width 0.2s ease;
-        }}
-        
-        .option:active {{
-            transform: scale(0.98);
-        }}
-        
-        .option:hover:not(.correct):not(.incorrect)::before {{
-            width: 100%;
-        }}
-        
-        .option:hover:not(.correct):not(.incorrect) {{
-            border-color: var(--primary-light);
-        }}
-        
-        .option.selected {{
-            border-color: var(--primary);
-            background: rgba(26, 54, 93, 0.08);
-        }}
-        
-        .option.correct {{
-            border-color: var(--success);
-            background: rgba(22, 163, 74, 0.12);
-            animation: correctPulse 0.5s ease;
-        }}
-        
-        .option.incorrect {{
-            border-color: var(--danger);
-            background: rgba(220, 38, 38, 0.12);
-            animation: shake 0.4s ease;
-        }}
-        
-        @keyframes correctPulse {{
-            0%, 100% {{ transform: scale(1); }}
-            50% {{ transform: scale(1.02); }}
-        }}
-        
-        @keyframes shake {{
-            0%, 100% {{ transform: translateX(0); }}
-            25% {{ transform: translateX(-5px); }}
-            75% {{ transform: translateX(5px); }}
-        }}
-        
-        .option input[type="checkbox"] {{
-            width: 22px;
-            height: 22px;
-            accent-color: var(--primary);
-            cursor: pointer;
-            flex-shrink: 0;
-        }}
-        
-        .option-letter {{
-            font-weight: 700;
-            color: var(--primary);
-            min-width: 28px;
-            font-size: 1.125rem;
-            flex-shrink: 0;
-        }}
-        
-        .option-text {{
-            flex: 1;
-            line-height: 1.5;
-        }}
-        
-        /* ===== BUTTONS ===== */
-        .btn {{
-            background: var(--primary);
-            color: white;
-            padding: 0.65rem 1.25rem;
-            border-radius: 8px;
-            border: none;
-            font-size: 0.95rem;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            gap: 0.5rem;
-            margin-top: 1rem;
-            min-height: 44px;
-            box-shadow: 0 2px 8px rgba(26, 54, 93, 0.2);
-        }}
-        
-        .btn:active:not(:disabled) {{
-            transform: translateY(1px) scale(0.98);
-        }}
-        
-        .btn:hover:not(:disabled) {{
-            background: var(--primary-dark);
-            transform: translateY(-1px);
-        }}
-        
-        .btn:disabled {{
-            opacity: 0.5;
-            cursor: not-allowed;
-            box-shadow: none;
-        }}
-        
-        /* ===== FEEDBACK ===== */
-        .feedback {{
-            margin-top: 1.5rem;
-            padding: 1.25rem;
-            border-radius: 10px;
-            border-left: 4px solid;
-            animation: slideInUp 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        }}
-        
-        @keyframes slideInUp {{
-            from {{ opacity: 0; transform: translateY(10px); }}
-            to {{ opacity: 1; transform: translateY(0); }}
-        }}
-        
-        .feedback.correct {{
-            background: #d1fae5;
-            border-color: var(--success);
-            color: #065f46;
-        }}
-        
-        .feedback.incorrect {{
-            background: #fee2e2;
-            border-color: var(--danger);
-            color: #991b1b;
-        }}
-        
-        .feedback-title {{
-            font-weight: 700;
-            font-size: 1.125rem;
-            margin-bottom: 0.5rem;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }}
-        
-        .explanation {{
-            font-style: italic;
-            margin-top: 0.5rem;
-            opacity: 0.9;
-            line-height: 1.6;
-        }}
-        
-        /* ===== RESULTS PAGE ===== */
-        .results-page {{
-            text-align: center;
-            padding: clamp(2rem, 5vw, 3rem) 1rem;
-            animation: fadeIn 0.5s ease;
-        }}
-        
-        @keyframes fadeIn {{
-            from {{ opacity: 0; }}
-            to {{ opacity: 1; }}
-        }}
-        
-        .results-card {{
-            background: var(--card-bg);
-            border-radius: var(--radius-lg);
-            padding: clamp(2rem, 5vw, 3rem);
-            box-shadow: 0 8px 32px var(--shadow-lg);
-            max-width: 600px;
-            margin: 0 auto;
-        }}
-        
-        .results-icon {{
-            font-size: clamp(3rem, 10vw, 5rem);
-            margin-bottom: 1rem;
-            animation: bounceIn 0.6s cubic-bezier(0.68, -0.55, 0.265, 1.55);
-        }}
-        
-        @keyframes bounceIn {{
-            0% {{ transform: scale(0); }}
-            50% {{ transform: scale(1.1); }}
-            100% {{ transform: scale(1); }}
-        }}
-        
-        .results-title {{
-            font-size: clamp(1.5rem, 5vw, 2rem);
-            font-weight: 700;
-            margin-bottom: 0.5rem;
-        }}
-        
-        .results-score {{
-            font-size: clamp(2.5rem, 10vw, 4rem);
-            font-weight: 700;
-            color: var(--primary);
-            margin: 1rem 0;
-            font-variant-numeric: tabular-nums;
-        }}
-        
-        .results-stats {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(100px, 1fr));
-            gap: 1rem;
-            margin: 2rem 0;
-        }}
-        
-        .results-stat {{
-            padding: 1.25rem 1rem;
-            background: var(--border);
-            border-radius: 10px;
-            transition: transform 0.2s ease;
-        }}
-        
-        .results-stat:hover {{
-            transform: translateY(-2px);
-        }}
-        
-        .results-stat-value {{
-            font-size: clamp(1.25rem, 4vw, 1.5rem);
-            font-weight: 700;
-            color: var(--primary);
-        }}
-        
-        .results-stat-label {{
-            font-size: 0.875rem;
-            color: var(--text-secondary);
-            margin-top: 0.25rem;
-        }}
-        
-        .results-message {{
-            font-size: clamp(1rem, 3vw, 1.125rem);
-            color: var(--text-secondary);
-            margin: 1.5rem 0;
-            line-height: 1.6;
-        }}
-        
-        .results-actions {{
-            display: flex;
-            gap: 0.75rem;
-            justify-content: center;
-            margin-top: 2rem;
-            flex-wrap: wrap;
-        }}
-        
-        .btn-secondary {{
-            background: var(--border);
-            color: var(--text);
-            box-shadow: 0 2px 8px var(--shadow);
-        }}
-        
-        .btn-secondary:hover {{
-            background: var(--text-secondary);
-            color: white;
-            box-shadow: 0 4px 12px rgba(100, 116, 139, 0.4);
-        }}
-        
-        /* ===== RESPONSIVE ===== */
-        @media (max-width: 768px) {{
-            header {{
-                padding: 0.875rem 1rem;
-            }}
-            
-            .header-content {{
-                flex-wrap: wrap;
-            }}
-            
-            .header-title {{
-                width: 100%;
-                margin-bottom: 0.5rem;
-            }}
-            
-            .header-stats {{
-                flex: 1;
-                justify-content: flex-start;
-            }}
-            
-            .stat-box {{
-                min-width: 60px;
-            }}
-            
-            .card {{
-                border-radius: 10px;
-            }}
-            
-            .option {{
-                padding: 0.875rem 1rem;
-                gap: 0.75rem;
-            }}
-            
-            .results-actions {{
-                flex-direction: column;
-            }}
-            
-            .results-actions .btn {{
-                width: 100%;
-            }}
-        }}
-        
-        @media (max-width: 480px) {{
-            .action-buttons {{
-                position: fixed;
-                bottom: 1rem;
-                right: 1rem;
-                flex-direction: column;
-                gap: 0.5rem;
-                z-index: 999;
-            }}
-            
-            .icon-btn {{
-                box-shadow: 0 4px 12px var(--shadow-lg);
-            }}
-            
-            .stat-label {{
-                font-size: 0.5rem;
-            }}
-            
-            .option {{
-                font-size: 0.9375rem;
-            }}
-        }}
-        
-        /* ===== PRINT ===== */
-        @media print {{
-            header, .action-buttons, .btn {{ display: none !important; }}
-            body {{ background: white !important; }}
-            .card {{ 
-                page-break-inside: avoid; 
-                box-shadow: none; 
-                border: 1px solid #ddd; 
-                margin-bottom: 1.5rem;
-            }}
-            .option {{ border: 1px solid #ddd; }}
-            * {{ color: black !important; }}
-        }}
-        
-        /* ===== UTILITIES ===== */
-        .no-select {{
-            user-select: none;
-            -webkit-user-select: none;
-        }}
-        
-        /* Loading state */
-        .loading {{
-            opacity: 0.6;
-            pointer-events: none;
-        }}
-    </style>
-</head>
-<body>
-    <header>
-        <div class="header-content">
-            <div class="header-title">
-                <h1>{title}</h1>
-                <div class="progress-container">
-                    <div class="progress-bar" id="progress"></div>
-                </div>
-            </div>
-            <div class="header-stats">
-                {f'<div class="stat-box timer-box"><span class="stat-label">Temps</span><span class="stat-value" id="timer">--:--</span></div>' if timer_seconds > 0 else ''}
-                <div class="stat-box">
-                    <span class="stat-label">Score</span>
-                    <span class="stat-value"><span id="current-score">0</span> / <span id="total-q">0</span></span>
-                </div>
-                <div class="stat-box">
-                    <span class="stat-label">Progrès</span>
-                    <span class="stat-value" id="answered-count">0</span>
-                </div>
-            </div>
-            <div class="action-buttons">
-                <button class="icon-btn" onclick="toggleTheme()" title="Mode Sombre">🌙</button>
-                <button class="icon-btn" onclick="resetProgress()" title="Réinitialiser">🔄</button>
-            </div>
-        </div>
-    </header>
-
-    <div class="container" id="quiz-container"></div>
-    <div class="container" id="results-container" style="display: none;"></div>
-
-    <script>
-        const questions = {q_json};
-        const title = "{title}";
-        const hasTimer = {str(timer_seconds > 0).lower()};
-        const storageKey = "qcm_js_premium_" + btoa(unescape(encodeURIComponent(title)));
-        
-        let state = {{
-            score: 0,
-            answered: {{}},
-            timeLeft: {timer_seconds},
-            timeUp: false,
-            showResults: false
-        }};
-
-        // Load progress
-        const saved = localStorage.getItem(storageKey);
-        if (saved) {{
-            try {{ state = JSON.parse(saved); }}
-            catch(e) {{}}
-        }}
-
-        const container = document.getElementById('quiz-container');
-        const resultsContainer = document.getElementById('results-container');
-        document.getElementById('total-q').textContent = questions.length;
-
-        function updateGlobalUI() {{
-            const answeredCount = Object.keys(state.answered).length;
-            const progressPercent = (answeredCount / questions.length * 100);
-            document.getElementById('progress').style.width = progressPercent + '%';
-            document.getElementById('current-score').textContent = state.score;
-            document.getElementById('answered-count').textContent = answeredCount;
-            
-            // Check if all answered
-            if (answeredCount === questions.length && !state.showResults) {{
-                setTimeout(showResults, 500);
-            }}
-        }}
-
-        function renderQuiz() {{
-            if (state.showResults) {{
-                showResults();
-                return;
-            }}
-            
-            container.innerHTML = '';
-            resultsContainer.style.display = 'none';
-            container.style.display = 'block';
-            
-            questions.forEach((q, idx) => {{
-                const card = document.createElement('div');
-                card.className = 'card';
-                if (state.answered[idx] !== undefined) card.classList.add('answered');
-                card.id = 'q-' + idx;
-                
-                const isAnswered = state.answered[idx] !== undefined;
-                const userSelected = isAnswered ? state.answered[idx].selected : (window.tempSelections && window.tempSelections[idx] ? window.tempSelections[idx] : []);
-                const correctAnswers = q.ans.split('');
-
-                let optionsHtml = '';
-                q.opts.forEach((opt, oIdx) => {{
-                    const letter = String.fromCharCode(65 + oIdx);
-                    let optClass = 'option';
-                    
-                    if (isAnswered) {{
-                        if (correctAnswers.includes(letter)) optClass += ' correct';
-                        else if (userSelected.includes(letter)) optClass += ' incorrect';
-                    }} else if (userSelected.includes(letter)) {{
-                        optClass += ' selected';
-                    }}
-
-                    optionsHtml += `
-                        <div class="${{optClass}}" onclick="toggleOption(${{idx}}, '${{letter}}')">
-                            <input type="checkbox" 
-                                ${{userSelected.includes(letter) ? 'checked' : ''}} 
-                                ${{isAnswered || state.timeUp ? 'disabled' : ''}}>
-                            <span class="option-letter">${{letter}}</span>
-                            <span class="option-text">${{opt}}</span>
-                        </div>
-                    `;
-                }});
-
-                const isCorrect = isAnswered && state.answered[idx].score === 1;
-                const statusEmoji = isAnswered ? (isCorrect ? '✅' : '❌') : '';
-
-                card.innerHTML = `
-                    <div class="question-header">
-                        <span class="question-number">Question ${{idx + 1}} / ${{questions.length}}</span>
-                        <span class="question-status">${{statusEmoji}}</span>
-                    </div>
-                    <div class="question-text">${{q.text}}</div>
-                    <div class="options">${{optionsHtml}}</div>
-                    <button class="btn" id="btn-${{idx}}" 
-                        onclick="validateQuestion(${{idx}})"
-                        ${{isAnswered || state.timeUp || userSelected.length === 0 ? 'disabled' : ''}}>
-                        ✓ Valider ma réponse
-                    </button>
-                    ${{isAnswered ? `
-                        <div class="feedback ${{isCorrect ? 'correct' : 'incorrect'}}">
-                            <div class="feedback-title">
-                                ${{isCorrect ? '✅ Excellent !' : '❌ Incorrect'}}
-                            </div>
-                            <div class="explanation">💡 ${{q.expl}}</div>
-                        </div>
-                    ` : ''}}
-                `;
-                container.appendChild(card);
-            }});
-            updateGlobalUI();
-        }}
-
-        window.toggleOption = function(qIdx, letter) {{
-            if (state.answered[qIdx] || state.timeUp) return;
-            if (!window.tempSelections) window.tempSelections = {{}};
-            if (!window.tempSelections[qIdx]) window.tempSelections[qIdx] = [];
-            
-            const idx = window.tempSelections[qIdx].indexOf(letter);
-            if (idx > -1) window.tempSelections[qIdx].splice(idx, 1);
-            else window.tempSelections[qIdx].push(letter);
-            
-            const card = document.getElementById('q-' + qIdx);
-            const btn = document.getElementById('btn-' + qIdx);
-            btn.disabled = window.tempSelections[qIdx].length === 0;
-            
-            const opts = card.querySelectorAll('.option');
-            opts.forEach((o, i) => {{
-                const l = String.fromCharCode(65 + i);
-                if (window.tempSelections[qIdx].includes(l)) o.classList.add('selected');
-                else o.classList.remove('selected');
-                o.querySelector('input').checked = window.tempSelections[qIdx].includes(l);
-            }});
-        }};
-
-        window.validateQuestion = function(idx) {{
-            if (state.timeUp) return;
-            const selected = window.tempSelections ? window.tempSelections[idx] : [];
-            if (!selected || selected.length === 0) return;
-            
-            const correctAnswers = questions[idx].ans.split('').sort();
-            const userAnswers = selected.sort();
-            
-            // ALL OR NOTHING scoring
-            const isCorrect = JSON.stringify(correctAnswers) === JSON.stringify(userAnswers);
-            const points = isCorrect ? 1 : 0;
-            
-            state.answered[idx] = {{ selected: selected, score: points }};
-            state.score += points;
-            localStorage.setItem(storageKey, JSON.stringify(state));
-            renderQuiz();
-        }};
-        
-        window.resetProgress = function() {{
-            if (confirm("Voulez-vous vraiment réinitialiser ce quiz ?")) {{
-                localStorage.removeItem(storageKey);
-                location.reload();
-            }}
-        }};
-
-        window.toggleTheme = function() {{
-            const current = document.body.getAttribute('data-theme');
-            const newTheme = current === 'dark' ? '' : 'dark';
-            document.body.setAttribute('data-theme', newTheme);
-            localStorage.setItem('qcm_theme', newTheme);
-        }};
-
-        function showResults() {{
-            state.showResults = true;
-            localStorage.setItem(storageKey, JSON.stringify(state));
-            
-            container.style.display = 'none';
-            resultsContainer.style.display = 'block';
-            
-            const percentage = (state.score / questions.length * 100).toFixed(1);
-            const correctCount = state.score;
-            const incorrectCount = questions.length - state.score;
-            
-            let emoji = '🎉';
-            let message = 'Excellent travail !';
-            let titleText = 'Félicitations !';
-            
-            if (percentage >= 90) {{
-                emoji = '🏆';
-                message = 'Performance exceptionnelle ! Vous maîtrisez parfaitement ce sujet.';
-                titleText = 'Résultat Exceptionnel !';
-            }} else if (percentage >= 75) {{
-                emoji = '🌟';
-                message = 'Très bonne performance ! Continuez ainsi.';
-                titleText = 'Très Bien !';
-            }} else if (percentage >= 50) {{
-                emoji = '👍';
-                message = 'Bon résultat. Il y a encore quelques points à réviser.';
-                titleText = 'Pas mal !';
-            }} else {{
-                emoji = '📚';
-                message = 'Continuez à travailler. La pratique vous aidera à progresser.';
-                titleText = 'À réviser';
-            }}
-
-            resultsContainer.innerHTML = `
-                <div class="results-page">
-                    <div class="results-card">
-                        <div class="results-icon">${{emoji}}</div>
-                        <div class="results-title">${{titleText}}</div>
-                        <div class="results-score">${{percentage}}%</div>
-                        
-                        <div class="results-stats">
-                            <div class="results-stat">
-                                <div class="results-stat-value">${{correctCount}}</div>
-                                <div class="results-stat-label">✅ Correctes</div>
-                            </div>
-                            <div class="results-stat">
-                                <div class="results-stat-value">${{incorrectCount}}</div>
-                                <div class="results-stat-label">❌ Incorrectes</div>
-                            </div>
-                            <div class="results-stat">
-                                <div class="results-stat-value">${{questions.length}}</div>
-                                <div class="results-stat-label">📝 Total</div>
-                            </div>
-                        </div>
-                        
-                        <div class="results-message">${{message}}</div>
-                        
-                        <div class="results-actions">
-                            <button class="btn" onclick="reviewAnswers()">👁️ Revoir les réponses</button>
-                            <button class="btn btn-secondary" onclick="window.print()">🖨️ Imprimer le résultat</button>
-                            <button class="btn btn-secondary" onclick="resetProgress()">🔄 Recommencer</button>
-                        </div>
-                    </div>
-                </div>
-            `;
-        }}
-
-        window.reviewAnswers = function() {{
-            state.showResults = false;
-            renderQuiz();
-        }};
-
-        function revealAll() {{
-            state.timeUp = true;
-            questions.forEach((q, idx) => {{
-                if (state.answered[idx] === undefined) {{
-                    state.answered[idx] = {{ selected: [], score: 0 }};
-                }}
-            }});
-            localStorage.setItem(storageKey, JSON.stringify(state));
-            renderQuiz();
-        }}
-
-        if (hasTimer && !state.timeUp) {{
-            const timerEl = document.getElementById('timer');
-            const interval = setInterval(() => {{
-                state.timeLeft--;
-                const m = Math.floor(state.timeLeft / 60);
-                const s = state.timeLeft % 60;
-                timerEl.textContent = `${{m.toString().padStart(2, '0')}}:${{s.toString().padStart(2, '0')}}`;
-                if (state.timeLeft <= 0) {{
-                    clearInterval(interval);
-                    revealAll();
-                }} else {{
-                    localStorage.setItem(storageKey, JSON.stringify(state));
-                }}
-            }}, 1000);
-        }} else if (state.timeUp) {{
-            const timerEl = document.getElementById('timer');
-            if(timerEl) timerEl.textContent = "00:00";
-        }}
-
-        // Load theme preference
-        const savedTheme = localStorage.getItem('qcm_theme');
-        if (savedTheme) document.body.setAttribute('data-theme', savedTheme);
-
-        renderQuiz();
-    </script>
-</body>
-</html>"""
-    return html
+    questions = parse_csv(content, bank=bank)
+    # Questions et options mélangées ; seed fixe reproduit la même copie
+    shuffled_questions, _ = shuffle_questions(questions, seed)
+    return render_js_quiz(shuffled_questions, title, timer_seconds, assets_url=assets_url)
+
+def create_exam_variants(content, title, bank=None, roster=None, count=0, use_columns=True, add_sheet=True,
+                         shuffle_q=True, shuffle_o=True, as_pdf=True, progress=None):
+    """ZIP des copies d'examen mélangées (une par candidat ou numérotées) et du corrigé CSV par variante."""
+    if bank is None:
+        bank = cached_parse_bank(content)
+    renderer = get_pdf_renderer()
+
+    def render(questions, variant):
+        # Sans corrigé sur la copie : il est dans corrige.csv
+        return render_print_document(questions, f"{title} — {html.escape(variant.label)}", use_columns, add_qr=False,
+                                     add_sheet=add_sheet, correction=False)
+
+    convert = (lambda source: renderer.render(source, pdf_options())) if as_pdf else None
+    output = io.BytesIO()
+    write_exam_variants(output, bank.questions, plan_variants(title, count, roster), render, convert,
+                        workers=renderer.max_workers, shuffle_q=shuffle_q, shuffle_o=shuffle_o, progress=progress)
+    return output.getvalue()
 
 def generate_export_html(content, title, m_type, **kwargs):
     """Dispatche vers le bon template HTML selon le type de contenu. Supporte les types BD (shorthand) et UI (longhand)."""
     # JS Quiz
     if m_type in ["QCM JS Interactif", "QCM_JS"]:
-        return generate_js_quiz_html(content, title, timer_seconds=kwargs.get('timer_seconds', 0))
+        return generate_js_quiz_html(content, title, timer_seconds=kwargs.get('timer_seconds', 0), bank=kwargs.get('bank'),
+                                     assets_url=kwargs.get('assets_url'))
     # QCM Classique
     elif m_type in ["QCM Classique", "QCM"]:
-        return generate_html_content(content, title, **kwargs)
+        # Les options des autres types (minuteur, thème...) ne concernent pas l'imprimable
+        options = {k: kwargs[k] for k in ('add_qr', 'mode', 'shuffle_q', 'shuffle_o', 'add_sheet', 'open_all', 'bank', 'seed') if k in kwargs}
+        return generate_html_content(content, title, kwargs.get('use_columns', True), **options)
     # QA
     elif m_type in ["Questions / Réponses", "QA"]:
         return generate_qa_html(content, title)
@@ -2091,176 +870,30 @@ def generate_export_html(content, title, m_type, **kwargs):
         sum_justified = kwargs.get('sum_justified', True)
         return generate_sum_html(content, title, 
                                  theme=sum_theme, font_size=sum_font, 
-                                 margin=sum_margin, justified=sum_justified)
+                                 margin=sum_margin, justified=sum_justified, assets_url=kwargs.get('assets_url'))
     return ""
 
-def perform_stats(csv_text):
-    f = io.StringIO(csv_text); reader = csv.reader(f, delimiter='|'); header = next(reader, None)
-    
-    ans_col_idx = -1
-    if header:
-        for j, col in enumerate(header):
-            if col.strip().upper() in ["RÉPONSE", "REPONSE", "ANSWER"]:
-                ans_col_idx = j
-                break
+def perform_stats(csv_text, bank=None):
+    """Statistiques (total, unique, multiple, distribution des lettres)."""
+    if bank is None:
+        bank = cached_parse_bank(csv_text)
+    return bank.stats
 
-    total, single, multi, all_ans = 0, 0, 0, []
-    for row in reader:
-        if not row or not any(row): continue
-        if str(row[0]).strip().lower() in ["question", "titre"]: continue
-        if len(row) < 7: continue
-        total += 1
-        
-        # Identify Answer Column
-        ans_idx = ans_col_idx
-        if ans_idx == -1 or ans_idx >= len(row):
-            ans_pattern = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
-            search_limit = min(len(row) - 1, 11)
-            for j in range(search_limit, 1, -1):
-                val = row[j].strip().upper()
-                if val and len(val) <= 15 and ans_pattern.match(val):
-                    ans_idx = j
-                    break
-            if ans_idx == -1: ans_idx = max(1, len(row) - 2)
-        
-        opts = [o.strip() for o in row[1:ans_idx] if o.strip()]
-        num_opts = len(opts)
-        lets = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[:num_opts]
-        
-        raw_ans = str(row[ans_idx]).strip().upper()
-        # Extract valid letters
-        ans = ""
-        for char in raw_ans:
-            if char in lets: ans += char
-            elif char in [';', ',', ' ', ':', '.', '/', '?']: continue
-            else: break
-            
-        if len(ans) > 1: multi += 1
-        else: single += 1
-        for char in ans:
-            if char in lets: all_ans.append(char)
-    counts = Counter(all_ans); total_ans = len(all_ans) if all_ans else 1
-    dist = {k: (v/total_ans * 100) for k, v in counts.items()}
-    return total, single, multi, dist
-
-def parse_csv(text):
-    f = io.StringIO(text); reader = csv.reader(f, delimiter='|'); header = next(reader, None)
-    
-    ans_col_idx = -1
-    if header:
-        for j, col in enumerate(header):
-            if col.strip().upper() in ["RÉPONSE", "REPONSE", "ANSWER"]:
-                ans_col_idx = j
-                break
+def parse_csv(text, bank=None):
+    """Retourne la liste des questions QCM du texte (nouvelles copies à chaque appel)."""
+    if bank is None:
+        bank = cached_parse_bank(text)
+    return [dict(q, opts=list(q['opts'])) for q in bank.questions]
 
-    data = []
-    for row in reader:
-        if not row or not any(row): continue
-        if str(row[0]).strip().lower() in ["question", "titre"]: continue
-        if len(row) < 7: continue
-        
-        # Identify Answer Column
-        ans_idx = ans_col_idx
-        if ans_idx == -1 or ans_idx >= len(row):
-            ans_pattern = re.compile(r'^[A-Z]([;, ]{0,2}[A-Z])*$')
-            search_limit = min(len(row) - 1, 11)
-            for j in range(search_limit, 1, -1):
-                val = row[j].strip().upper()
-                if val and len(val) <= 15 and ans_pattern.match(val):
-                    ans_idx = j
-                    break
-            if ans_idx == -1: ans_idx = max(1, len(row) - 2)
-
-        opts = [o.strip() for o in row[1:ans_idx] if o.strip()]
-        num_opts = len(opts)
-        lets = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[:num_opts]
-        
-        raw_ans = row[ans_idx].strip().upper()
-        # Robust answer extraction
-        ans_clean = ""
-        for char in raw_ans:
-            if char in lets: ans_clean += char
-            elif char in [';', ',', ' ', ':', '.', '/', '?']: continue
-            else: break
-            
-        q = {
-            'text': row[0].strip(),
-            'opts': opts,
-            'ans': ans_clean,
-            'expl': "|".join(row[ans_idx+1:])
-        }
-        data.append(q)
-    return data
+def quiz_seed(course_name):
+    """Graine du quiz : fixe pour un candidat identifié (email, sinon numéro ID), aléatoire sinon."""
+    identity = st.session_state.identity
+    student = identity.get("email") if identity.get("verified") else identity.get("id")
+    return student_seed(student, course_name) if student else None
 
 def generate_result_report(questions, user_answers, score, title, identity=None, cheat_warnings=0):
     """Génère le HTML du rapport de résultats personnalisé avec identité et stats de triche"""
-    from datetime import datetime
-    now = datetime.now().strftime("%d/%m/%Y %H:%M")
-    name = f"{identity['prenom']} {identity['nom']}" if identity and identity['nom'] else "Étudiant Anonyme"
-    user_id = f" (ID: {identity['id']})" if identity and identity['id'] else ""
-    
-    warnings_html = ""
-    if cheat_warnings > 0:
-        warnings_html = f'<p style="color:red; font-weight:bold;">⚠️ ALERTES SÉCURITÉ (Sorties d\'onglet) : {cheat_warnings}</p>'
-    else:
-        warnings_html = '<p style="color:green; font-weight:bold;">✅ Environnement sécurisé respecté.</p>'
-    
-    rows = ""
-    for idx, q in enumerate(questions):
-        u_ans_letters = user_answers.get(idx, "")
-        is_correct = "✅" if u_ans_letters == q['ans'] else "❌"
-        color = "#27ae60" if u_ans_letters == q['ans'] else "#e74c3c"
-        
-        mapping = {'A':0, 'B':1, 'C':2, 'D':3, 'E':4, 'F':5}
-        inv_mapping = {v: k for k, v in mapping.items()}
-        
-        opts_html = '<ul style="list-style:none; padding-left:0; margin: 10px 0;">'
-        for i, opt in enumerate(q['opts']):
-            letter = inv_mapping.get(i)
-            box = "[ &nbsp; ]"
-            if letter in q['ans']: box = "[ X ]"
-            elif letter in u_ans_letters: box = "[ x ]"
-            
-            line_style = "margin-bottom: 4px; font-size: 10pt;"
-            if letter in q['ans']: line_style += " color: #27ae60; font-weight: bold;"
-            elif letter in u_ans_letters: line_style += " color: #e74c3c;"
-            opts_html += f'<li style="{line_style}">{box} {letter}. {opt}</li>'
-        opts_html += "</ul>"
-
-        rows += f"""
-        <div style="margin-bottom: 30px; border-left: 6px solid {color}; padding: 15px 20px; background: #fff; box-shadow: 0 2px 4px rgba(0,0,0,0.02); border-radius: 0 8px 8px 0; page-break-inside: avoid;">
-            <p style="font-family: 'Georgia', serif; font-weight:bold; font-size:12pt; margin-bottom:10px; color:#1a1a1a;">Q{idx+1}. {q['text']} {is_correct}</p>
-            {opts_html}
-            <div style="margin-top: 15px; border-top: 1px dashed #eee; padding-top: 10px;">
-                <p style="font-family: 'Georgia', serif; font-size: 10.5pt; margin: 5px 0;"><strong>Votre sélection :</strong> <span style="color:{color}; font-weight:bold;">{u_ans_letters if u_ans_letters else "AUCUNE"}</span></p>
-                <div style="font-family: 'Georgia', serif; font-size: 10pt; color: #444; background: #fdfdfd; padding: 12px; border: 1px solid #f0f0f0; border-radius: 6px; margin-top: 8px; line-height: 1.5;">
-                    💡 <strong>Explication :</strong> <span style="font-style: italic;">{q['expl']}</span>
-                </div>
-            </div>
-        </div>
-        """
-    
-    html = f"""<!DOCTYPE html>
-<html lang="fr"><head><meta charset="UTF-8"><title>Résultats {title}</title>
-<style>
-    body {{ font-family: 'Georgia', serif; padding: 40px; color: #333; }}
-    h1 {{ color: #2c3e50; text-align: center; border-bottom: 2px solid #2c3e50; }}
-    .header-box {{ background: #f8f9fa; padding: 15px; border: 1px solid #ddd; margin-bottom: 30px; border-radius: 8px; }}
-    .score-box {{ background: #eef9f0; border: 2px solid #27ae60; padding: 20px; text-align: center; font-size: 18pt; margin-bottom: 30px; border-radius: 8px; }}
-</style></head><body>
-    <div style="max-width: 900px; margin: auto;">
-        <h1>Rapport d'Examen : {title}</h1>
-        <div class="header-box">
-            <p><strong>Candidat :</strong> {name}{user_id}</p>
-            <p><strong>Date de passage :</strong> {now}</p>
-            {warnings_html}
-        </div>
-        <div class="score-box">Score Final : <strong>{score} / {len(questions)}</strong> ({(score/len(questions)*100):.1f}%)</div>
-        <hr style="border: 0; border-top: 2px solid #eee; margin-bottom: 40px;">
-        {rows}
-    </div>
-</body></html>"""
-    return html
+    return render_result_report(questions, user_answers, score, title, identity, cheat_warnings)
 
 # --- PAGE FUNCTIONS ---
 
@@ -2276,9 +909,12 @@ def page_pdf_transformer():
         use_ocr = st.checkbox("🔍 Activer l'OCR (pour PDFs scannés)", value=False, 
                              disabled=not OCR_AVAILABLE,
                              help="OCR non disponible" if not OCR_AVAILABLE else "Active la reconnaissance optique de caractères pour documents scannés")
+        ocr_dpi = st.select_slider("Résolution OCR (DPI)", options=[150, 200, 300], value=OCR_DPI,
+                                   help="Plus élevé : meilleure reconnaissance des petits caractères, mais plus lent.") if use_ocr else OCR_DPI
     else:
         uploaded_file = st.file_uploader("Glissez votre fichier Word ici", type="docx")
         use_ocr = False
+        ocr_dpi = OCR_DPI
     
     if uploaded_file:
         valid, msg = validate_file_upload(uploaded_file, 
@@ -2291,21 +927,28 @@ def page_pdf_transformer():
         try:
             # Extract text based on file type
             if file_type == "PDF":
+                progress_bar = st.progress(0.0, text="📄 Extraction des pages...")
+                def report_progress(done, total, stage="text"):
+                    label = "🔍 OCR" if stage == "ocr" else "📄 Extraction"
+                    progress_bar.progress(done / total, text=f"{label} : page {done}/{total}")
                 if use_ocr:
-                    with st.spinner("🔍 OCR en cours... Patience"):
-                        pdf_text = extract_text_from_pdf(uploaded_file.read(), use_ocr=True)
+                    with st.spinner("🔍 OCR des pages scannées... Patience"):
+                        pdf_text, extraction = extract_pdf_with_stats(uploaded_file.read(), use_ocr=True, progress=report_progress, ocr_dpi=ocr_dpi)
                 else:
-                    pdf_text = extract_text_from_pdf(uploaded_file.read())
+                    pdf_text, extraction = extract_pdf_with_stats(uploaded_file.read(), progress=report_progress)
+                progress_bar.empty()
             else:  # DOCX
                 pdf_text = extract_text_from_docx(uploaded_file.read())
+                extraction = None
             
             if "Erreur" in pdf_text or "[" in pdf_text[:20]:
                 st.error(pdf_text)
                 return
             
             st.success(f"✅ Texte extrait ! ({len(pdf_text)} caractères)")
-            
-            cleaned_text = " ".join(pdf_text.split())[:100000] # Limite augmentée pour les longs documents
+            if extraction:
+                n_pages, n_ocr = extraction.stats
+                st.caption(f"📄 {n_pages} page(s) • 🔍 {n_ocr} page(s) passée(s) à l'OCR")
             
             st.subheader("⚙️ Configurer l'IA")
             ex_type = st.radio("Type d'exercice souhaité :", 
@@ -2318,56 +961,17 @@ def page_pdf_transformer():
         
         target_lang = st.selectbox("Langue cible :", ["Français", "Arabe", "Anglais"])
         
-        if ex_type == "QCM (Interactif)":
-            prompt = f"""Tu es un expert en ingénierie pédagogique. À partir du texte fourni, génère un examen QCM de haute qualité.
-            
-            CONSIGNES STRICTES :
-            1. Format : CSV strict (délimiteur '|')
-            2. Colonnes : Question|A|B|C|D|E|F|Réponse|Explication
-            3. Réponse : Indique la lettre (ex: A) ou les lettres (ex: AC) sans séparateur.
-            4. Qualité : Crée des distracteurs plausibles. L'explication doit justifier la bonne réponse.
-            5. Langue : {target_lang}.
-            
-            TEXTE DE RÉFÉRENCE :
-            {cleaned_text}"""
-            suffix = "_QCM.csv"
-            
-        elif ex_type == "Q&A (Flashcards)":
-            prompt = f"""Génère une série de questions-réponses (Flashcards) pour aider à la mémorisation du texte suivant.
-            
-            CONSIGNES STRICTES :
-            1. Format : CSV strict (délimiteur '|')
-            2. Colonnes : Question|Réponse
-            3. Langue : {target_lang}.
-            
-            TEXTE DE RÉFÉRENCE :
-            {cleaned_text}"""
-            suffix = "_QA.csv"
-            
-        elif ex_type == "Glossaire":
-            prompt = f"""Identifie tous les concepts clés, termes techniques et définitions importantes dans le texte suivant.
-            
-            CONSIGNES STRICTES :
-            1. Format : CSV strict (délimiteur '|')
-            2. Colonnes : Concept|Définition
-            3. Langue : {target_lang}.
-            
-            TEXTE DE RÉFÉRENCE :
-            {cleaned_text}"""
-            suffix = "_DEF.csv"
-            
-        elif ex_type == "Synthèse":
-            prompt = f"""Rédige une synthèse structurée et pédagogique du texte suivant. 
-            Utilise du Markdown pour la mise en forme (titres, listes, gras).
-            
-            CONSIGNES :
-            1. Style : Clair, concis et professionnel.
-            2. Langue : {target_lang}.
-            3. Format : Résumé structuré.
-            
-            TEXTE DE RÉFÉRENCE :
-            {cleaned_text}"""
-            suffix = "_SUM.md"
+        # Découpage aux titres/paragraphes : tout le cours est couvert, chaque prompt tient dans le contexte du modèle
+        with st.expander("✂️ Découpage des longs documents"):
+            cc1, cc2 = st.columns(2)
+            max_tokens = cc1.number_input("Tokens max par prompt", min_value=1000, max_value=200000,
+                                          value=DEFAULT_MAX_TOKENS, step=1000,
+                                          help="Adaptez à la fenêtre de contexte de votre IA (~4 caractères par token).")
+            overlap_tokens = cc2.number_input("Recouvrement (tokens)", min_value=0, max_value=2000,
+                                              value=DEFAULT_OVERLAP_TOKENS, step=50,
+                                              help="Fin de la partie précédente répétée en tête de la suivante.")
+        chunks = chunk_text(pdf_text, max_tokens, overlap_tokens)
+        suffix, prompts = build_prompts(ex_type, chunks, target_lang)
         
         st.subheader("🤖 Votre Prompt IA")
         st.write(f"Copiez ce prompt et collez-le dans votre IA (ChatGPT, Claude, etc.) pour générer votre module `{suffix}`.")
@@ -2382,7 +986,14 @@ def page_pdf_transformer():
             5. **Allez** dans l'onglet **'✍️ Créateur'** pour enregistrer votre module avec le suffixe `{suffix}`.
             """)
             
-        st.text_area("📋 Prompt à copier :", prompt, height=300)
+        if len(prompts) > 1:
+            st.info(f"✂️ Document long : {len(prompts)} prompts (~{max_tokens} tokens max chacun). Envoyez-les un par un puis concaténez les résultats.")
+            part = st.selectbox("Partie", range(1, len(prompts) + 1), format_func=lambda i: f"Prompt {i}/{len(prompts)}")
+            st.text_area("📋 Prompt à copier :", prompts[part - 1], height=300, key=f"prompt_part_{part}")
+            st.download_button("⬇️ Télécharger tous les prompts (.txt)", merge_prompts(prompts),
+                               file_name=f"prompts{suffix.rsplit('.', 1)[0]}.txt", mime="text/plain")
+        else:
+            st.text_area("📋 Prompt à copier :", prompts[0], height=300)
         
         with st.expander("🎓 Guide : Comment obtenir les meilleurs résultats avec l'IA ?", expanded=True):
             st.markdown(f"""
@@ -2423,34 +1034,36 @@ def page_pdf_merger():
             help="L'ordre de sélection déterminera l'ordre dans le PDF final."
         )
         
+        # Sélection de pages optionnelle par fichier (vide = tout le document)
+        page_specs = {}
+        with st.expander("📑 Sélection de pages (optionnel)"):
+            for name in ordered_filenames:
+                page_specs[name] = st.text_input(f"Pages de {name}", "", key=f"merge_pages_{name}",
+                                                 placeholder="Toutes (ex: 1-3, 5, 8-)")
+        
         if st.button("🚀 Fusionner les PDF", type="primary", use_container_width=True):
             if not ordered_filenames:
                 st.warning("Veuillez sélectionner au moins un fichier.")
                 return
                 
             try:
-                merger = PyPDF2.PdfMerger()
                 # Map ordered names back to file objects
                 file_map = {f.name: f for f in uploaded_files}
                 
                 with st.spinner("Fusion en cours..."):
-                    for name in ordered_filenames:
-                        # Reset file pointer to beginning before reading
-                        file_map[name].seek(0)
-                        merger.append(io.BytesIO(file_map[name].read()))
-                    
-                    output = io.BytesIO()
-                    merger.write(output)
-                    merger.close()
-                    
-                    st.success("✅ Fusion terminée !")
-                    st.download_button(
-                        label="📥 Télécharger le PDF fusionné",
-                        data=output.getvalue(),
-                        file_name="fusion_combinee.pdf",
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
+                    # Entrées et sortie passent par des fichiers temporaires, pas par des copies en mémoire
+                    with merged_pdf([file_map[name] for name in ordered_filenames], page_specs) as (merged_path, n_pages):
+                        st.success(f"✅ Fusion terminée ! ({n_pages} pages)")
+                        with open(merged_path, 'rb') as merged_file:
+                            st.download_button(
+                                label="📥 Télécharger le PDF fusionné",
+                                data=merged_file,
+                                file_name="fusion_combinee.pdf",
+                                mime="application/pdf",
+                                use_container_width=True
+                            )
+            except ValueError as e:
+                st.error(str(e))
             except Exception as e:
                 st.error(f"Erreur lors de la fusion : {e}")
                 logger.error(f"Erreur PDF Merger: {e}")
@@ -2499,12 +1112,19 @@ def page_creator():
         c1, c2 = st.columns(2)
         shuffle_q = c1.checkbox("Mélanger Q", value=False)
         shuffle_o = c2.checkbox("Mélanger O", value=False)
+        print_variant = 1
+        if shuffle_q or shuffle_o:
+            print_variant = st.number_input("Variante", 1, MAX_VARIANTS, 1,
+                                            help="Même variante, même mélange : c'est la copie d'examen de même numéro (mêmes options de mélange)")
         use_3_col = st.checkbox("3 Colonnes", value=True)
         add_qr = st.checkbox("QR Code", value=True)
         add_sheet = st.checkbox("Feuille Réponses", value=True)
         open_all = False
         if "Questions" in q_type:
             open_all = st.checkbox("Ouvrir tout", value=False, key="open_all")
+        live_preview = st.checkbox("⚡ Aperçu incrémental", value=True,
+                                   help="Ne re-rend que les questions modifiées et met à jour l'aperçu sans le recharger "
+                                        "(nécessite des iframes de même origine ; décocher si l'aperçu ne suit plus)")
 
         # Specialty settings for Synthesis
         sum_theme, sum_font, sum_margin, sum_just = "theme-ocean", "11pt", "2.5cm", True
@@ -2536,13 +1156,15 @@ def page_creator():
     st.session_state.csv_source_input = csv_in
     
     if csv_in and module_title and module_title != "Nouveau Module":
-        errors, _ = validate_csv_data(csv_in, q_type)
+        # Une seule passe de parsing partagée par la validation, les stats et le rendu
+        bank = cached_parse_bank(csv_in, q_type)
+        errors, _ = validate_csv_data(csv_in, q_type, bank=bank)
         if errors:
             for e in errors: st.error(e)
 
         # --- STATS ---
         try:
-            total_stats, sing_stats, mult_stats, dist_stats = perform_stats(csv_in)
+            total_stats, sing_stats, mult_stats, dist_stats = perform_stats(csv_in, bank=bank)
             st.divider()
             st.subheader("📊 Statistiques")
             s1, s2, s3 = st.columns(3)
@@ -2553,22 +1175,79 @@ def page_creator():
             st.info(f"📍 Distribution : {dist_str}")
         except: pass
 
-        # Generate HTML with the correct template
-        html_out = generate_export_html(csv_in, doc_title, q_type, 
-                                        use_columns=use_3_col, add_qr=add_qr, mode=html_mode,
-                                        shuffle_q=shuffle_q, shuffle_o=shuffle_o, add_sheet=add_sheet,
-                                        open_all=st.session_state.get('open_all', False), timer_seconds=timer_seconds,
-                                        sum_theme=sum_theme, sum_font=sum_font, sum_margin=sum_margin, sum_justified=sum_just)
+        # Le mélange réordonne tout le document : rendu complet dans ce cas
+        incremental = live_preview and q_type in INCREMENTAL_TYPES and not (shuffle_q or shuffle_o)
+        if incremental:
+            preview = st.session_state.setdefault('creator_preview', IncrementalPreview())
+            preview_doc = preview.build(csv_in, doc_title, q_type, bank=bank, use_columns=use_3_col, add_qr=add_qr,
+                                        mode=html_mode, add_sheet=add_sheet,
+                                        open_all=st.session_state.get('open_all', False))
+            html_out = preview_doc.html
+        else:
+            # Generate HTML with the correct template
+            html_out = generate_export_html(csv_in, doc_title, q_type, 
+                                            use_columns=use_3_col, add_qr=add_qr, mode=html_mode,
+                                            shuffle_q=shuffle_q, shuffle_o=shuffle_o, add_sheet=add_sheet,
+                                            open_all=st.session_state.get('open_all', False), timer_seconds=timer_seconds,
+                                            sum_theme=sum_theme, sum_font=sum_font, sum_margin=sum_margin, sum_justified=sum_just,
+                                            bank=bank, seed=derive_seed(doc_title, print_variant))
         
         c1, c2 = st.columns(2)
         with c1:
             st.download_button("📥 Télécharger HTML", html_out, f"{out_name}.html")
         with c2:
-            pdf_bytes = convert_html_to_pdf(html_out)
+            # Rendu différé : wkhtmltopdf ne tourne que sur demande, pas à chaque frappe
+            pdf_bytes = cached_pdf(html_out)
+            if pdf_bytes is None and st.button("📄 Générer le PDF"):
+                with st.spinner("Génération du PDF..."):
+                    pdf_bytes = convert_html_to_pdf(html_out)
             if pdf_bytes: st.download_button("📄 TÉLÉCHARGER PDF", pdf_bytes, f"{out_name}.pdf")
-        
+
+        if q_type == "QCM Classique" and not errors:
+            with st.expander("🖨️ Copies d'examen personnalisées"):
+                st.caption("Une copie mélangée par candidat (reproductible) ou par numéro, avec un corrigé CSV par variante.")
+                roster_text = st.text_area("Candidats (un nom ou ID par ligne ; vide = copies numérotées)", key="exam_roster")
+                roster = roster_text.splitlines()
+                n_copies = st.number_input("Nombre de copies", 1, MAX_VARIANTS, 30, disabled=bool(roster_text.strip()))
+                v1, v2, v3 = st.columns(3)
+                exam_shuffle_q = v1.checkbox("Mélanger Q", value=True, key="exam_shuffle_q")
+                exam_shuffle_o = v2.checkbox("Mélanger O", value=True, key="exam_shuffle_o")
+                pdf_ready = get_pdf_renderer().available
+                exam_pdf = v3.checkbox("PDF", value=pdf_ready, disabled=not pdf_ready, key="exam_pdf",
+                                       help=None if pdf_ready else "wkhtmltopdf absent : copies en HTML")
+                # Le ZIP gardé en session n'est servi que pour la banque et les options qui l'ont produit :
+                # sinon les copies et leur corrigé ne correspondraient plus au module affiché
+                exam_key = (hashlib.sha256(csv_in.encode("utf-8")).hexdigest(), doc_title,
+                            tuple(s.strip() for s in roster if s.strip()) or n_copies,
+                            use_3_col, add_sheet, exam_shuffle_q, exam_shuffle_o, exam_pdf)
+                saved = st.session_state.get("exam_variants_zip")
+                if saved and saved[0] != exam_key:
+                    del st.session_state["exam_variants_zip"]
+                if st.button("🚀 Générer les copies", use_container_width=True):
+                    st.session_state.pop("exam_variants_zip", None)
+                    exam_bar = st.progress(0.0, text="🖨️ Génération des copies...")
+                    def report_exam(done, total):
+                        exam_bar.progress(done / total, text=f"🖨️ Copie {done}/{total}")
+                    try:
+                        zip_bytes = create_exam_variants(csv_in, doc_title, bank, roster, n_copies, use_3_col, add_sheet,
+                                                         exam_shuffle_q, exam_shuffle_o, exam_pdf, report_exam)
+                        st.session_state.exam_variants_zip = (exam_key, f"{out_name}_copies.zip", zip_bytes)
+                    except (PdfRenderError, ValueError) as e:
+                        logger.error(f"Erreur copies d'examen : {e}")
+                        st.error(f"Génération des copies impossible : {e}")
+                    exam_bar.empty()
+                if st.session_state.get("exam_variants_zip"):
+                    _, zip_name, zip_bytes = st.session_state.exam_variants_zip
+                    st.download_button("📦 Télécharger les copies (ZIP)", zip_bytes, zip_name, mime="application/zip")
+
         st.subheader("👁️ Aperçu")
-        st.components.v1.html(html_out, height=600, scrolling=True)
+        if incremental:
+            # Coquille inchangée = iframe conservée ; le patch invisible y applique les blocs modifiés
+            shell, patch = preview.update(preview_doc)
+            st.components.v1.html(shell, height=600, scrolling=True)
+            st.components.v1.html(patch, height=0)
+        else:
+            st.components.v1.html(html_out, height=600, scrolling=True)
 
 def page_quiz():
     # Sidebar config for Quiz Page (keep only rev_mode here)
@@ -2599,7 +1278,12 @@ def page_quiz():
                 if c1.button("▶ REPRENDRE", type="primary"):
                     st.session_state.quiz_started = True
                     st.session_state.current_course_name = mod_name
-                    st.session_state.shuffled_questions = parse_csv(st.session_state.csv_source_input)
+                    # Même graine et mêmes options qu'au départ, quels que soient les réglages actuels :
+                    # les réponses sauvegardées retombent sur les mêmes questions
+                    saved = progress['shuffle'] or {"seed": quiz_seed(mod_name), "q": shuffle_q, "o": shuffle_o}
+                    st.session_state.shuffled_questions, shuffle = shuffle_questions(
+                        parse_csv(st.session_state.csv_source_input), saved["seed"], saved["q"], saved["o"])
+                    st.session_state.quiz_shuffle = {"seed": shuffle.seed, "q": saved["q"], "o": saved["o"]}
                     st.session_state.current_q_idx = progress['idx']
                     st.session_state.user_answers = {int(k): v for k, v in progress['answers'].items()}
                     st.session_state.validated_current = False
@@ -2612,15 +1296,17 @@ def page_quiz():
 
         # --- MODULE LOADING Logic (SQL Based) ---
         st.subheader("📂 Charger un module")
-        all_modules = db_get_modules(m_type="QCM")
+        all_modules = db_list_modules(m_type="QCM")
         if all_modules:
             mod_options = {f"{m[1]}": m for m in all_modules}
             sel_mod_name = st.selectbox("Module", ["Choisir..."] + list(mod_options.keys()), key="quiz_mod_sel")
             if sel_mod_name != "Choisir...":
                 selected_module = mod_options[sel_mod_name]
+                st.caption(f"📝 {selected_module[5]} question(s) • {selected_module[2]}")
                 if st.button("📥 Charger ce module"):
-                    st.session_state.quiz_csv_area = selected_module[4]
-                    st.session_state.csv_source_input = selected_module[4]
+                    content = db_get_module_content(selected_module[0])
+                    st.session_state.quiz_csv_area = content
+                    st.session_state.csv_source_input = content
                     st.session_state.quiz_mod = selected_module[1]
                     st.success(f"Module '{selected_module[1]}' chargé !")
                     st.rerun()
@@ -2649,28 +1335,11 @@ def page_quiz():
                 # Identify course name for history
                 mod_name = st.session_state.get("quiz_mod", "Quiz Manuel")
                 st.session_state.current_course_name = mod_name if mod_name != "Choisir..." else "Quiz Manuel"
-                # Parsing and Shuffling
+                # Parsing and Shuffling (copie reproductible pour un candidat identifié)
                 questions = parse_csv(csv_quiz)
-                if shuffle_q:
-                    questions = random.sample(questions, len(questions))
-                
-                if shuffle_o:
-                    for q_item in questions:
-                        if len(q_item['opts']) > 1:
-                            # 1. Identify original answer(s) text
-                            original_ans_letters = list(q_item['ans']) # can be 'AB'
-                            letters = ['A', 'B', 'C', 'D', 'E', 'F']
-                            correct_texts = [q_item['opts'][letters.index(l)] for l in original_ans_letters if letters.index(l) < len(q_item['opts'])]
-                            
-                            # 2. Shuffle options
-                            random.shuffle(q_item['opts'])
-                            
-                            # 3. Update answer field with new letters
-                            new_ans_letters = []
-                            for i, opt_text in enumerate(q_item['opts']):
-                                if opt_text in correct_texts:
-                                    new_ans_letters.append(letters[i])
-                            q_item['ans'] = "".join(sorted(new_ans_letters))
+                questions, shuffle = shuffle_questions(questions, quiz_seed(st.session_state.current_course_name),
+                                                       shuffle_q, shuffle_o)
+                st.session_state.quiz_shuffle = {"seed": shuffle.seed, "q": shuffle_q, "o": shuffle_o}
 
                 st.session_state.shuffled_questions = questions
                 st.session_state.current_q_idx = 0
@@ -2787,7 +1456,8 @@ def page_quiz():
                 st.session_state.validated_current = True
                 # SAVE PROGRESS TO DB
                 if st.session_state.identity["verified"] and st.session_state.current_course_name != "Quiz Manuel":
-                    db_save_progress(st.session_state.identity["email"], st.session_state.current_course_name, idx, st.session_state.user_answers)
+                    db_save_progress(st.session_state.identity["email"], st.session_state.current_course_name, idx,
+                                     st.session_state.user_answers, st.session_state.get("quiz_shuffle"))
                 st.rerun()
         else:
             # SHOW FEEDBACK
@@ -2978,7 +1648,7 @@ def page_history():
         recommendations = get_user_recommendations(st.session_state.identity['email'], limit=3)
         
         if recommendations:
-            for module_name, reason, category in recommendations:
+            for module_name, reason, category, module_id in recommendations:
                 with st.container():
                     col_icon, col_info, col_action = st.columns([1, 5, 2])
                     with col_icon:
@@ -2989,10 +1659,8 @@ def page_history():
                     with col_action:
                         if st.button("🚀 Lancer", key=f"rec_{module_name}"):
                             # Load this module
-                            modules = db_get_modules()
-                            target_mod = [m for m in modules if m[1] == module_name]
-                            if target_mod:
-                                m = target_mod[0]
+                            m = db_get_module(module_id)
+                            if m:
                                 st.session_state.auto_load_csv = m[4]  # content
                                 st.session_state.quiz_mod = m[1]  # name
                                 st.session_state.current_page = "⚡ Quiz Interactif"
@@ -3016,22 +1684,31 @@ def page_discover():
     .module-name { font-weight: 700; font-size: 1.05em; color: #1e293b; margin: 0; }
     .type-badge { font-size: 0.75em; background: #f1f5f9; color: #64748b; padding: 2px 8px; border-radius: 10px; text-transform: uppercase; font-weight: 600; }
     .best-score { background: #fffbeb; color: #d97706; padding: 4px 12px; border-radius: 15px; font-size: 0.8em; font-weight: bold; }
+    .search-snippet { font-size: 0.85em; color: #475569; unicode-bidi: plaintext; }
+    .search-snippet mark { background: #fef08a; padding: 0 2px; border-radius: 3px; }
     </style>
     """, unsafe_allow_html=True)
 
     st.header("🔍 Explorateur de Modules (BD)")
     
-    search_q = st.text_input("🔍 Rechercher un module...", "")
+    search_q = st.text_input("🔍 Rechercher un module...", "", help="Recherche dans les titres, catégories, questions, options et explications.")
     
     # Pagination state
     if 'discover_page' not in st.session_state:
         st.session_state.discover_page = 0
+    if st.session_state.get("discover_search") != search_q:
+        st.session_state.discover_search = search_q
+        st.session_state.discover_page = 0
     
     PAGE_SIZE = 20
     offset = st.session_state.discover_page * PAGE_SIZE
     
-    # Get modules with pagination
-    all_modules = db_get_modules(search=search_q, limit=PAGE_SIZE + 1, offset=offset)
+    # Get modules with pagination : métadonnées seules, le CSV n'est lu qu'à l'action
+    # (classés par pertinence avec extrait si recherche)
+    if search_q.strip():
+        all_modules = db_search_modules(search_q, limit=PAGE_SIZE + 1, offset=offset, columns=MODULE_META_COLUMNS)
+    else:
+        all_modules = db_list_modules(limit=PAGE_SIZE + 1, offset=offset)
     has_more = len(all_modules) > PAGE_SIZE
     display_modules = all_modules[:PAGE_SIZE]
     
@@ -3044,6 +1721,12 @@ def page_discover():
     # Stats
     st.caption(f"📊 {total_count} module(s) au total • Page {st.session_state.discover_page + 1}")
 
+    # Scores et progressions de toute la page en une seule requête
+    modules_status = {}
+    if st.session_state.identity["verified"]:
+        modules_status = db_get_modules_status(st.session_state.identity["email"],
+                                               [m[1] for m in display_modules if m[3] in ["QCM", "QCM_JS"]])
+
     categories = sorted(list(set([m[2] for m in display_modules if m[2]])))
     if not categories: categories = ["Général"]
     
@@ -3060,14 +1743,12 @@ def page_discover():
             
             cols = st.columns(2)
             for idx, mod in enumerate(cat_modules):
-                m_id, m_name, m_cat, m_type, m_content, m_date = mod
+                m_id, m_name, m_cat, m_type, m_date, m_count = mod[:6]
+                snippet = highlight_snippet(mod[6]) if len(mod) > 6 else ""
                 with cols[idx % 2]:
-                    best = "N/A"
-                    progress = False
-                    if m_type in ["QCM", "QCM_JS"] and st.session_state.identity["verified"]:
-                        best = db_get_best_score(st.session_state.identity["email"], m_name)
-                        p_data = db_load_progress(st.session_state.identity["email"], m_name)
-                        if p_data: progress = True
+                    m_status = modules_status.get(m_name, {})
+                    best = m_status.get("best", "N/A")
+                    progress = m_status.get("in_progress", False)
                     
                     icons = {"QCM": "⚡", "QCM_JS": "🕹️", "QA": "❓", "DEF": "📜", "SUM": "📝"}
                     icon = icons.get(m_type, "📄")
@@ -3079,12 +1760,14 @@ def page_discover():
 <div>
     <p class="module-name">{m_name}</p>
     <span class="type-badge">{m_type}</span>
+    <span class="type-badge">{m_count or 0} Q</span>
 </div>
 </div>
 <div>
 {f'<span class="best-score">🏆 Record : {best}</span>' if m_type in ["QCM", "QCM_JS"] else ""}
 {"<span class='in-progress'>⏳ En cours</span>" if progress else ""}
 </div>
+{f'<div class="search-snippet">{snippet}</div>' if snippet else ""}
 </div>"""
                         st.markdown(card_html, unsafe_allow_html=True)
                         
@@ -3092,12 +1775,13 @@ def page_discover():
                         ac1, ac2 = st.columns(2)
                         if m_type in ["QCM", "QCM_JS"]:
                             if ac1.button("🚀 Lancer", key=f"launch_{m_id}", use_container_width=True):
-                                st.session_state.auto_load_csv = m_content
+                                st.session_state.auto_load_csv = db_get_module_content(m_id)
                                 st.session_state.quiz_mod = m_name
                                 st.session_state.current_page = "⚡ Quiz Interactif"
                                 st.rerun()
                         else:
                             if ac1.button("👁️ Voir", key=f"view_{m_id}", use_container_width=True):
+                                m_content = db_get_module_content(m_id)
                                 # Open directly in local browser
                                 if open_local_html(m_content, m_name, m_type):
                                     st.toast(f"🌐 Ouverture de l'aperçu : {m_name}")
@@ -3108,35 +1792,15 @@ def page_discover():
                                 st.session_state.current_page = "👁️ Visualiseur"
                                 st.rerun()
                         
-                        # --- Multi-format Exports ---
-                        with ac2.expander("📥 Export", expanded=False):
-                            d_col1, d_col2, d_col3 = st.columns(3)
-                            d_col1.download_button("CSV", m_content, f"{m_name}.csv", key=f"ex_csv_{m_id}", help="CSV")
-                            html_exp = generate_export_html(m_content, m_name, m_type)
-                            d_col2.download_button("HTM", html_exp, f"{m_name}.html", key=f"ex_htm_{m_id}", help="HTML")
-                            pdf_exp = convert_html_to_pdf(html_exp)
-                            if pdf_exp:
-                                with d_col3.popover("⚙️"):
-                                    st.write("🔧 PDF Master")
-                                    zoom_val = st.slider("Zoom", 0.5, 2.0, 1.0, 0.1, key=f"zoom_{m_id}")
-                                    target_p = st.number_input("Pages visées", 0, 10, 0, key=f"p_{m_id}", help="0 pour auto")
-                                    
-                                    # Heuristic: if target_p > 0, we adjust zoom
-                                    # (very rough estimate: 1 page ~= 1.0 zoom for typical 20q QCM)
-                                    final_zoom = zoom_val
-                                    if target_p > 0:
-                                        # Assume 1.0 zoom = 2 pages for 50 questions
-                                        # Let's use a dynamic factor
-                                        total_q = m_content.count('\n') # Row count estimate
-                                        est_p = (total_q * 0.05) if m_type == "QCM" else (total_q * 0.08)
-                                        if est_p > 0:
-                                            final_zoom = min(zoom_val, (target_p / est_p))
-                                    
-                                    scaled_pdf = convert_html_to_pdf(html_exp, zoom=final_zoom)
-                                    if scaled_pdf:
-                                        st.download_button("⬇️ Télécharger", scaled_pdf, f"{m_name}.pdf", key=f"dl_pdf_{m_id}", use_container_width=True)
-                            else:
-                                d_col3.caption("X")
+                        # --- Multi-format Exports (construits seulement pour la carte ouverte) ---
+                        is_open = st.session_state.get("discover_export_id") == m_id
+                        if ac2.button("📥 Export" if not is_open else "✖️ Fermer", key=f"ex_open_{m_id}", use_container_width=True):
+                            st.session_state.discover_export_id = None if is_open else m_id
+                            st.rerun()
+                        if is_open:
+                            m_content = db_get_module_content(m_id)
+                            st.download_button("💾 CSV", m_content, f"{m_name}.csv", key=f"ex_csv_{m_id}", help="CSV")
+                            render_module_exports(m_id, m_name, m_type, m_content, key_prefix="ex")
                         st.write("---")
     
     # Pagination controls
@@ -3273,31 +1937,63 @@ def page_admin_crud():
             st.metric("Modules totaux", total_modules)
             st.metric("Utilisateurs", total_users)
             st.metric("Tentatives quiz", total_attempts)
+            pool = DB_POOL.stats()
+            st.caption(f"🗄️ Connexions SQLite : {pool['created']} ouvertes, {pool['reused']} réutilisations sur {pool['checkouts']} emprunts")
+            pc = PARSE_CACHE.stats()
+            st.caption(f"🧠 Cache parsing : {pc['hits']} hits / {pc['misses']} misses • {pc['entries']} banque(s), {pc['bytes'] / 1e6:.1f} Mo")
+            ec = EXTRACTION_CACHE.stats()
+            st.caption(f"📄 Cache extraction : {ec['hits']} hits / {ec['misses']} misses • {ec['bytes'] / 1e6:.1f} Mo")
+            mc = MARKDOWN_CACHE.stats()
+            st.caption(f"📝 Cache Markdown : {mc['hits']} hits / {mc['misses']} misses • {mc['entries']} synthèse(s), {mc['bytes'] / 1e6:.1f} Mo")
     
     st.divider()
     
     # Bulk export options
-    col_search, col_zip, col_excel = st.columns([2, 1, 1])
+    col_search, col_zip, col_bundle, col_excel = st.columns([2, 1, 1, 1])
     with col_search:
         search = st.text_input("🔍 Rechercher dans toute la base...", "")
     with col_zip:
         st.write("")  # Spacing
-        if st.button("📦 Export ZIP", use_container_width=True):
-            with st.spinner("Création du ZIP..."):
-                zip_data = create_bulk_export_zip()
-                if zip_data:
-                    st.download_button("⬇️ ZIP", data=zip_data, file_name=f"modules_{datetime.datetime.now().strftime('%Y%m%d')}.zip", mime="application/zip")
+        zip_pdf = st.checkbox("Inclure les PDF", value=False, disabled=not get_pdf_renderer().available)
+        if st.button("📦 Export ZIP", use_container_width=True,
+                     help="Sources, HTML (et PDF) de chaque module filtré par la recherche"):
+            total_zip = max(db_count_modules(search=search), 1)
+            zip_bar = st.progress(0.0, text="📦 Création du ZIP...")
+            with create_bulk_export_zip(search, zip_pdf, lambda done: zip_bar.progress(
+                    min(done / total_zip, 1.0), text=f"📦 Module {done}/{total_zip}")) as zip_file:
+                zip_bar.empty()
+                # Le ZIP n'est lu qu'ici, depuis le disque ; Streamlit garde ensuite une copie
+                # du téléchargement dans son stockage de médias (en mémoire) tant que la page l'affiche
+                st.download_button("⬇️ ZIP", data=zip_file, file_name=f"modules_{datetime.datetime.now().strftime('%Y%m%d')}.zip", mime="application/zip")
+    with col_bundle:
+        st.write("")
+        if st.button("🌐 Pack hors-ligne", use_container_width=True,
+                     help="Une page par module (filtrés par la recherche), CSS/JS partagés, consultable sans connexion"):
+            with st.spinner("Création du pack..."):
+                bundle_data = create_offline_bundle(search)
+            st.download_button("⬇️ Pack", data=bundle_data, file_name=f"pack_hors_ligne_{datetime.datetime.now().strftime('%Y%m%d')}.zip", mime="application/zip")
     with col_excel:
         st.write("")
-        excel_data = db_export_to_excel()
-        st.download_button("📊 Excel Complet", data=excel_data, file_name=f"BD_Master_{datetime.datetime.now().strftime('%Y%m%d')}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+        # Généré seulement sur demande : la page d'admin ne relit plus toute la base à chaque affichage
+        if st.button("📊 Excel Complet", use_container_width=True):
+            with st.spinner("Export de la base..."):
+                excel_data = db_export_to_excel()
+            st.download_button("⬇️ Excel", data=excel_data, file_name=f"BD_Master_{datetime.datetime.now().strftime('%Y%m%d')}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+        gz_labels = {sheet: table for table, sheet in EXPORT_TABLES.items()}
+        gz_sheet = st.selectbox("Table (CSV.gz)", list(gz_labels), index=list(gz_labels).index("Historique"),
+                                label_visibility="collapsed")
+        if st.button("🗜️ CSV compressé", use_container_width=True, help="Une table en CSV gzip, sans limite de lignes"):
+            with st.spinner("Export de la table..."):
+                gz_data = db_export_table_csv_gz(gz_labels[gz_sheet])
+            st.download_button("⬇️ CSV.gz", data=gz_data, file_name=f"{gz_labels[gz_sheet]}_{datetime.datetime.now().strftime('%Y%m%d')}.csv.gz", mime="application/gzip", use_container_width=True)
     
     tabs = st.tabs(["⚡ QCM", "❓ Q&A", "📜 Définitions", "📝 Résumés"])
     types_map = {"⚡ QCM": "QCM", "❓ Q&A": "QA", "📜 Définitions": "DEF", "📝 Résumés": "SUM"}
 
     for t_name, t_code in types_map.items():
         with tabs[list(types_map.keys()).index(t_name)]:
-            mods = db_get_modules(m_type=t_code, search=search)
+            # Liste sans le CSV : le contenu n'est lu que pour la ligne ouverte ou l'action cliquée
+            mods = db_list_modules(m_type=t_code, search=search)
             if not mods:
                 st.warning(f"Aucun contenu de type {t_code} trouvé.")
                 continue
@@ -3311,7 +2007,7 @@ def page_admin_crud():
             st.divider()
 
             for m in mods:
-                mid, mname, mcat, mtype, mcont, mdate = m
+                mid, mname, mcat, mtype, mdate, _ = m
                 r1, r2, r3, r4 = st.columns([3, 1.5, 2.5, 3])
                 
                 # Column 1: Name & Type
@@ -3322,36 +2018,18 @@ def page_admin_crud():
                 # Column 2: Date
                 r2.write(mdate.split()[0] if mdate else "N/A")
                 
-                # Column 3: Multi-format Downloads
+                # Column 3: Multi-format Downloads (CSV/HTML/PDF construits à la demande)
                 with r3:
-                    d1, d2, d3 = st.columns(3)
-                    d1.download_button("💾", mcont, f"{mname}.csv", help="CSV", key=f"am_csv_{mid}")
-                    html_code = generate_export_html(mcont, mname, mtype)
-                    d2.download_button("🌐", html_code, f"{mname}.html", help="HTML", key=f"am_html_{mid}")
-                    pdf_code = convert_html_to_pdf(html_code)
-                    if pdf_code:
-                        with d3.popover("⚙️"):
-                            st.write("🔧 PDF Master")
-                            z_val = st.slider("Zoom", 0.5, 2.0, 1.0, 0.1, key=f"am_z_{mid}")
-                            t_p = st.number_input("Pages visées", 0, 10, 0, key=f"am_p_{mid}", help="0 pour auto")
-                            
-                            f_z = z_val
-                            if t_p > 0:
-                                t_q = mcont.count('\n')
-                                e_p = (t_q * 0.05) if mtype == "QCM" else (t_q * 0.08)
-                                if e_p > 0: f_z = min(z_val, (t_p / e_p))
-                            
-                            scaled_pdf = convert_html_to_pdf(html_code, zoom=f_z)
-                            if scaled_pdf:
-                                st.download_button("⬇️ PDF", scaled_pdf, f"{mname}.pdf", key=f"am_dl_{mid}", use_container_width=True)
-                    else:
-                        d3.button("❌", disabled=True, help="PDF non généré", key=f"am_pdf_err_{mid}")
+                    is_open = st.session_state.get("admin_export_id") == mid
+                    if st.button("📤" if not is_open else "✖️", help="Exports CSV / HTML / PDF", key=f"am_exp_{mid}"):
+                        st.session_state.admin_export_id = None if is_open else mid
+                        st.rerun()
 
                 # Column 4: Quick Actions
                 with r4:
                     a1, a2, a3, a4 = st.columns(4)
                     if a1.button("✏️", help="Éditer", key=f"ed_{mid}"):
-                        st.session_state.csv_source_input = mcont
+                        st.session_state.csv_source_input = db_get_module_content(mid)
                         st.session_state.editing_name = mname
                         st.session_state.editing_type = "QCM Classique" if mtype == "QCM" else "Questions / Réponses" if mtype == "QA" else "Glossaire (Concept | Définition)" if mtype == "DEF" else "Synthèse (Markdown)"
                         st.session_state.current_page = "✍️ Créateur"
@@ -3363,28 +2041,38 @@ def page_admin_crud():
                         st.rerun()
                         
                     if a3.button("👁️", help="Voir", key=f"vi_{mid}"):
-                        st.session_state.view_content = {"name": mname, "type": mtype, "content": mcont}
+                        st.session_state.view_content = {"name": mname, "type": mtype, "content": db_get_module_content(mid)}
                         st.session_state.current_page = "👁️ Visualiseur"
                         st.rerun()
                         
                     if a4.button("🚀", help="Quiz", key=f"qu_{mid}"):
-                        st.session_state.auto_load_csv = mcont
+                        st.session_state.auto_load_csv = db_get_module_content(mid)
                         st.session_state.quiz_mod = mname
                         st.session_state.current_page = "⚡ Quiz Interactif"
                         st.rerun()
                 
+                if st.session_state.get("admin_export_id") == mid:
+                    mcont = db_get_module_content(mid)
+                    st.download_button("💾 CSV", mcont, f"{mname}.csv", key=f"am_csv_{mid}")
+                    render_module_exports(mid, mname, mtype, mcont, key_prefix="am")
                 st.divider()
 
 def page_summaries():
     # Ancienne page maintenue pour compatibilité ou simplifiée
     st.header("📚 Bibliothèque de Résumés")
-    all_sums = db_get_modules(m_type="SUM")
+    all_sums = db_list_modules(m_type="SUM")
     if not all_sums:
         st.info("Aucun résumé trouvé.")
         return
 
-    for mid, name, cat, mtype, cont, date in all_sums:
-        with st.expander(f"📖 {name} ({cat})"):
+    # Un expander rend son contenu même fermé : seul le résumé ouvert est chargé
+    for mid, name, cat, mtype, date, _ in all_sums:
+        is_open = st.session_state.get("lib_open_id") == mid
+        if st.button(f"{'📖' if is_open else '📕'} {name} ({cat})", key=f"lib_open_{mid}", use_container_width=True):
+            st.session_state.lib_open_id = None if is_open else mid
+            st.rerun()
+        if is_open:
+            cont = db_get_module_content(mid)
             st.markdown(cont)
             if st.button("👁️ Ouvrir dans le Visualiseur", key=f"lib_{mid}"):
                 st.session_state.view_content = {"name": name, "content": cont, "type": "SUM"}
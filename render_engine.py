@@ -0,0 +1,745 @@
+"""Rendu HTML des modules par gabarits compilés.
+
+Chaque gabarit est analysé une seule fois, à l'import, et compilé en une
+fonction qui assemble ses fragments par un unique "".join. Les rendus
+accumulent leurs blocs dans une liste au lieu de faire grossir une chaîne à
+coups de += dans les boucles de questions.
+
+Politique d'échappement, explicite dans chaque gabarit :
+- {{champ}} est échappé (html.escape) : saisies libres qui ne sont pas du
+  contenu pédagogique (identité du candidat) ;
+- {{champ|raw}} est inséré tel quel : contenu rédigé par l'auteur du module
+  (questions, options, explications, titre), qui peut contenir du HTML
+  volontaire (<b>, <br>...), valeurs générées sûres (numéros, lettres) et
+  fragments déjà rendus ;
+- {{champ|join}} reçoit une liste de fragments déjà rendus, insérés sans
+  chaîne intermédiaire : le document final est le seul grand assemblage.
+"""
+import datetime
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from qcm_parser import LETTERS, cached_parse_bank, split_rows
+from shuffle_engine import verified_shuffle
+
+_FIELD = re.compile(r'\{\{\s*(\w+)(?:\|(raw|join))?\s*\}\}')
+
+
+def _escape(value):
+    return html.escape(str(value), quote=True)
+
+
+_CSS_STRINGS = r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\''
+_CSS_COMMENTS = re.compile(r'(' + _CSS_STRINGS + r')|/\*.*?\*/', re.S)
+_CSS_SPACES = re.compile(r'\s*([{};,>])\s*|(:)\s+|\s+')
+
+
+def _squeeze_css(chunk):
+    chunk = _CSS_SPACES.sub(lambda m: m.group(1) or m.group(2) or " ", chunk)
+    return chunk.replace(";}", "}")
+
+
+def minify_css(css):
+    """Supprime commentaires et blancs superflus ; le contenu des chaînes est préservé."""
+    css = _CSS_COMMENTS.sub(lambda m: m.group(1) or "", css)
+    out, pos = [], 0
+    for m in re.finditer(_CSS_STRINGS, css):
+        out.append(_squeeze_css(css[pos:m.start()]))
+        out.append(m.group(0))
+        pos = m.end()
+    out.append(_squeeze_css(css[pos:]))
+    return "".join(out).strip()
+
+
+def minify_js(js):
+    """Minification prudente, ligne à ligne : indentation, lignes vides et commentaires // isolés.
+
+    Les retours à la ligne sont conservés (insertion automatique des « ; »), et
+    les lignes situées dans un gabarit `...` multi-lignes ne sont jamais supprimées.
+    """
+    lines, in_template = [], False
+    for line in js.splitlines():
+        stripped = line.strip()
+        if not in_template and (not stripped or stripped.startswith("//")):
+            continue
+        lines.append(stripped)
+        if stripped.count("`") % 2:
+            in_template = not in_template
+    return "\n".join(lines)
+
+
+def compile_template(source):
+    """Compile le gabarit en une fonction à arguments nommés qui retourne le HTML.
+
+    Sans champ |join, le corps est une f-string (une seule allocation) ; sinon
+    un "".join sur le tuple des fragments, les listes étant dépaquetées.
+    """
+    pieces, fields, pos = [], [], 0
+    for m in _FIELD.finditer(source):
+        pieces.append((None, source[pos:m.start()]))
+        name, mode = m.group(1), m.group(2)
+        if name not in fields:
+            fields.append(name)
+        pieces.append((mode or "esc", name))
+        pos = m.end()
+    pieces.append((None, source[pos:]))
+
+    if any(mode == "join" for mode, _ in pieces):
+        parts = [repr(value) if mode is None else f"*{value}" if mode == "join"
+                 else f"_esc({value})" if mode == "esc" else f"str({value})"
+                 for mode, value in pieces if value]
+        body = f"''.join(({', '.join(parts)},))"
+    else:
+        text = "".join(value.replace("{", "{{").replace("}", "}}") if mode is None
+                       else f"{{_esc({value})}}" if mode == "esc" else f"{{{value}}}"
+                       for mode, value in pieces)
+        body = "f" + repr(text)
+    namespace = {"_esc": _escape}
+    exec(compile(f"def render({', '.join(fields)}):\n    return {body}\n", "<template>", "exec"), namespace)
+    render = namespace["render"]
+    render.source = source
+    render.fields = tuple(fields)
+    return render
+
+
+# --- QCM / QA / Glossaire imprimables (generate_html_content) ---
+
+PRINT_PAGE_HEAD = compile_template("""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8">
+<title>{{title|raw}}</title>
+<style>
+    body { font-family: 'Georgia', serif; line-height: 1.4; color: #000; padding: 20px; }
+    h1 { text-align: center; border-bottom: 2px solid #000; padding-bottom: 5px; }
+    .questions-wrapper { {{col_css|raw}} margin-top: 15px; width: 100%; }
+    .question-block { margin-bottom: 12px; padding-bottom: 8px; border-bottom: 1px dashed #ccc; break-inside: avoid; page-break-inside: avoid; }
+    .question-text { font-weight: bold; font-size: 10pt; }
+    .options { list-style: none; padding: 0; margin: 0; font-size: 9pt; }
+    .options li { margin-bottom: 2px; }
+    .options li::before { content: attr(data-letter) ". "; font-weight: bold; }
+    table { width: 100%; border-collapse: collapse; margin-top: 20px; font-size: 9pt; }
+    th, td { border: 1px solid #000; padding: 8px; text-align: left; vertical-align: top; }
+    th { background-color: #eee; }
+    .col-concept { width: 20%; font-weight: bold; }
+    .col-def { width: 80%; }
+    details { cursor: pointer; margin-top: 5px; font-size: 9pt; }
+    details summary { list-style: none; font-weight: bold; color: #3498db; }
+    details summary::-webkit-details-marker { display: none; }
+    .qa-answer { padding: 10px; background: #f9f9f9; border-left: 3px solid #3498db; margin-top: 5px; }
+    @media print { .no-print { display: none; } }
+</style>
+</head>
+<body>
+    {{qr_code|raw}}
+    <h1>{{title|raw}}</h1>
+    <div class="questions-wrapper">
+""")
+COLUMNS_CSS = "column-count: 3; -webkit-column-count: 3; -moz-column-count: 3; column-gap: 30px;"
+QR_CODE_HTML = '<div style="text-align:right;"><img src="https://api.qrserver.com/v1/create-qr-code/?size=100x100&data=https://qcmwebapppy-bfxlibcaaelehxbv6qjyif.streamlit.app/#correction" alt="QR Correction" style="width:80px;"/> <br/><small>Scan pour correction</small></div>'
+
+GLOSSARY_ROW = compile_template("<tr><td class='col-concept'>{{concept|raw}}</td><td class='col-def'>{{definition|raw}}</td></tr>")
+PRINT_QA_BLOCK = compile_template("""
+                <div class="question-block">
+                    <div class="question-text">{{num|raw}}. {{text|raw}}</div>
+                    <details {{open_attr|raw}}>
+                        <summary>▶ Réponse</summary>
+                        <div class="qa-answer">{{answer|raw}}</div>
+                    </details>
+                </div>""")
+PRINT_QA_ANSWER_ROW = compile_template("<tr><td>{{num|raw}}</td><td colspan='2' style='font-weight:bold;'>{{answer|raw}}</td></tr>")
+PRINT_QUESTION_OPEN = compile_template('<div class="question-block"><div class="question-text">{{num|raw}}. {{text|raw}}</div><ul class="options">')
+PRINT_OPTION = compile_template('<li data-letter="{{letter|raw}}">{{text|raw}}</li>')
+PRINT_REVISION_BOX = compile_template('<div style="margin-top: 5px; padding: 8px; background: #f0fdf4; border: 1px solid #27ae60; border-radius: 4px; font-size: 9pt;">'
+                              '<strong>Réponse : {{answer|raw}}</strong><br/>'
+                              '<em>💡 {{explanation|raw}}</em>'
+                              '</div>')
+PRINT_ANSWER_ROW = compile_template("<tr><td>{{num|raw}}</td><td style='font-weight:bold;'>{{answer|raw}}</td><td>{{explanation|raw}}</td></tr>")
+PRINT_EXAM_FOOTER = compile_template("""
+        </div>
+        {{sheet|raw}}
+        <div style="page-break-before: always;" id="correction">
+            <h2>Correction</h2>
+            <table><thead><tr><th>N°</th><th>Réponse</th><th>Explication</th></tr></thead><tbody>{{answer_rows|join}}</tbody></table>
+        </div>
+    </body></html>""")
+PRINT_FOOTER = "</div></body></html>"
+
+ANSWER_SHEET = compile_template("""
+    <div style="page-break-before: always; margin-top:30px;">
+        <h2 style="text-align:center;">FEUILLE DE RÉPONSES (À COCHER)</h2>
+        <div style="display:flex; justify-content: space-between; gap: 20px;">
+            <div style="flex:1;">{{col1|raw}}</div>
+            <div style="flex:1;">{{col2|raw}}</div>
+            <div style="flex:1;">{{col3|raw}}</div>
+        </div>
+        <p style="font-size:8pt; text-align:center; margin-top:10px;">Cochez la case correspondante à votre réponse.</p>
+    </div>""")
+ANSWER_SHEET_TABLE = compile_template("""
+        <table style="width:100%; border-collapse: collapse; text-align:center; font-size:9pt; margin-bottom:20px;">
+            <thead><tr><th>N°</th><th>A</th><th>B</th><th>C</th><th>D</th><th>E</th><th>F</th></tr></thead>
+            <tbody>{{rows|raw}}</tbody>
+        </table>""")
+ANSWER_SHEET_ROW = compile_template("<tr><td style='font-weight:bold; width:30px;'>{{num|raw}}</td>"
+                            + "<td style='width:30px; border:1px solid #000;'></td>" * 6 + "</tr>")
+
+
+def render_answer_sheet(num_questions):
+    """Feuille de cochage sur 3 colonnes."""
+    def make_table(q_range):
+        return ANSWER_SHEET_TABLE(rows="".join([ANSWER_SHEET_ROW(num=i) for i in q_range]))
+
+    q_per_col = (num_questions + 2) // 3
+    c1 = range(1, min(num_questions + 1, q_per_col + 1))
+    c2 = range(q_per_col + 1, min(num_questions + 1, 2 * q_per_col + 1))
+    c3 = range(2 * q_per_col + 1, num_questions + 1)
+    return ANSWER_SHEET(col1=make_table(c1),
+                        col2=make_table(c2) if c2 else "",
+                        col3=make_table(c3) if c3 else "")
+
+
+def render_print_head(title, use_columns, add_qr=True, q_type="QCM Classique"):
+    """En-tête du document imprimable, jusqu'à l'ouverture du conteneur des questions."""
+    qr_code = QR_CODE_HTML if add_qr and q_type == "QCM Classique" else ""
+    return PRINT_PAGE_HEAD(title=title, col_css=COLUMNS_CSS if use_columns else "", qr_code=qr_code)
+
+
+def render_print_question(q, q_num, mode="Examen", open_all=False):
+    """(bloc de la question, ligne du corrigé) pour une question imprimable, options dans l'ordre reçu."""
+    if q.get('type') == 'QA':
+        return (PRINT_QA_BLOCK(num=q_num, text=q['text'], open_attr="open" if open_all else "", answer=q['ans']),
+                PRINT_QA_ANSWER_ROW(num=q_num, answer=q['ans']))
+    opts = q['opts']
+    new_ans_letters = "".join([l for l in LETTERS[:len(opts)] if l in q['ans']])
+
+    parts = [PRINT_QUESTION_OPEN(num=q_num, text=q['text'])]
+    parts.extend([PRINT_OPTION(letter=LETTERS[i], text=opt_text) for i, opt_text in enumerate(opts)])
+    parts.append("</ul>")
+    if mode == "Révision":
+        parts.append(PRINT_REVISION_BOX(answer=new_ans_letters, explanation=q['expl']))
+    parts.append("</div>")
+    return "".join(parts), PRINT_ANSWER_ROW(num=q_num, answer=new_ans_letters, explanation=q['expl'])
+
+
+def render_print_footer(n_questions, answer_rows, mode="Examen", q_type="QCM Classique", add_sheet=True,
+                        correction=True):
+    """Fin du document : feuille de réponses et corrigé (QCM en mode Examen) ou simple fermeture.
+
+    correction=False garde la feuille de réponses sans le corrigé (copies d'examen distribuées).
+    """
+    if mode == "Examen" and q_type == "QCM Classique":
+        sheet = render_answer_sheet(n_questions) if add_sheet else ""
+        if not correction:
+            return sheet + PRINT_FOOTER
+        return PRINT_EXAM_FOOTER(sheet=sheet, answer_rows=answer_rows)
+    return PRINT_FOOTER
+
+
+def render_print_document(questions, title, use_columns, add_qr=True, mode="Examen", q_type="QCM Classique",
+                          add_sheet=True, open_all=False, correction=True):
+    """HTML imprimable d'une liste de questions déjà ordonnée (par ex. une copie mélangée)."""
+    parts = [render_print_head(title, use_columns, add_qr, q_type)]
+    answer_rows = []
+    if q_type == "Glossaire (Concept | Définition)":
+        parts.append("<table><thead><tr><th>Concept</th><th>Définition</th></tr></thead><tbody>")
+        parts.extend([GLOSSARY_ROW(concept=q['text'], definition=q['ans']) for q in questions])
+        parts.append("</tbody></table>")
+    else:
+        for q_num, q in enumerate(questions, 1):
+            block, answer_row = render_print_question(q, q_num, mode, open_all)
+            parts.append(block)
+            answer_rows.append(answer_row)
+
+    parts.append(render_print_footer(len(questions), answer_rows, mode, q_type, add_sheet, correction))
+    return "".join(parts)
+
+
+def render_print_html(csv_text, title, use_columns, add_qr=True, mode="Examen", shuffle_q=False, shuffle_o=False,
+                      q_type="QCM Classique", add_sheet=True, open_all=False, bank=None, seed=None):
+    """HTML imprimable d'un module QCM, QA ou glossaire.
+
+    Le mélange passe par shuffle_engine : une même graine réimprime la même
+    copie, et une copie dont le corrigé ne survit pas au mélange lève une ValueError.
+    """
+    if bank is None:
+        bank = cached_parse_bank(csv_text, q_type)
+    questions = bank.questions
+    if shuffle_q or shuffle_o:
+        questions, _ = verified_shuffle(questions, seed, shuffle_q, shuffle_o, label="Mélange")
+    return render_print_document(questions, title, use_columns, add_qr, mode, q_type, add_sheet, open_all)
+
+
+# --- Questions / Réponses et Glossaire (exports stylés) ---
+
+QA_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8"><title>{{title|raw}}</title>
+<style>
+    body { font-family: 'Georgia', serif; max-width: 900px; margin: auto; padding: 30px; color: #1e293b; background: #f8fafc; }
+    h1 { text-align: center; color: #1e40af; border-bottom: 3px solid #3b82f6; padding-bottom: 10px; }
+    .qa-card { background: white; border-radius: 10px; padding: 18px; margin-bottom: 16px; box-shadow: 0 2px 6px rgba(0,0,0,0.06); border-left: 4px solid #3b82f6; }
+    .qa-question { font-weight: 700; font-size: 1.05em; color: #1e293b; }
+    details { margin-top: 8px; }
+    details summary { cursor: pointer; font-weight: 600; color: #3b82f6; list-style: none; }
+    details summary::-webkit-details-marker { display: none; }
+    .qa-answer { padding: 12px; background: #eff6ff; border-radius: 6px; margin-top: 6px; line-height: 1.6; }
+    @media print { body { background: white; } .qa-card { box-shadow: none; border: 1px solid #ddd; } }
+</style>
+</head>
+<body>
+    <h1>❓ {{title|raw}}</h1>
+    {{items|join}}
+</body></html>""")
+QA_CARD = compile_template("""
+        <div class="qa-card">
+            <div class="qa-question">Q{{num|raw}}. {{question|raw}}</div>
+            <details>
+                <summary>▶ Afficher la réponse</summary>
+                <div class="qa-answer">{{answer|raw}}</div>
+            </details>
+        </div>""")
+
+DEF_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8"><title>{{title|raw}}</title>
+<style>
+    body { font-family: 'Georgia', serif; max-width: 960px; margin: auto; padding: 30px; color: #1e293b; background: #f8fafc; }
+    h1 { text-align: center; color: #7c3aed; border-bottom: 3px solid #8b5cf6; padding-bottom: 10px; }
+    table { width: 100%; border-collapse: collapse; margin-top: 20px; background: white; border-radius: 10px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.06); }
+    th { background: #7c3aed; color: white; padding: 14px; text-align: left; font-size: 1em; }
+    td { padding: 12px 14px; border-bottom: 1px solid #f1f5f9; vertical-align: top; }
+    tr:hover { background: #faf5ff; }
+    .concept { font-weight: 700; width: 25%; color: #6d28d9; font-size: 1em; }
+    .definition { line-height: 1.6; color: #334155; }
+    @media print { body { background: white; } table { box-shadow: none; border: 1px solid #ddd; } }
+</style>
+</head>
+<body>
+    <h1>📜 {{title|raw}}</h1>
+    <table>
+        <thead><tr><th>Concept</th><th>Définition</th></tr></thead>
+        <tbody>{{rows|join}}</tbody>
+    </table>
+</body></html>""")
+DEF_ROW = compile_template('<tr><td class="concept">{{concept|raw}}</td><td class="definition">{{definition|raw}}</td></tr>')
+
+
+def two_column_rows(content):
+    """(numéro de ligne, col1, col2) après l'en-tête, lignes de moins de 2 colonnes ignorées."""
+    reader = split_rows(content)
+    next(reader, None)
+    return [(i, row[0].strip(), row[1].strip()) for i, row in enumerate(reader, 1) if len(row) >= 2]
+
+
+def render_qa_html(content, title):
+    """Export Questions / Réponses (cartes dépliables)."""
+    items = [QA_CARD(num=i, question=q, answer=a) for i, q, a in two_column_rows(content)]
+    return QA_PAGE(title=title, items=items)
+
+
+def render_def_html(content, title):
+    """Export Glossaire (tableau Concept / Définition)."""
+    rows = [DEF_ROW(concept=c, definition=d) for _, c, d in two_column_rows(content)]
+    return DEF_PAGE(title=title, rows=rows)
+
+
+# --- Rapport de résultats du quiz ---
+
+REPORT_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="UTF-8"><title>Résultats {{title|raw}}</title>
+<style>
+    body { font-family: 'Georgia', serif; padding: 40px; color: #333; }
+    h1 { color: #2c3e50; text-align: center; border-bottom: 2px solid #2c3e50; }
+    .header-box { background: #f8f9fa; padding: 15px; border: 1px solid #ddd; margin-bottom: 30px; border-radius: 8px; }
+    .score-box { background: #eef9f0; border: 2px solid #27ae60; padding: 20px; text-align: center; font-size: 18pt; margin-bottom: 30px; border-radius: 8px; }
+</style></head><body>
+    <div style="max-width: 900px; margin: auto;">
+        <h1>Rapport d'Examen : {{title|raw}}</h1>
+        <div class="header-box">
+            <p><strong>Candidat :</strong> {{name}}{{user_id}}</p>
+            <p><strong>Date de passage :</strong> {{now|raw}}</p>
+            {{warnings|raw}}
+        </div>
+        <div class="score-box">Score Final : <strong>{{score|raw}} / {{total|raw}}</strong> ({{percent|raw}}%)</div>
+        <hr style="border: 0; border-top: 2px solid #eee; margin-bottom: 40px;">
+        {{rows|join}}
+    </div>
+</body></html>""")
+REPORT_WARNING = '<p style="color:red; font-weight:bold;">⚠️ ALERTES SÉCURITÉ (Sorties d\'onglet) : {count}</p>'
+REPORT_SAFE = '<p style="color:green; font-weight:bold;">✅ Environnement sécurisé respecté.</p>'
+REPORT_QUESTION = compile_template("""
+        <div style="margin-bottom: 30px; border-left: 6px solid {{color|raw}}; padding: 15px 20px; background: #fff; box-shadow: 0 2px 4px rgba(0,0,0,0.02); border-radius: 0 8px 8px 0; page-break-inside: avoid;">
+            <p style="font-family: 'Georgia', serif; font-weight:bold; font-size:12pt; margin-bottom:10px; color:#1a1a1a;">Q{{num|raw}}. {{text|raw}} {{mark|raw}}</p>
+            {{options|join}}
+            <div style="margin-top: 15px; border-top: 1px dashed #eee; padding-top: 10px;">
+                <p style="font-family: 'Georgia', serif; font-size: 10.5pt; margin: 5px 0;"><strong>Votre sélection :</strong> <span style="color:{{color|raw}}; font-weight:bold;">{{selection|raw}}</span></p>
+                <div style="font-family: 'Georgia', serif; font-size: 10pt; color: #444; background: #fdfdfd; padding: 12px; border: 1px solid #f0f0f0; border-radius: 6px; margin-top: 8px; line-height: 1.5;">
+                    💡 <strong>Explication :</strong> <span style="font-style: italic;">{{explanation|raw}}</span>
+                </div>
+            </div>
+        </div>
+        """)
+REPORT_OPTION = compile_template('<li style="{{style|raw}}">{{box|raw}} {{letter|raw}}. {{text|raw}}</li>')
+REPORT_OPTION_STYLES = {
+    "correct": ("[ X ]", "margin-bottom: 4px; font-size: 10pt; color: #27ae60; font-weight: bold;"),
+    "wrong": ("[ x ]", "margin-bottom: 4px; font-size: 10pt; color: #e74c3c;"),
+    "neutral": ("[ &nbsp; ]", "margin-bottom: 4px; font-size: 10pt;"),
+}
+
+
+def render_result_report(questions, user_answers, score, title, identity=None, cheat_warnings=0, now=None):
+    """Rapport de résultats personnalisé (identité, score, détail par question, alertes)."""
+    now = now or datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
+    name = f"{identity['prenom']} {identity['nom']}" if identity and identity['nom'] else "Étudiant Anonyme"
+    user_id = f" (ID: {identity['id']})" if identity and identity['id'] else ""
+    warnings = REPORT_WARNING.format(count=cheat_warnings) if cheat_warnings > 0 else REPORT_SAFE
+
+    rows = []
+    for idx, q in enumerate(questions):
+        u_ans_letters = user_answers.get(idx, "")
+        correct = u_ans_letters == q['ans']
+        options = ['<ul style="list-style:none; padding-left:0; margin: 10px 0;">']
+        for letter, opt in zip(LETTERS, q['opts']):
+            state = "correct" if letter in q['ans'] else "wrong" if letter in u_ans_letters else "neutral"
+            box, style = REPORT_OPTION_STYLES[state]
+            options.append(REPORT_OPTION(style=style, box=box, letter=letter, text=opt))
+        options.append("</ul>")
+        rows.append(REPORT_QUESTION(color="#27ae60" if correct else "#e74c3c", num=idx + 1, text=q['text'],
+                                    mark="✅" if correct else "❌", options=options,
+                                    selection=u_ans_letters if u_ans_letters else "AUCUNE", explanation=q['expl']))
+
+    total = len(questions)
+    percent = f"{(score / total * 100) if total else 0:.1f}"
+    return REPORT_PAGE(title=title, name=name, user_id=user_id, now=now, warnings=warnings,
+                       score=score, total=total, percent=percent, rows=rows)
+
+
+# --- Synthèses Markdown ---
+
+# Styles communs à tous les thèmes ; les variables de mise en page sont redéfinies par chaque page
+SUM_BASE_CSS = """:root {
+    --p-color: #1e293b;
+    --s-color: #64748b;
+    --accent: #2563eb;
+    --bg: #ffffff;
+    --paper: #ffffff;
+    --border: #e2e8f0;
+    --page-margin: 2.5cm;
+    --font-size: 11pt;
+}
+
+* { margin: 0; padding: 0; box-sizing: border-box; }
+@page { size: A4; margin: var(--page-margin); }
+
+body { 
+    font-family: 'Georgia', serif; 
+    font-size: var(--font-size); 
+    line-height: 1.7; 
+    color: var(--p-color); 
+    background: var(--bg);
+    max-width: 900px;
+    margin: 0 auto;
+    padding: 50px 40px;
+    counter-reset: h2counter;
+}
+
+h1 { text-align: center; font-size: 2.6em; margin-bottom: 40px; padding-bottom: 20px; font-weight: bold; }
+h2 { counter-reset: h3counter; margin-top: 2em; margin-bottom: 15px; font-size: 1.8em; font-weight: bold; }
+h2::before { counter-increment: h2counter; content: counter(h2counter) ". "; }
+h3 { margin-top: 1.5em; margin-bottom: 10px; font-size: 1.3em; color: var(--s-color); }
+h3::before { counter-increment: h3counter; content: counter(h2counter) "." counter(h3counter) " "; }
+
+.justified p { text-align: justify; }
+p { margin-bottom: 1.2em; white-space: pre-wrap; }
+
+ul, ol { margin: 20px 0 20px 40px; }
+li { margin-bottom: 10px; padding-left: 5px; }
+ul li::marker { font-size: 1.2em; }
+
+table { width: 100%; border-collapse: collapse; margin: 30px 0; border: 2px solid var(--p-color); background: white; }
+th { background: #f8fafc; padding: 15px; border: 1px solid var(--p-color); text-align: left; font-weight: bold; }
+td { padding: 12px; border: 1px solid var(--p-color); }
+
+blockquote {
+    border-left: 6px solid var(--accent); background: #f1f5f9; padding: 20px 30px; margin: 25px 0;
+    font-style: italic; border-radius: 0 10px 10px 0; box-shadow: 2px 2px 10px rgba(0,0,0,0.05);
+}
+
+@media print {
+    body { padding: 0; max-width: 100%; }
+    .no-print { display: none !important; }
+}
+@media (max-width: 600px) { body { padding: 20px; } h1 { font-size: 2em; } }
+"""
+
+# Un seul thème est embarqué par export ; le pack hors-ligne les partage tous
+SUM_THEMES = {
+    "theme-ocean": """
+body.theme-ocean {
+    --p-color: #1e1b4b; --s-color: #4338ca; --accent: #3b82f6; --bg: #f8fafc; --border: #bfdbfe;
+}
+body.theme-ocean h1 { background: linear-gradient(135deg, #1e3a8a, #3b82f6); -webkit-background-clip: text; -webkit-text-fill-color: transparent; border-bottom: 3px solid #3b82f6; }
+body.theme-ocean h2 { color: #1e40af; border-left: 4px solid #3b82f6; padding-left: 15px; }
+body.theme-ocean ul li::marker { color: #3b82f6; }
+""",
+    "theme-emerald": """
+body.theme-emerald {
+    --p-color: #064e3b; --s-color: #059669; --accent: #10b981; --bg: #f0fdf4; --border: #bcfdec;
+}
+body.theme-emerald h2 { color: #047857; background: #ecfdf5; padding: 8px 15px; border-radius: 6px; }
+body.theme-emerald ol li::marker { color: #059669; font-weight: bold; }
+""",
+    "theme-lavender": """
+body.theme-lavender {
+    --p-color: #4c1d95; --s-color: #7c3aed; --accent: #8b5cf6; --bg: #f5f3ff; --border: #ddd6fe;
+}
+body.theme-lavender h1 { color: #5b21b6; border-bottom: 3px dashed #8b5cf6; }
+body.theme-lavender h2 { color: #6d28d9; border-bottom: 2px solid #ddd6fe; }
+""",
+    "theme-midnight": """
+body.theme-midnight {
+    --p-color: #0f172a; --s-color: #334155; --accent: #38bdf8; --bg: #f1f5f9; --border: #cbd5e0;
+}
+body.theme-midnight h1 { color: #1e293b; text-transform: uppercase; letter-spacing: 2px; }
+""",
+    "theme-sepia": """
+body.theme-sepia {
+    --p-color: #431407; --s-color: #92400e; --accent: #b45309; --bg: #fffbeb; --border: #fde68a;
+}
+body.theme-sepia h1 { color: #78350f; font-family: 'Times New Roman', serif; }
+""",
+    "theme-minimal": """
+/* Thème Minimaliste (Compact pour Impression) */
+body.theme-minimal {
+    --p-color: #000000; --s-color: #000000; --accent: #000000; --bg: #ffffff; --border: #000000;
+}
+body.theme-minimal { line-height: 1.3; }
+body.theme-minimal h1 { font-size: 1.8em; margin-bottom: 15px; border-bottom: 1px solid #000; }
+body.theme-minimal h2 { font-size: 1.3em; margin-top: 15px; margin-bottom: 5px; border: none; padding: 0; }
+body.theme-minimal h3 { font-size: 1.1em; margin-top: 10px; margin-bottom: 3px; }
+body.theme-minimal p { margin-bottom: 0.4em; }
+body.theme-minimal ul, body.theme-minimal ol { margin: 10px 0 10px 25px; }
+body.theme-minimal li { margin-bottom: 2px; }
+""",
+    "theme-memo": """
+/* Thème Mémorisation (Vibrant & Structuré) */
+body.theme-memo {
+    --p-color: #1e293b; --s-color: #4f46e5; --accent: #f59e0b; --bg: #ffffff; --border: #e2e8f0;
+}
+body.theme-memo h1 { background: #1e293b; color: white; padding: 30px; border-radius: 15px; text-transform: uppercase; letter-spacing: 3px; border: none; }
+body.theme-memo h2 { background: #fef3c7; color: #92400e; padding: 12px 20px; border-radius: 12px; border-left: 8px solid #f59e0b; box-shadow: 3px 3px 0px #fde68a; }
+body.theme-memo h3 { color: #4338ca; border-bottom: 2px solid #e0e7ff; display: inline-block; padding-bottom: 2px; }
+body.theme-memo blockquote { background: #fff7ed; border-color: #f59e0b; color: #7c2d12; }
+body.theme-memo ul li::marker { color: #f59e0b; content: "⚡ "; }
+""",
+    "theme-classic": """
+body.theme-classic {
+    --p-color: #000000; --s-color: #334155; --accent: #000000; --bg: #ffffff; --border: #cbd5e0;
+}
+""",
+}
+
+SUM_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{{title|raw}}</title>
+{{styles|raw}}
+<style>:root{--page-margin:{{margin|raw}};--font-size:{{font_size|raw}}}</style>
+</head>
+<body class="{{theme|raw}} {{just_class|raw}}">
+    <h1>{{title|raw}}</h1>
+    <div class="content">
+        {{body|raw}}
+    </div>
+</body>
+</html>""")
+
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists', 'nl2br', 'toc']
+
+
+class MarkdownCache:
+    """Corps HTML des synthèses, indexé par SHA-256 du Markdown (LRU borné en entrées et en octets).
+
+    Chaque thread garde son convertisseur markdown.Markdown, remis à zéro
+    entre deux conversions plutôt que reconstruit avec ses extensions.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _converter(self):
+        md = getattr(self._local, "md", None)
+        if md is None:
+            # Importé à la demande : seules les synthèses en ont besoin
+            import markdown
+            md = self._local.md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        return md
+
+    def render(self, content):
+        key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+
+        md = self._converter()
+        try:
+            body = md.convert(content)
+        finally:
+            md.reset()
+
+        size = len(body)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = body
+                self.current_bytes += size
+                while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                    _, old = self._entries.popitem(last=False)
+                    self.current_bytes -= len(old)
+        return body
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.current_bytes, "hits": self.hits, "misses": self.misses}
+
+
+MARKDOWN_CACHE = MarkdownCache()
+
+
+def render_sum_html(content, title, theme="theme-ocean", font_size="11pt", margin="2.5cm", justified=True,
+                    assets_url=None):
+    """Synthèse Markdown mise en page : thème et marges ne font que re-remplir le gabarit.
+
+    Seul le CSS du thème choisi est embarqué ; avec assets_url, la page pointe
+    vers la feuille partagée du pack hors-ligne.
+    """
+    if assets_url is None:
+        styles = f"<style>{SUM_CSS}{SUM_THEMES_CSS.get(theme, '')}</style>"
+    else:
+        styles = f'<link rel="stylesheet" href="{assets_url}synthese.css">'
+    return SUM_PAGE(title=title, styles=styles, margin=margin, font_size=font_size, theme=theme,
+                    just_class="justified" if justified else "", body=MARKDOWN_CACHE.render(content))
+
+
+# --- Quiz interactif (QCM JS) ---
+
+QUIZ_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{title|raw}} - Quiz Interactif Premium</title>
+    {{styles|raw}}
+</head>
+<body>
+    <header>
+        <div class="header-content">
+            <div class="header-title">
+                <h1>{{title|raw}}</h1>
+                <div class="progress-container">
+                    <div class="progress-bar" id="progress"></div>
+                </div>
+            </div>
+            <div class="header-stats">
+                {{timer_box|raw}}
+                <div class="stat-box">
+                    <span class="stat-label">Score</span>
+                    <span class="stat-value"><span id="current-score">0</span> / <span id="total-q">0</span></span>
+                </div>
+                <div class="stat-box">
+                    <span class="stat-label">Progrès</span>
+                    <span class="stat-value" id="answered-count">0</span>
+                </div>
+            </div>
+            <div class="action-buttons">
+                <button class="icon-btn" onclick="toggleTheme()" title="Mode Sombre">🌙</button>
+                <button class="icon-btn" onclick="resetProgress()" title="Réinitialiser">🔄</button>
+            </div>
+        </div>
+    </header>
+
+    <div class="container" id="quiz-container"></div>
+    <div class="container" id="results-container" style="display: none;"></div>
+
+    <script type="application/json" id="quiz-data">{{config|raw}}</script>
+    <script>const QUIZ = JSON.parse(document.getElementById('quiz-data').textContent);</script>
+    {{script|raw}}
+</body>
+</html>""")
+QUIZ_TIMER_BOX = '<div class="stat-box timer-box"><span class="stat-label">Temps</span><span class="stat-value" id="timer">--:--</span></div>'
+
+
+def script_json(value):
+    """JSON sûr à l'intérieur d'une balise <script>."""
+    return json.dumps(value, ensure_ascii=False).replace("</", "<\\/")
+
+
+# Au-delà, le quiz est paginé : seules QUIZ_PAGE_SIZE questions sont construites dans le DOM
+QUIZ_PAGINATE_QUESTIONS = 150
+QUIZ_PAGINATE_BYTES = 256 * 1024
+QUIZ_PAGE_SIZE = 25
+
+
+def quiz_page_size(n_questions, payload_bytes, paginate=None):
+    """Questions par page (0 : tout afficher). paginate=None choisit selon le volume de la banque."""
+    if paginate is None:
+        paginate = n_questions > QUIZ_PAGINATE_QUESTIONS or payload_bytes > QUIZ_PAGINATE_BYTES
+    return QUIZ_PAGE_SIZE if paginate and n_questions > QUIZ_PAGE_SIZE else 0
+
+
+def render_js_quiz(questions, title, timer_seconds=0, assets_url=None, paginate=None):
+    """Quiz interactif autonome ; avec assets_url, CSS et JS sont ceux, partagés, du pack hors-ligne."""
+    if assets_url is None:
+        styles, script = f"<style>{QUIZ_CSS}</style>", f"<script>{QUIZ_JS}</script>"
+    else:
+        styles = f'<link rel="stylesheet" href="{assets_url}quiz.css">'
+        script = f'<script src="{assets_url}quiz.js"></script>'
+    # JSON.parse d'un bloc application/json est plus rapide qu'un littéral JS de même taille
+    questions_json = script_json(questions)
+    page_size = quiz_page_size(len(questions), len(questions_json), paginate)
+    config = (f'{{"title": {script_json(title)}, "timerSeconds": {int(timer_seconds)}, '
+              f'"pageSize": {page_size}, "questions": {questions_json}}}')
+    return QUIZ_PAGE(title=title, styles=styles, timer_box=QUIZ_TIMER_BOX if timer_seconds > 0 else "",
+                     config=config, script=script)
+
+
+# --- Ressources statiques, minifiées une fois à l'import ---
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+
+def _read_asset(name):
+    with open(os.path.join(ASSETS_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+QUIZ_CSS = minify_css(_read_asset("quiz.css"))
+QUIZ_JS = minify_js(_read_asset("quiz.js"))
+SUM_CSS = minify_css(SUM_BASE_CSS)
+SUM_THEMES_CSS = {name: minify_css(css) for name, css in SUM_THEMES.items()}
+
+# Fichiers partagés par toutes les pages d'un pack hors-ligne (nom -> contenu)
+SHARED_ASSETS = {
+    "quiz.css": QUIZ_CSS,
+    "quiz.js": QUIZ_JS,
+    "synthese.css": SUM_CSS + "".join(SUM_THEMES_CSS.values()),
+}
@@ -0,0 +1,170 @@
+"""Mélange reproductible des questions et des options.
+
+Une copie mélangée est décrite par ses permutations : l'ordre des questions et,
+pour chaque question, l'ordre des options (index d'origine par position
+affichée). Les lettres correctes sont recalculées par position à partir de ces
+tableaux, en un seul passage sur les options : pas de recherche de lettre ni
+de comparaison de textes, donc les options en double restent correctes.
+
+La graine est dérivée de l'étudiant, du module et du numéro de variante : la
+même copie est reproduite à l'identique (reprise d'un quiz, réimpression,
+correction d'une variante d'examen).
+
+Les questions sans options (QA, glossaire) ne sont que déplacées.
+"""
+import hashlib
+import itertools
+import random
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from qcm_parser import LETTERS
+
+_LETTER_INDEX = {letter: i for i, letter in enumerate(LETTERS)}
+
+# Jusqu'à 6 options (720 ordres), une permutation se tire en un seul appel au générateur
+MAX_TABLE_OPTIONS = 6
+_PERMUTATIONS = {n: tuple(itertools.permutations(range(n))) for n in range(MAX_TABLE_OPTIONS + 1)}
+
+
+@dataclass
+class Shuffle:
+    """Permutations d'une copie : order[i] est l'index d'origine de la i-ème question,
+    options[i][j] (tuple) celui de la j-ème option affichée de cette question."""
+    seed: int
+    order: list = field(default_factory=list)
+    options: list = field(default_factory=list)
+
+
+def derive_seed(*parts):
+    """Graine 64 bits stable (indépendante de PYTHONHASHSEED) à partir de valeurs quelconques."""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def student_seed(student, module, variant=0):
+    """Graine d'une copie personnalisée : même étudiant, même module, même variante → même copie."""
+    return derive_seed(str(student).strip().lower(), module, variant)
+
+
+def make_shuffle(questions, seed=None, shuffle_q=True, shuffle_o=True):
+    """Tire les permutations d'une copie ; seed=None tire une graine au hasard."""
+    if seed is None:
+        seed = random.getrandbits(64)
+    rng = random.Random(seed)
+    rand = rng.random
+    order = list(range(len(questions)))
+    if shuffle_q:
+        rng.shuffle(order)
+    options = []
+    for i in order:
+        n = len(questions[i].get('opts', ()))
+        table = _PERMUTATIONS.get(n)
+        if not shuffle_o:
+            perm = tuple(range(n))
+        elif table is not None:
+            perm = table[int(rand() * len(table))]
+        else:
+            perm = list(range(n))
+            rng.shuffle(perm)
+            perm = tuple(perm)
+        options.append(perm)
+    return Shuffle(seed, order, options)
+
+
+@lru_cache(maxsize=8192)
+def remap_answer(ans, perm):
+    """Lettres correctes après permutation des options (tuple), triées, en O(options).
+
+    Les couples (réponse, permutation) se répètent beaucoup d'une copie à
+    l'autre : le résultat est mis en cache.
+    """
+    correct = [False] * len(perm)
+    for letter in ans:
+        k = _LETTER_INDEX.get(letter)
+        if k is not None and k < len(perm):
+            correct[k] = True
+    return "".join([LETTERS[new] for new, old in enumerate(perm) if correct[old]])
+
+
+def apply_shuffle(questions, shuffle):
+    """Nouvelles questions dans l'ordre de la copie, options et réponse remappées (l'original est intact)."""
+    out = []
+    for i, perm in zip(shuffle.order, shuffle.options):
+        q = questions[i]
+        if 'opts' not in q:
+            out.append(q)
+            continue
+        opts = q['opts']
+        out.append(dict(q, opts=[opts[j] for j in perm], ans=remap_answer(q['ans'], perm)))
+    return out
+
+
+def shuffle_questions(questions, seed=None, shuffle_q=True, shuffle_o=True):
+    """(copie mélangée, permutations) en une passe."""
+    shuffle = make_shuffle(questions, seed, shuffle_q, shuffle_o)
+    return apply_shuffle(questions, shuffle), shuffle
+
+
+def answer_keys(questions):
+    """Index des options correctes de chaque question d'origine (lettres hors options ignorées)."""
+    keys = []
+    for q in questions:
+        n = len(q.get('opts', ()))
+        keys.append(frozenset(k for k in map(_LETTER_INDEX.get, q['ans']) if k is not None and k < n))
+    return keys
+
+
+def verify_shuffle(questions, shuffled, shuffle, keys=None):
+    """Contrôle qu'une copie correspond à l'original : liste des anomalies, vide si tout est juste.
+
+    Chaque option affichée doit être l'option d'origine désignée par la
+    permutation, et être correcte si et seulement si elle l'était à l'origine.
+    keys (answer_keys) évite de relire les réponses d'origine à chaque copie.
+    """
+    if keys is None:
+        keys = answer_keys(questions)
+    if sorted(shuffle.order) != list(range(len(questions))) or len(shuffled) != len(questions):
+        return [f"Ordre des questions invalide (seed {shuffle.seed})"]
+    problems = []
+    for pos, (i, perm, q_new) in enumerate(zip(shuffle.order, shuffle.options, shuffled), 1):
+        q, key = questions[i], keys[i]
+        if 'opts' not in q:
+            if q_new['text'] != q['text'] or q_new['ans'] != q['ans']:
+                problems.append(f"Q{pos} : énoncé ou réponse déplacés")
+            continue
+        opts = q['opts']
+        if sorted(perm) != list(range(len(opts))):
+            problems.append(f"Q{pos} : permutation des options invalide")
+        elif q_new['text'] != q['text'] or q_new['opts'] != [opts[j] for j in perm]:
+            problems.append(f"Q{pos} : énoncé ou options déplacés")
+        elif q_new['ans'] != "".join([LETTERS[new] for new, old in enumerate(perm) if old in key]):
+            problems.append(f"Q{pos} : réponse {q_new['ans']} au lieu de la réponse d'origine {q['ans']} remappée")
+    return problems
+
+
+def verified_shuffle(questions, seed, shuffle_q=True, shuffle_o=True, keys=None, label="Copie"):
+    """shuffle_questions contrôlé par verify_shuffle ; ValueError « label : anomalies » si le corrigé ne survit pas."""
+    shuffled, shuffle = shuffle_questions(questions, seed, shuffle_q, shuffle_o)
+    problems = verify_shuffle(questions, shuffled, shuffle, keys)
+    if problems:
+        raise ValueError(f"{label} : " + " ; ".join(problems[:5]))
+    return shuffled, shuffle
+
+
+def generate_variants(questions, count, base_seed, shuffle_q=True, shuffle_o=True, verify=True):
+    """count copies reproductibles [(copie, permutations)], la variante k ayant la graine derive_seed(base_seed, k).
+
+    Avec verify, chaque copie est contrôlée contre l'original et une ValueError
+    est levée à la première anomalie. Les copies d'examen (exam_engine) sont
+    tirées de la même façon, une par variante.
+    """
+    keys = answer_keys(questions) if verify else None
+    variants = []
+    for k in range(count):
+        seed = derive_seed(base_seed, k)
+        if verify:
+            variants.append(verified_shuffle(questions, seed, shuffle_q, shuffle_o, keys, f"Variante {k + 1}"))
+        else:
+            variants.append(shuffle_questions(questions, seed, shuffle_q, shuffle_o))
+    return variants